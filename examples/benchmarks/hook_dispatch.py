@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+"""Compare code hooks dispatching through compiled hook chains against walking
+the hooks lists, with a varying number of hooks.
+"""
+
+import sys
+import time
+
+sys.path.append("../..")
+
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+
+ITERATIONS = 20000
+
+# mov rcx, ITERATIONS
+# loop:
+#   dec rcx
+#   jnz loop
+CODE = b'\x48\xc7\xc1' + ITERATIONS.to_bytes(4, 'little') + bytes.fromhex('48ffc9 75fb')
+
+
+def bench(compile_hooks: bool, nhooks: int, bounded: bool) -> float:
+    ql = Qiling(code=CODE, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DISABLED)
+    ql.compile_hooks = compile_hooks
+
+    begin = ql.loader.load_address
+    end = begin + len(CODE)
+
+    def nop(ql: Qiling, address: int, size: int):
+        pass
+
+    for i in range(nhooks):
+        # bounded hooks watch distinct ranges, and only one of them covers the loop
+        if bounded:
+            lbound = begin + (i - nhooks // 2) * 0x1000
+
+            ql.hook_code(nop, begin=lbound, end=lbound + 0xfff)
+        else:
+            ql.hook_code(nop)
+
+    start = time.perf_counter()
+    ql.run(begin, end)
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    for bounded in (False, True):
+        for nhooks in (1, 10, 100):
+            lists = bench(False, nhooks, bounded)
+            chains = bench(True, nhooks, bounded)
+
+            print(f'{"bounded" if bounded else "global":7s} x {nhooks:3d} hooks: lists {lists:.3f}s, chains {chains:.3f}s ({lists / chains:.2f}x)')
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+"""Compare peripheral register accesses through the compiled registers accessors
+against the generic ctypes memory access, on the STM32F4 USART and GPIO models.
+"""
+
+import sys
+import timeit
+
+sys.path.append("../..")
+
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+from qiling.hw.char.stm32f4xx_usart import STM32F4xxUsart
+from qiling.hw.gpio.stm32f4xx_gpio import STM32F4xxGpio
+
+ITERATIONS = 100000
+
+
+def bench(peripheral, registers, compiled: bool) -> float:
+    accessors = peripheral.accessors
+
+    if not compiled:
+        peripheral.accessors = {}
+
+    def access():
+        for offset in registers:
+            peripheral.write(offset, 4, peripheral.read(offset, 4))
+
+    elapsed = timeit.timeit(access, number=ITERATIONS)
+    peripheral.accessors = accessors
+
+    # time per register access, in nanoseconds
+    return elapsed * 1e9 / (ITERATIONS * len(registers) * 2)
+
+
+def main():
+    # the peripherals models do not need a firmware to be accessed directly
+    ql = Qiling(code=b'\x00\xbf', archtype=QL_ARCH.ARM, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DISABLED)
+
+    usart = STM32F4xxUsart(ql, 'usart2')
+    gpio = STM32F4xxGpio(ql, 'gpioa')
+
+    cases = (
+        ('USART BRR, CR1, CR2, CR3', usart, (usart.struct.BRR.offset, usart.struct.CR1.offset, usart.struct.CR2.offset, usart.struct.CR3.offset)),
+        ('GPIO MODER, OSPEEDR, PUPDR', gpio, (gpio.struct.MODER.offset, gpio.struct.OSPEEDR.offset, gpio.struct.PUPDR.offset))
+    )
+
+    print(f'{"registers":28s} {"ctypes":>10s} {"compiled":>10s}')
+
+    for title, peripheral, registers in cases:
+        generic = bench(peripheral, registers, False)
+        compiled = bench(peripheral, registers, True)
+
+        print(f'{title:28s} {generic:8.0f}ns {compiled:8.0f}ns')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+"""Compare full and incremental snapshot restore times.
+
+A fuzzing-like workload: a large data region is mapped, a short code snippet
+modifies a single page in it, and the initial state is restored after every run.
+"""
+
+import sys
+import timeit
+
+sys.path.append("../..")
+
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+
+# mov qword [rax], rbx
+CODE = bytes.fromhex('488918')
+
+DATA_BASE = 0x10000000
+ITERATIONS = 1000
+
+
+def bench(data_size: int, incremental: bool) -> float:
+    ql = Qiling(code=CODE, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DISABLED)
+    ql.mem.map(DATA_BASE, data_size, info='[data]')
+
+    begin = ql.arch.regs.arch_pc
+    end = begin + len(CODE)
+
+    saved = ql.save(incremental=incremental)
+
+    def iteration():
+        ql.arch.regs.rax = DATA_BASE + 0x1000
+        ql.arch.regs.rbx = 0x4141414141414141
+
+        ql.run(begin, end)
+        ql.restore(saved)
+
+    return timeit.timeit(iteration, number=ITERATIONS)
+
+
+if __name__ == "__main__":
+    print(f'{"data size":>12s}   {"full":>10s}   {"incremental":>12s}')
+
+    for size in (0x10000, 0x100000, 0x1000000):
+        full = bench(size, False)
+        incr = bench(size, True)
+
+        print(f'{size:#12x}   {full:9.3f}s   {incr:11.3f}s')
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+"""Measure syscall dispatch throughput using a tight getpid loop.
+"""
+
+import sys
+import time
+
+sys.path.append("../..")
+
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+
+ITERATIONS = 100000
+
+# mov rcx, ITERATIONS
+# loop:
+#   mov eax, 39     ; getpid
+#   push rcx
+#   syscall
+#   pop rcx
+#   dec rcx
+#   jnz loop
+CODE = b'\x48\xc7\xc1' + ITERATIONS.to_bytes(4, 'little') + bytes.fromhex('b827000000 51 0f05 59 48ffc9 75f2')
+
+
+def bench(verbose: QL_VERBOSE) -> float:
+    ql = Qiling(code=CODE, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=verbose)
+
+    begin = ql.arch.regs.arch_pc
+    end = begin + len(CODE)
+
+    start = time.perf_counter()
+    ql.run(begin, end)
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    for verbose in (QL_VERBOSE.DISABLED, QL_VERBOSE.OFF, QL_VERBOSE.DEFAULT):
+        elapsed = bench(verbose)
+
+        print(f'{verbose.name:10s}: {ITERATIONS} syscalls in {elapsed:.3f}s ({ITERATIONS / elapsed:.0f} syscalls/s)')
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+"""Simple example of how to fuzz with Qiling's built-in multi-process fuzzer; no AFL++ or
+unicornafl required.
+
+The target is emulated up to its 'main' function once, and then forked into worker processes
+that run the generated inputs from there.
+
+  o Start fuzzing
+    $ python3 ./fork_fuzz_x8664_linux.py
+
+  o Inspect results
+    $ ls fork_outputs/queue fork_outputs/crashes
+"""
+
+import os
+import sys
+
+from typing import Optional
+
+sys.path.append("../../..")
+from qiling import Qiling
+from qiling.const import QL_VERBOSE
+from qiling.extensions import pipe
+from qiling.extensions.fuzzing import ql_fuzz
+
+def main():
+    ql = Qiling(["./x8664_fuzz"], "../../rootfs/x8664_linux",
+        verbose=QL_VERBOSE.OFF, # keep qiling logging off
+        console=False)          # thwart program output
+
+    def place_input_callback(ql: Qiling, input: bytes, iteration: int) -> Optional[bool]:
+        """Feed generated stimuli to the fuzzed target.
+
+        This method is called in a worker process before every testcase.
+        """
+
+        # replace stdin with a fresh mock that holds the fuzzed keystrokes
+        ql.os.stdin = pipe.SimpleInStream(sys.stdin.fileno())
+        ql.os.stdin.write(input)
+
+        return True
+
+    # get image base address
+    ba = ql.loader.images[0].base
+
+    # make the worker crash whenever __stack_chk_fail@plt is about to be called.
+    # this way the fuzzer will count stack protection violations as crashes
+    ql.hook_address(callback=lambda x: os.abort(), address=ba + 0x126e)
+
+    # run the target up to 'main', which is where every testcase starts from
+    ql.run(end=ba + 0x1275)
+
+    seeds = []
+
+    for name in os.listdir("./afl_inputs"):
+        with open(os.path.join("./afl_inputs", name), "rb") as infile:
+            seeds.append(infile.read())
+
+    # fuzz on all available cores for 10 minutes
+    ql_fuzz(ql, place_input_callback, exits=[ql.os.exit_point], seeds=seeds,
+        duration=600,               # fuzzing time limit, in seconds
+        timeout=100000,             # testcase time limit, in microseconds
+        output_dir="./fork_outputs")
+
+if __name__ == "__main__":
+    main()
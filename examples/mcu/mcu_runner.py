@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+import sys
+sys.path.append("../..")
+
+from qiling.extensions.mcu.runner import QlMcuJob, QlMcuRunner
+
+
+def speed_up_systick(ql):
+    ql.hw.systick.ratio = 0xff
+
+
+def mcu_runner():
+    jobs = [
+        QlMcuJob("../rootfs/mcu/stm32f411/hello_usart.hex", "stm32f411", peripherals=['usart2', 'rcc'], count=2000),
+        QlMcuJob("../rootfs/mcu/stm32f411/md5_server.hex", "stm32f411", peripherals=['usart2', 'rcc'], inputs={'usart2': b'Hello\n'}, count=30000),
+        QlMcuJob("../rootfs/mcu/stm32f411/spi-test.bin", "stm32f411", base=0x8000000, peripherals=['spi1', 'rcc', 'usart2', 'gpioa'], count=30000),
+        QlMcuJob("../rootfs/mcu/stm32f411/os-demo.elf", "stm32f411", peripherals=['usart2', 'rcc', 'gpioa'], script=speed_up_systick, count=100000, quantum=64)
+    ]
+
+    for result in QlMcuRunner(timeout=60).run(jobs):
+        print(f'{result.name}: {result.reason.value} after {result.count} instructions ({result.elapsed:.2f}s)')
+
+        if result.error:
+            print(result.error)
+
+        for label, data in result.output.items():
+            print(f'  {label}: {data!r}')
+
+
+if __name__ == "__main__":
+    mcu_runner()
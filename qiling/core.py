@@ -24,6 +24,7 @@ from .arch.models import QL_CPU
 from .const import QL_ARCH, QL_ENDIAN, QL_OS, QL_STATE, QL_STOP, QL_VERBOSE, QL_OS_BAREMETAL
 from .exception import QlErrorFileNotFound, QlErrorArch, QlErrorOsType
 from .host import QlHost
+from .snapshot import QlSnapshotReader, QlSnapshotWriter, is_snapshot_file
 from .log import *
 from .utils import *
 from .core_struct import QlCoreStructs
@@ -601,7 +602,7 @@ class Qiling(QlCoreHooks, QlCoreStructs):
         else:
             self.patch_lib.append((offset, data, target))
 
-    def save(self, reg=True, mem=True, hw=False, fd=False, cpu_context=False, os=False, loader=False, *, snapshot: Optional[str] = None):
+    def save(self, reg=True, mem=True, hw=False, fd=False, cpu_context=False, os=False, loader=False, *, snapshot: Optional[str] = None, incremental: bool = False, compact: bool = False):
         """Pack Qiling's current state into an object and optionally dump it to a file.
         Specific components may be included or excluded from the save state.
 
@@ -614,17 +615,31 @@ class Qiling(QlCoreHooks, QlCoreStructs):
             os          : include OS-related state
             loader      : include Loader-related state
             snapshot    : specify a filename to dump the state into (optional)
+            incremental : track memory pages modified from this point on, so restoring the returned
+                          state would only write back the pages that have changed since. this is
+                          useful when the same state is restored over and over (e.g. fuzzing)
+            compact     : dump the state into a compact snapshot file rather than a pickled one. memory
+                          content is streamed directly to the file, and is therefore not included in the
+                          returned state. ignored if snapshot is not specified. may not be used along
+                          with incremental
 
         Returns: a dictionary holding Qiling's current state
         """
 
         saved_states = {}
 
+        # memory content is going to be streamed to the snapshot file
+        streamed = compact and snapshot is not None
+
+        # a streamed memory state is not kept around, so there is nothing to track changes against
+        if mem and incremental and streamed:
+            raise ValueError('incremental memory state cannot be saved to a compact snapshot')
+
         if reg:
             saved_states["reg"] = self.arch.regs.save()
 
-        if mem:
-            saved_states["mem"] = self.mem.save()
+        if mem and not streamed:
+            saved_states["mem"] = self.mem.save(incremental)
 
         if hw:
             saved_states["hw"] = self.hw.save()
@@ -643,7 +658,10 @@ class Qiling(QlCoreHooks, QlCoreStructs):
 
         if snapshot is not None:
             with open(snapshot, "wb") as save_state:
-                pickle.dump(saved_states, save_state)
+                if compact:
+                    QlSnapshotWriter(self, save_state).write(saved_states, mem)
+                else:
+                    pickle.dump(saved_states, save_state)
 
         return saved_states
 
@@ -662,8 +680,14 @@ class Qiling(QlCoreHooks, QlCoreStructs):
 
         # snapshot will be ignored if saved_states is set
         if (not saved_states) and (snapshot is not None):
-            with open(snapshot, "rb") as load_state:
-                saved_states = pickle.load(load_state)
+            if is_snapshot_file(snapshot):
+                with open(snapshot, "rb") as load_state, QlSnapshotReader(load_state) as reader:
+                    reader.restore_mem(self)
+                    saved_states = reader.saved_states
+
+            else:
+                with open(snapshot, "rb") as load_state:
+                    saved_states = pickle.load(load_state)
 
         if "mem" in saved_states:
             self.mem.restore(saved_states["mem"])
@@ -11,7 +11,7 @@
 from __future__ import annotations
 
 from functools import wraps
-from typing import Any, Callable, MutableMapping, MutableSequence, Protocol
+from typing import Any, Callable, Container, MutableMapping, MutableSequence, Protocol
 from typing import TYPE_CHECKING
 
 from unicorn.unicorn_const import (
@@ -44,7 +44,7 @@ from unicorn.unicorn_const import (
     UC_HOOK_INSN_INVALID
 )
 
-from .core_hooks_types import Hook, HookAddr, HookIntr, HookRet
+from .core_hooks_types import Hook, HookAddr, HookChain, HookEntries, HookIntr, HookRet
 from .const import QL_HOOK_BLOCK
 from .exception import QlErrorCoreHook
 
@@ -137,6 +137,13 @@ class QlCoreHooks:
     def __init__(self, uc: Uc):
         self._h_uc = uc
 
+        # dispatch code, block, memory and instruction hooks through compiled hook chains rather
+        # than walking their hooks lists. this affects only hook types registered afterwards
+        self.compile_hooks = True
+
+        self._hook_chain: MutableMapping[int, HookChain] = {}
+        self._insn_hook_chain: MutableMapping[int, HookChain] = {}
+
         self._hook: MutableMapping[int, MutableSequence[Hook]] = {}
         self._hook_fuc: MutableMapping[int, int] = {}
 
@@ -146,6 +153,8 @@ class QlCoreHooks:
         self._addr_hook: MutableMapping[int, MutableSequence[HookAddr]] = {}
         self._addr_hook_fuc: MutableMapping[int, int] = {}
 
+        self._entries_hook_fuc: MutableMapping[HookEntries, int] = {}
+
     ########################
     # Callback definitions #
     ########################
@@ -221,6 +230,10 @@ class QlCoreHooks:
         ql, hook_type = pack_data
         handled = False
 
+        # write faults caused by dirty pages tracking are not meant to reach user hooks
+        if hook_type == UC_HOOK_MEM_WRITE_PROT and ql.mem.handle_write_prot(addr, size):
+            return True
+
         if hook_type in self._hook:
             hooks_list = self._hook[hook_type]
 
@@ -272,6 +285,102 @@ class QlCoreHooks:
                 if type(ret) is int and ret & QL_HOOK_BLOCK:
                     break
 
+    def _get_hook_chain(self, chains: MutableMapping[int, HookChain], hooks_map: MutableMapping[int, MutableSequence[Hook]], key: int) -> HookChain:
+        """Get the compiled hook chain of a specific hooks list, or compile it if
+        hooks were added or removed since it was last used.
+        """
+
+        chain = chains.get(key)
+
+        if chain is None:
+            chain = chains[key] = HookChain(hooks_map.get(key, []))
+
+        return chain
+
+    def _invalidate_hook_chains(self) -> None:
+        self._hook_chain.clear()
+        self._insn_hook_chain.clear()
+
+    def _hook_insn_chain_cb(self, uc: Uc, *args):
+        """Instruction hooks dispatcher, using compiled hook chains.
+        """
+
+        *hook_args, (ql, insn_type) = args
+        retval = None
+
+        chain = self._get_hook_chain(self._insn_hook_chain, self._insn_hook, insn_type)
+
+        # avoid reading pc unless there are bounded hooks
+        hooks = chain.select(ql.arch.regs.arch_pc) if chain.bounded else chain.segments[0]
+
+        for callback, user_data in hooks:
+            if user_data is None:
+                ret = callback(ql, *hook_args)
+            else:
+                ret = callback(ql, *hook_args, user_data)
+
+            if type(ret) is tuple:
+                ret, retval = ret
+
+            if type(ret) is int and ret & QL_HOOK_BLOCK:
+                break
+
+        # use the last return value received
+        return retval
+
+    def _hook_trace_chain_cb(self, uc: Uc, addr: int, size: int, pack_data) -> None:
+        """Code and block hooks dispatcher, using compiled hook chains.
+        """
+
+        ql, hook_type = pack_data
+
+        chain = self._get_hook_chain(self._hook_chain, self._hook, hook_type)
+
+        for callback, user_data in chain.select(addr, size):
+            if user_data is None:
+                ret = callback(ql, addr, size)
+            else:
+                ret = callback(ql, addr, size, user_data)
+
+            if type(ret) is int and ret & QL_HOOK_BLOCK:
+                break
+
+    def _hook_mem_chain_cb(self, uc: Uc, access: int, addr: int, size: int, value: int, pack_data):
+        """Memory access hooks dispatcher, using compiled hook chains.
+        """
+
+        ql, hook_type = pack_data
+
+        # write faults caused by dirty pages tracking are not meant to reach user hooks
+        if hook_type == UC_HOOK_MEM_WRITE_PROT and ql.mem.handle_write_prot(addr, size):
+            return True
+
+        chain = self._get_hook_chain(self._hook_chain, self._hook, hook_type)
+        hooks = chain.select(addr, size)
+
+        if not hooks and hook_type & (UC_HOOK_MEM_UNMAPPED | UC_HOOK_MEM_PROT):
+            raise QlErrorCoreHook("_hook_mem_cb : not handled")
+
+        for callback, user_data in hooks:
+            if user_data is None:
+                ret = callback(ql, access, addr, size, value)
+            else:
+                ret = callback(ql, access, addr, size, value, user_data)
+
+            if type(ret) is int and ret & QL_HOOK_BLOCK:
+                break
+
+        return True
+
+    def _hook_entries_cb(self, uc: Uc, addr: int, size: int, pack_data) -> None:
+        """Entry points hooks dispatcher.
+        """
+
+        ql, hook = pack_data
+
+        if hook.check(addr):
+            hook.call(ql, addr, size)
+
     ###############
     # Class Hooks #
     ###############
@@ -286,7 +395,20 @@ class QlCoreHooks:
 
         return self._h_uc.hook_add(UC_HOOK_CODE, _callback, self, address, address)
 
+    def _ql_hook_entries_internal(self, callback: Callable, h: HookEntries) -> int:
+        _callback = hookcallback(self, callback)
+
+        return self._h_uc.hook_add(UC_HOOK_BLOCK, _callback, (self, h), h.begin, h.end)
+
     def _ql_hook(self, hook_type: int, h: Hook, *args) -> None:
+        if self.compile_hooks:
+            insn_cb = self._hook_insn_chain_cb
+            trace_cb = self._hook_trace_chain_cb
+            mem_cb = self._hook_mem_chain_cb
+        else:
+            insn_cb = self._hook_insn_cb
+            trace_cb = self._hook_trace_cb
+            mem_cb = self._hook_mem_cb
 
         def __handle_intr(t: int) -> None:
             if t not in self._hook_fuc:
@@ -301,7 +423,7 @@ class QlCoreHooks:
             ins_t = args[0]
 
             if ins_t not in self._insn_hook_fuc:
-                self._insn_hook_fuc[ins_t] = self._ql_hook_internal(t, self._hook_insn_cb, ins_t, ins_t)
+                self._insn_hook_fuc[ins_t] = self._ql_hook_internal(t, insn_cb, ins_t, ins_t)
 
             if ins_t not in self._insn_hook:
                 self._insn_hook[ins_t] = []
@@ -310,7 +432,7 @@ class QlCoreHooks:
 
         def __handle_trace(t: int) -> None:
             if t not in self._hook_fuc:
-                self._hook_fuc[t] = self._ql_hook_internal(t, self._hook_trace_cb, t)
+                self._hook_fuc[t] = self._ql_hook_internal(t, trace_cb, t)
 
             if t not in self._hook:
                 self._hook[t] = []
@@ -319,7 +441,7 @@ class QlCoreHooks:
 
         def __handle_mem(t: int) -> None:
             if t not in self._hook_fuc:
-                self._hook_fuc[t] = self._ql_hook_internal(t, self._hook_mem_cb, t)
+                self._hook_fuc[t] = self._ql_hook_internal(t, mem_cb, t)
 
             if t not in self._hook:
                 self._hook[t] = []
@@ -357,6 +479,8 @@ class QlCoreHooks:
             if hook_type & t:
                 handler(t)
 
+        self._invalidate_hook_chains()
+
     def ql_hook(self, hook_type: int, callback: Callable, user_data: Any = None, begin: int = 1, end: int = 0, *args) -> HookRet:
         """Intercept certain emulation events within a specified range.
 
@@ -556,6 +680,35 @@ class QlCoreHooks:
         # note: assuming 0 is not a valid hook type
         return HookRet(self, 0, hook)
 
+    def hook_entries(self, callback: TraceHookCalback, entries: Container[int], begin: int, end: int, user_data: Any = None) -> HookRet:
+        """Intercept execution from any of a set of entry points within a specified range.
+
+        Unlike `hook_address`, which requires a dedicated unicorn hook for each address, all entry
+        points share a single basic block hook. Its range is checked by unicorn when code gets
+        translated, so blocks outside of it incur no overhead, and blocks inside of it incur a
+        single lookup regardless of the number of entry points.
+
+        Args:
+            callback  : a method to call upon interception
+            entries   : a container of memory locations to watch; it is not copied, so it may be
+                        updated after the hook was created
+            begin     : start of memory range to watch
+            end       : end of memory range to watch
+            user_data : an additional context to pass to callback (default: `None`)
+
+        Notes:
+            Entry points are matched only at basic blocks starts, so this is suitable for addresses
+            that are reached through a branch, e.g. functions entry points.
+
+        Returns:
+            Hook handle
+        """
+
+        hook = HookEntries(callback, entries, begin, end, user_data)
+        self._entries_hook_fuc[hook] = self._ql_hook_entries_internal(self._hook_entries_cb, hook)
+
+        return HookRet(self, UC_HOOK_BLOCK, hook)
+
     def hook_intno(self, callback: InterruptHookCallback, intno: int, user_data: Any = None) -> HookRet:
         """Intercept interrupts.
 
@@ -698,10 +851,19 @@ class QlCoreHooks:
             __handle_addr(h.addr)
             return
 
+        # entry points hooks own a dedicated unicorn hook
+        if isinstance(h, HookEntries):
+            if h in self._entries_hook_fuc:
+                self._h_uc.hook_del(self._entries_hook_fuc.pop(h))
+
+            return
+
         for t, handler in type_handlers:
             if hook_type & t:
                 handler(t)
 
+        self._invalidate_hook_chains()
+
     def clear_hooks(self):
         for ptr in self._hook_fuc.values():
             self._h_uc.hook_del(ptr)
@@ -712,9 +874,14 @@ class QlCoreHooks:
         for ptr in self._addr_hook_fuc.values():
             self._h_uc.hook_del(ptr)
 
+        for ptr in self._entries_hook_fuc.values():
+            self._h_uc.hook_del(ptr)
+
         self.clear_ql_hooks()
 
     def clear_ql_hooks(self):
+        self._invalidate_hook_chains()
+
         self._hook = {}
         self._hook_fuc = {}
 
@@ -723,3 +890,5 @@ class QlCoreHooks:
 
         self._addr_hook = {}
         self._addr_hook_fuc = {}
+
+        self._entries_hook_fuc = {}
@@ -3,7 +3,8 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 # Built on top of Unicorn emulator (www.unicorn-engine.org) 
 
-from typing import Any, Callable
+from bisect import bisect_right
+from typing import Any, Callable, Container, Dict, List, Sequence, Set, Tuple
 
 class Hook:
     def __init__(self, callback: Callable, user_data: Any = None, begin: int = 1, end: int = 0):
@@ -34,6 +35,17 @@ class HookAddr(Hook):
         self.addr = address
 
 
+class HookEntries(Hook):
+    def __init__(self, callback, entries: Container[int], begin: int, end: int, user_data=None):
+        super().__init__(callback, user_data, begin, end)
+
+        self.entries = entries
+
+
+    def check(self, address: int) -> bool:
+        return address in self.entries
+
+
 class HookIntr(Hook):
     def __init__(self, callback, intno: int, user_data=None):
         super().__init__(callback, user_data, 0, -1)
@@ -54,3 +66,78 @@ class HookRet:
 
     def remove(self) -> None:
         self.__remove(self)
+
+
+class HookChain:
+    """A compiled form of a hooks list, to speed up hooks dispatching.
+
+    The address space is split into segments in which the set of matching hooks
+    does not change, and each segment gets a tuple of (callback, user_data) pairs
+    of its matching hooks, in their registration order. Selecting the hooks to call
+    for a certain address then takes a single bisect rather than a bound check per
+    hook.
+
+    A hook chain is immutable; it should be compiled again whenever hooks are added
+    or removed.
+    """
+
+    def __init__(self, hooks: Sequence[Hook]):
+        # hooks indices starting and ending at each segment boundary. hooks with an
+        # empty range watch the entire address space, so they are always active
+        starts: Dict[int, List[int]] = {}
+        ends: Dict[int, List[int]] = {}
+        active: Set[int] = set()
+
+        for i, h in enumerate(hooks):
+            if h.end < h.begin:
+                active.add(i)
+            else:
+                starts.setdefault(h.begin, []).append(i)
+                ends.setdefault(h.end + 1, []).append(i)
+
+        # segments boundaries
+        self.points: List[int] = sorted({0}.union(starts, ends))
+
+        # when there are no bounded hooks, all of them are selected regardless of the address
+        self.bounded = len(self.points) > 1
+
+        # hooks indices per segment, collected in a single sweep over the boundaries
+        self.indices: List[Tuple[int, ...]] = []
+
+        for lbound in self.points:
+            active.difference_update(ends.get(lbound, ()))
+            active.update(starts.get(lbound, ()))
+
+            self.indices.append(tuple(sorted(active)))
+
+        self.entries = tuple((h.callback, h.user_data) for h in hooks)
+
+        self.segments: List[Tuple[Tuple[Callable, Any], ...]] = [tuple(self.entries[i] for i in seg) for seg in self.indices]
+
+        # hooks of accesses that span across more than one segment, cached by segments pair
+        self.merged: Dict[Tuple[int, int], Tuple[Tuple[Callable, Any], ...]] = {}
+
+    def select(self, addr: int, size: int = 1) -> Tuple[Tuple[Callable, Any], ...]:
+        """Get the hooks to call for an event at a specific address, as (callback, user_data) pairs.
+        A hook is selected if either the first or the last byte of the event falls within its range.
+        """
+
+        if not self.bounded:
+            return self.segments[0]
+
+        i = bisect_right(self.points, addr) - 1
+
+        if size > 1:
+            j = bisect_right(self.points, addr + size - 1) - 1
+
+            if j != i:
+                key = (i, j)
+
+                if key not in self.merged:
+                    indices = sorted(set(self.indices[i]).union(self.indices[j]))
+
+                    self.merged[key] = tuple(self.entries[k] for k in indices)
+
+                return self.merged[key]
+
+        return self.segments[i]
@@ -410,7 +410,12 @@ class QlQdb(cmd.Cmd, QlDebugger):
         seek to where ever valid location you want
         """
 
+        # user marks take precedence over the loaded images symbols
         sym = self.marker.get_symbol(loc)
+
+        if sym is None:
+            sym = self.ql.loader.symbols.lookup(loc)
+
         addr = sym if sym is not None else try_read_int(loc)
 
         # check validation of the address to be seeked
@@ -150,6 +150,13 @@ class Render:
 
         return cur_regs 
 
+    def symbolize(self, address: int) -> str:
+        """
+        helper function for annotating an address with its symbol, if there is one
+        """
+
+        return ""
+
     def print_asm(self, insn: CsInsn, to_jump: bool = False) -> None:
         """
         helper function for printing assembly instructions, indicates where we are and the branch prediction
@@ -160,6 +167,11 @@ class Render:
 
         trace_line = f"0x{insn.address:08x} │ {opcode:15s} {insn.mnemonic:10} {insn.op_str:35s}"
 
+        sym = self.symbolize(insn.address)
+
+        if sym:
+            trace_line += f" <{sym}>"
+
         cursor = "►" if self.cur_addr == insn.address else " "
 
         jump_sign = f"{color.RED}✓{color.END}" if to_jump else " "
@@ -177,6 +189,20 @@ class ContextRender(Context, Render):
         Render.__init__(self)
         self.predictor = predictor
 
+    def symbolize(self, address: int) -> str:
+        """
+        annotate address with the nearest preceding symbol, taken from the loaded images
+        """
+
+        sym = self.ql.loader.symbols.resolve(address)
+
+        if sym is None:
+            return ""
+
+        offset = address - sym.address
+
+        return f"{sym.name}+{offset:#x}" if offset else sym.name
+
     def dump_regs(self) -> Mapping[str, int]:
         """
         dump all registers
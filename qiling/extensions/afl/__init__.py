@@ -1 +1,2 @@
-from .afl import ql_afl_fuzz, ql_afl_fuzz_custom
\ No newline at end of file
+from .afl import ql_afl_fuzz, ql_afl_fuzz_custom
+from .persistent import QlPersistentState
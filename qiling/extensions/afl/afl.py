@@ -1,9 +1,15 @@
 from typing import List, Callable
 from qiling.arch.arm import QlArchARM
 from qiling.core import Qiling
-from unicornafl import *
 from unicorn import UcError
 from qiling.exception import QlErrorNotImplemented
+from qiling.extensions.afl.persistent import QlPersistentState
+
+try:
+    from unicornafl import *
+except ImportError:
+    # unicornafl is optional; fuzzing without it fails with QlErrorNotImplemented
+    pass
 
 def ql_afl_fuzz(ql: Qiling,
                 input_file: str,
@@ -11,7 +17,8 @@ def ql_afl_fuzz(ql: Qiling,
                 exits: List[int],
                 validate_crash_callback: Callable[["Qiling", int, bytes, int], bool] = None,
                 always_validate: bool = False,
-                persistent_iters: int = 1):
+                persistent_iters: int = 1,
+                reset_state: bool = False):
         """ Fuzz a range of code with afl++.
             This function wraps some common logic with unicornafl.uc_afl_fuzz.
             NOTE: If no afl-fuzz instance is found, this function is almost identical to ql.run.
@@ -25,6 +32,9 @@ def ql_afl_fuzz(ql: Qiling,
             uc_emu_start (which is called internally by afl_fuzz) returns an error. Or the validate_crash_callback will
             be triggered every time.
             :param int persistent_iters: Fuzz how many times before forking a new child.
+            :param bool reset_state: Reset the emulation state to where fuzzing started before every
+            iteration. Only memory pages modified by the previous iteration are written back, which
+            makes it suitable for persistent mode.
             :raises UcAflError: If something wrong happens with the fuzzer.
         """
 
@@ -41,7 +51,7 @@ def ql_afl_fuzz(ql: Qiling,
             return UC_ERR_OK
         
         return ql_afl_fuzz_custom(ql, input_file, place_input_callback, _dummy_fuzz_callback, exits,
-                                  validate_crash_callback, always_validate, persistent_iters)
+                                  validate_crash_callback, always_validate, persistent_iters, reset_state)
 
 def ql_afl_fuzz_custom(ql: Qiling,
                        input_file: str,
@@ -50,14 +60,24 @@ def ql_afl_fuzz_custom(ql: Qiling,
                        exits: List[int] = [],
                        validate_crash_callback: Callable[["Qiling", bytes, int], bool] = None,
                        always_validate: bool = False,
-                       persistent_iters: int = 1):
+                       persistent_iters: int = 1,
+                       reset_state: bool = False):
 
         ql.uc.ctl_exits_enabled(True)
         ql.uc.ctl_set_exits(exits)
 
+        state = None
+
+        if reset_state:
+            state = QlPersistentState(ql)
+            state.save()
+
         def _ql_afl_place_input_wrapper(uc, input_bytes, iters, data):
             (ql, cb, _, _) = data
 
+            if state is not None:
+                state.restore()
+
             if cb:
                 return cb(ql, input_bytes, iters)
             else:
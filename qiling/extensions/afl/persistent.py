@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Mapping, Optional
+
+if TYPE_CHECKING:
+    from qiling import Qiling
+
+
+class QlPersistentState:
+    """Emulation state to reset to between persistent fuzzing iterations.
+
+    Rather than copying the entire memory back on every reset, memory pages modified since the
+    state was saved are tracked and only those are written back. The cpu state is restored from
+    a unicorn context, whose size does not depend on the target, and the os heap allocator (if
+    there is one) is reset along with the memory it manages.
+    """
+
+    def __init__(self, ql: Qiling):
+        self.ql = ql
+
+        self.__saved: Optional[Mapping[str, Any]] = None
+        self.__heap: Optional[Mapping[str, Any]] = None
+
+    def save(self) -> None:
+        """Save the current emulation state and start tracking modifications to it. This
+        may be called either in or out of emulation (e.g. from a hook).
+        """
+
+        ql = self.ql
+
+        self.__saved = ql.save(reg=False, mem=True, cpu_context=True, incremental=True)
+
+        heap = getattr(ql.os, 'heap', None)
+        self.__heap = heap.save() if heap is not None else None
+
+    def restore(self) -> None:
+        """Reset the emulation to the saved state.
+        """
+
+        assert self.__saved is not None, 'no state was saved'
+
+        ql = self.ql
+
+        ql.restore(self.__saved)
+
+        if self.__heap is not None:
+            ql.os.heap.restore(self.__heap)
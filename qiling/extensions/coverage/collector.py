@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from qiling import Qiling
+    from qiling.core_hooks_types import HookRet
+    from qiling.loader.loader import Image
+
+
+# default edges map size, as used by AFL
+MAP_SIZE = 1 << 16
+
+
+class QlCoverageCollector:
+    """
+    Collects basic blocks coverage into a deduplicated map keyed by module id and offset,
+    and optionally an AFL-style edges hit map. Coverage formats use it as their backend,
+    but it may be used on its own, e.g. as a fuzzing feedback.
+
+    Module ids are the images indices in `ql.loader.images`.
+    """
+
+    def __init__(self, ql: Qiling, edges: bool = False, map_size: int = MAP_SIZE, edges_buffer: Optional[memoryview] = None):
+        """Initialize a coverage collector.
+
+        Args:
+            edges: maintain an edges hit map
+            map_size: edges map size; has to be a power of 2
+            edges_buffer: a writable buffer to use as the edges map (e.g. shared memory), rather
+            than allocating one. implies `edges`, and overrides `map_size` with the buffer size
+        """
+
+        if edges_buffer is not None:
+            map_size = len(edges_buffer)
+
+        assert map_size & (map_size - 1) == 0, 'map size has to be a power of 2'
+
+        self.ql = ql
+
+        # covered blocks sizes, keyed by module id and offset, in order of first appearance
+        self.blocks: Dict[Tuple[int, int], int] = {}
+
+        # addresses of blocks that were already recorded
+        self.seen: Set[int] = set()
+
+        # edges hit counts, indexed by hashed (previous block, current block) pairs
+        if edges_buffer is None:
+            edges_buffer = bytearray(map_size) if edges else None
+
+        self.edges = edges_buffer
+        self.prev_loc = 0
+
+        self.__mask = map_size - 1
+        self.__hret: Optional[HookRet] = None
+
+    def find_module(self, address: int) -> Optional[Tuple[int, Image]]:
+        """Locate the image that contains the specified address.
+
+        Returns: a tuple of module id and image, or `None` if address does not belong to any image
+        """
+
+        return self.ql.loader.symbols.find_image(address)
+
+    def block_callback(self, ql: Qiling, address: int, size: int) -> None:
+        """Record the execution of a basic block.
+        """
+
+        edges = self.edges
+
+        if edges is not None:
+            cur_loc = ((address >> 4) ^ (address << 8)) & self.__mask
+            idx = cur_loc ^ self.prev_loc
+
+            edges[idx] = (edges[idx] + 1) & 0xff
+            self.prev_loc = cur_loc >> 1
+
+        if address in self.seen:
+            return
+
+        found = self.find_module(address)
+
+        if found is not None:
+            mod_id, image = found
+
+            self.blocks.setdefault((mod_id, address - image.base), size)
+            self.seen.add(address)
+
+    def activate(self, exact: bool = False) -> None:
+        """Start collecting coverage.
+
+        Args:
+            exact: treat every instruction as a block on its own
+        """
+
+        if exact:
+            self.__hret = self.ql.hook_code(self.block_callback)
+        else:
+            self.__hret = self.ql.hook_block(self.block_callback)
+
+    def deactivate(self) -> None:
+        """Stop collecting coverage.
+        """
+
+        if self.__hret is not None:
+            self.__hret.remove()
+            self.__hret = None
+
+    def reset_edges(self) -> None:
+        """Clear the edges hit map, e.g. before a new fuzzing iteration.
+        """
+
+        if self.edges is not None:
+            self.edges[:] = bytes(len(self.edges))
+
+        self.prev_loc = 0
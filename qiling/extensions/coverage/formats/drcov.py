@@ -5,8 +5,10 @@
 
 from ctypes import Structure
 from ctypes import c_uint32, c_uint16
+from typing import List
 
 from .base import QlBaseCoverage
+from ..collector import QlCoverageCollector
 
 
 # Adapted from https://www.ayrx.me/drcov-file-format
@@ -34,22 +36,17 @@ class QlDrCoverage(QlBaseCoverage):
 
         self.drcov_version = 2
         self.drcov_flavor = 'drcov'
-        self.basic_blocks = []
-        self.bb_callback = None
+        self.collector = QlCoverageCollector(ql)
 
-    @staticmethod
-    def block_callback(ql, address, size, self):
-        for mod_id, mod in enumerate(ql.loader.images):
-            if mod.base <= address <= mod.end:
-                ent = bb_entry(address - mod.base, size, mod_id)
-                self.basic_blocks.append(ent)
-                break
+    @property
+    def basic_blocks(self) -> List[bb_entry]:
+        return [bb_entry(offset, size, mod_id) for (mod_id, offset), size in self.collector.blocks.items()]
 
     def activate(self):
-        self.bb_callback = self.ql.hook_block(self.block_callback, user_data=self)
+        self.collector.activate()
 
     def deactivate(self):
-        self.ql.hook_del(self.bb_callback)
+        self.collector.deactivate()
 
     def dump_coverage(self, coverage_file):
         with open(coverage_file, "wb") as cov:
@@ -57,8 +54,8 @@ class QlDrCoverage(QlBaseCoverage):
             cov.write(f"DRCOV FLAVOR: {self.drcov_flavor}\n".encode())
             cov.write(f"Module Table: version {self.drcov_version}, count {len(self.ql.loader.images)}\n".encode())
             cov.write("Columns: id, base, end, entry, checksum, timestamp, path\n".encode())
-            for mod_id, mod in enumerate(self. ql.loader.images):
+            for mod_id, mod in enumerate(self.ql.loader.images):
                 cov.write(f"{mod_id}, {mod.base}, {mod.end}, 0, 0, 0, {mod.path}\n".encode())
-            cov.write(f"BB Table: {len(self.basic_blocks)} bbs\n".encode())
+            cov.write(f"BB Table: {len(self.collector.blocks)} bbs\n".encode())
             for bb in self.basic_blocks:
                 cov.write(bytes(bb))
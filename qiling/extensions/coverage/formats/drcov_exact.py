@@ -22,5 +22,5 @@ class QlDrCoverageExact(QlDrCoverage):
 
     def activate(self):
         # We treat every instruction as a block on its own.
-        self.bb_callback = self.ql.hook_code(self.block_callback, user_data=self)
+        self.collector.activate(exact=True)
         
\ No newline at end of file
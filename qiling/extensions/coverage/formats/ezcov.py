@@ -5,8 +5,10 @@
 
 from collections import namedtuple
 from os.path import basename
+from typing import List
 
 from .base import QlBaseCoverage
+from ..collector import QlCoverageCollector
 
 
 # Adapted from https://github.com/nccgroup/Cartographer/blob/main/EZCOV.md#coverage-data
@@ -31,21 +33,19 @@ class QlEzCoverage(QlBaseCoverage):
         super().__init__(ql)
         self.ezcov_version = 1
         self.ezcov_flavor  = 'ezcov'
-        self.basic_blocks  = []
-        self.bb_callback   = None
+        self.collector     = QlCoverageCollector(ql)
 
-    @staticmethod
-    def block_callback(ql, address, size, self):
-        mod = ql.loader.find_containing_image(address)
-        if mod is not None:
-            ent = bb_entry(address - mod.base, size, basename(mod.path))
-            self.basic_blocks.append(ent)
+    @property
+    def basic_blocks(self) -> List[bb_entry]:
+        images = self.ql.loader.images
+
+        return [bb_entry(offset, size, basename(images[mod_id].path)) for (mod_id, offset), size in self.collector.blocks.items()]
 
     def activate(self):
-        self.bb_callback = self.ql.hook_block(self.block_callback, user_data=self)
+        self.collector.activate()
 
     def deactivate(self):
-        self.ql.hook_del(self.bb_callback)
+        self.collector.deactivate()
 
     def dump_coverage(self, coverage_file):
         with open(coverage_file, "w") as cov:
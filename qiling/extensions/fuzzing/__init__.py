@@ -0,0 +1,4 @@
+from .driver import QlFuzzDriver, ql_fuzz
+from .corpus import QlFuzzCorpus
+from .executor import QlFuzzExecutor, QlFuzzResult
+from .mutator import QlMutator
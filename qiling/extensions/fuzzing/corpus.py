@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+import os
+from typing import List, Optional
+
+from qiling.extensions.fuzzing.executor import QlFuzzResult
+from qiling.extensions.fuzzing.mutator import QlMutator
+
+
+def __bucket(hits: int) -> int:
+    """[internal] Classify an edge hit count into a bucket, as AFL does, so that loops
+    count as new coverage only when their iterations count changes considerably.
+    """
+
+    for bit, limit in enumerate((1, 2, 3, 7, 15, 31, 127)):
+        if hits <= limit:
+            return (1 << bit) if hits else 0
+
+    return 1 << 7
+
+
+# translation table from edge hit counts to buckets
+BUCKETS = bytes(__bucket(hits) for hits in range(256))
+
+
+class QlFuzzCorpus:
+    """Fuzzing state: the queue of inputs that found new coverage, and the crashing and
+    hanging inputs. Inputs are judged by the edges map of their testcase.
+    """
+
+    def __init__(self, mutator: Optional[QlMutator] = None, output_dir: Optional[str] = None):
+        """Initialize a corpus.
+
+        Args:
+            mutator: mutator to generate new inputs with; a default one is used if not specified
+            output_dir: a directory to save the queue, crashing and hanging inputs to (optional)
+        """
+
+        self.mutator = mutator or QlMutator()
+        self.output_dir = output_dir
+
+        self.queue: List[bytes] = []
+        self.crashes: List[bytes] = []
+        self.hangs: List[bytes] = []
+
+        self.execs = 0
+
+        # bucketed edges seen so far, as bitmaps. crashes and hangs are tracked separately
+        # so only the ones that take a new path are kept
+        self.__coverage = {
+            QlFuzzResult.OK    : 0,
+            QlFuzzResult.CRASH : 0,
+            QlFuzzResult.HANG  : 0
+        }
+
+        # outcomes seen so far; the first testcase of each outcome is kept even if its edges map
+        # is empty (e.g. a worker that died before any block was executed)
+        self.__outcomes = set()
+
+        self.__cycle = 0
+
+        if output_dir is not None:
+            for subdir in ('queue', 'crashes', 'hangs'):
+                os.makedirs(os.path.join(output_dir, subdir), exist_ok=True)
+
+    @property
+    def coverage(self) -> int:
+        """Number of distinct edges hit counts buckets seen so far.
+        """
+
+        return bin(self.__coverage[QlFuzzResult.OK]).count('1')
+
+    def __save(self, subdir: str, entries: List[bytes], data: bytes) -> None:
+        entries.append(data)
+
+        if self.output_dir is not None:
+            path = os.path.join(self.output_dir, subdir, f'id_{len(entries) - 1:06d}')
+
+            with open(path, 'wb') as outfile:
+                outfile.write(data)
+
+    def evaluate(self, data: bytes, result: QlFuzzResult, edges: bytes) -> bool:
+        """Account a testcase outcome.
+
+        Args:
+            data: testcase input
+            result: testcase outcome
+            edges: edges map of the testcase
+
+        Returns: `True` if the testcase was interesting and got kept, `False` otherwise
+        """
+
+        if result == QlFuzzResult.SKIPPED:
+            return False
+
+        self.execs += 1
+
+        bitmap = int.from_bytes(edges.translate(BUCKETS), 'little')
+        known = self.__coverage[result]
+
+        if not (bitmap & ~known) and result in self.__outcomes:
+            return False
+
+        self.__coverage[result] = known | bitmap
+        self.__outcomes.add(result)
+
+        if result == QlFuzzResult.CRASH:
+            self.__save('crashes', self.crashes, data)
+
+        elif result == QlFuzzResult.HANG:
+            self.__save('hangs', self.hangs, data)
+
+        else:
+            self.__save('queue', self.queue, data)
+
+        return True
+
+    def next_input(self) -> bytes:
+        """Generate the next input to test by mutating the queued ones in turns.
+        """
+
+        if not self.queue:
+            return self.mutator.mutate(b'')
+
+        self.__cycle = (self.__cycle + 1) % len(self.queue)
+
+        return self.mutator.mutate(self.queue[self.__cycle])
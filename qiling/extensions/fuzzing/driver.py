@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from __future__ import annotations
+
+import mmap
+import os
+import signal
+import time
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection, wait
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+from qiling.exception import QlErrorNotImplemented
+from qiling.extensions.coverage.collector import QlCoverageCollector, MAP_SIZE
+from qiling.extensions.fuzzing.corpus import QlFuzzCorpus
+from qiling.extensions.fuzzing.executor import QlFuzzExecutor, QlFuzzResult, PlaceInputCallback, ValidateCrashCallback
+from qiling.extensions.fuzzing.mutator import QlMutator
+
+if TYPE_CHECKING:
+    from qiling import Qiling
+
+
+class QlFuzzDriver:
+    """A dependency-free multi-process fuzzer.
+
+    The prepared Qiling instance is snapshotted once, and then forked into worker processes
+    that share its host memory copy-on-write. Every worker restores the snapshot before each
+    testcase it runs, and reports the testcase edges map back through shared memory. The parent
+    process generates the inputs and keeps track of the coverage.
+
+    Workers are spawned with os.fork, so this is available only on hosts that support it.
+    """
+
+    def __init__(self, ql: Qiling,
+                 place_input_callback: PlaceInputCallback,
+                 exits: Sequence[int],
+                 validate_crash_callback: Optional[ValidateCrashCallback] = None,
+                 always_validate: bool = False,
+                 *,
+                 workers: Optional[int] = None,
+                 timeout: int = 0,
+                 count: int = 0,
+                 map_size: int = MAP_SIZE,
+                 mutator: Optional[QlMutator] = None,
+                 output_dir: Optional[str] = None):
+        """Initialize a fuzzing driver.
+
+        Args:
+            ql: a Qiling instance, prepared to run a testcase from its current state
+            place_input_callback: called in a worker before every testcase to place the input;
+            may return False to have the input skipped
+            exits: addresses at which a testcase is considered done
+            validate_crash_callback: called in a worker to determine whether a testcase has crashed
+            always_validate: call validate_crash_callback after every testcase rather than only on
+            emulation errors
+            workers: number of worker processes; defaults to the number of host cpus
+            timeout: max time per testcase (in microseconds); unlimited by default
+            count: max instructions per testcase; unlimited by default
+            map_size: edges map size; has to be a power of 2
+            mutator: mutator to generate new inputs with; a default one is used if not specified
+            output_dir: a directory to save the queue, crashing and hanging inputs to (optional)
+        """
+
+        if not hasattr(os, 'fork'):
+            raise QlErrorNotImplemented('multi-process fuzzing requires a host that supports fork')
+
+        self.ql = ql
+        self.executor = QlFuzzExecutor(ql, place_input_callback, exits, validate_crash_callback, always_validate, timeout, count)
+        self.corpus = QlFuzzCorpus(mutator, output_dir)
+
+        self.workers = workers or os.cpu_count() or 1
+        self.map_size = map_size
+
+        # workers edges maps, one after the other
+        self.__shm: Optional[mmap.mmap] = None
+
+        # workers process ids and connections, by worker index
+        self.__pids: Dict[int, int] = {}
+        self.__conns: Dict[int, Connection] = {}
+
+    def __worker(self, index: int, conn: Connection) -> None:
+        """[internal] Worker process main loop: run incoming inputs and report their outcome.
+        """
+
+        offset = index * self.map_size
+        edges = memoryview(self.__shm)[offset:offset + self.map_size]
+
+        collector = QlCoverageCollector(self.ql, edges_buffer=edges)
+        collector.activate()
+
+        self.executor.collector = collector
+
+        iteration = 0
+
+        while True:
+            try:
+                data = conn.recv_bytes()
+            except EOFError:
+                break
+
+            result = self.executor.run(data, iteration)
+            iteration += 1
+
+            conn.send_bytes(bytes([result]))
+
+    def __spawn(self, index: int) -> None:
+        parent_conn, child_conn = Pipe()
+
+        pid = os.fork()
+
+        if pid == 0:
+            # worker processes must never return to the caller
+            try:
+                parent_conn.close()
+
+                for conn in self.__conns.values():
+                    conn.close()
+
+                self.__worker(index, child_conn)
+            except BaseException:
+                self.ql.log.exception(f'fuzzing worker {index} failed')
+            finally:
+                os._exit(0)
+
+        child_conn.close()
+
+        self.__pids[index] = pid
+        self.__conns[index] = parent_conn
+
+    def __reap(self, index: int) -> None:
+        conn = self.__conns.pop(index)
+        pid = self.__pids.pop(index)
+
+        conn.close()
+
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+        os.waitpid(pid, 0)
+
+    def fuzz(self, seeds: Iterable[bytes] = (b'',), iterations: Optional[int] = None, duration: Optional[float] = None) -> QlFuzzCorpus:
+        """Start fuzzing. Fuzzing goes on until either the iterations count or the duration is
+        reached, or until interrupted by the user.
+
+        This is meant to be called outside of emulation (i.e. not from within a hook).
+
+        Args:
+            seeds: initial inputs, tested as-is before any mutation takes place
+            iterations: number of testcases to run; unlimited by default
+            duration: fuzzing time limit (in seconds); unlimited by default
+
+        Returns: fuzzing corpus, holding the interesting inputs found
+        """
+
+        corpus = self.corpus
+        pending: List[bytes] = list(seeds)
+
+        # inputs being tested, by worker index
+        inflight: Dict[int, bytes] = {}
+
+        self.executor.prepare()
+        self.__shm = mmap.mmap(-1, self.workers * self.map_size)
+
+        started = time.monotonic()
+        dispatched = 0
+
+        def exhausted() -> bool:
+            if iterations is not None and dispatched >= iterations:
+                return True
+
+            if duration is not None and time.monotonic() - started >= duration:
+                return True
+
+            return False
+
+        try:
+            for index in range(self.workers):
+                self.__spawn(index)
+
+            while True:
+                # hand out inputs to idle workers
+                for index, conn in self.__conns.items():
+                    if index not in inflight and not exhausted():
+                        data = pending.pop(0) if pending else corpus.next_input()
+
+                        conn.send_bytes(data)
+                        inflight[index] = data
+                        dispatched += 1
+
+                if not inflight:
+                    break
+
+                ready = wait([self.__conns[index] for index in inflight], timeout=1.0)
+
+                for index in [index for index in inflight if self.__conns[index] in ready]:
+                    data = inflight.pop(index)
+
+                    try:
+                        result = QlFuzzResult(self.__conns[index].recv_bytes()[0])
+                    except EOFError:
+                        # worker died while running the testcase (e.g. the target aborted)
+                        result = QlFuzzResult.CRASH
+
+                        self.__reap(index)
+                        self.__spawn(index)
+
+                    offset = index * self.map_size
+
+                    if corpus.evaluate(data, result, self.__shm[offset:offset + self.map_size]):
+                        self.ql.log.info(f'{result.name.lower()}: execs {corpus.execs}, queue {len(corpus.queue)}, crashes {len(corpus.crashes)}, hangs {len(corpus.hangs)}, coverage {corpus.coverage}')
+
+                # workers may not stop on a hanging testcase; do not wait for them past the deadline
+                if duration is not None and time.monotonic() - started >= duration + 1:
+                    break
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            for index in list(self.__conns):
+                self.__reap(index)
+
+            self.__shm.close()
+            self.__shm = None
+
+        elapsed = time.monotonic() - started
+
+        self.ql.log.info(f'fuzzing done: execs {corpus.execs} ({corpus.execs / max(elapsed, 1e-6):.1f}/sec), queue {len(corpus.queue)}, crashes {len(corpus.crashes)}, hangs {len(corpus.hangs)}')
+
+        return corpus
+
+
+def ql_fuzz(ql: Qiling,
+            place_input_callback: PlaceInputCallback,
+            exits: Sequence[int],
+            seeds: Iterable[bytes] = (b'',),
+            validate_crash_callback: Optional[ValidateCrashCallback] = None,
+            always_validate: bool = False,
+            **kwargs) -> QlFuzzCorpus:
+    """Fuzz a range of code across multiple worker processes, with no external dependencies.
+
+    This is a convenience wrapper of `QlFuzzDriver`; see it for the list of keyword arguments,
+    which additionally include the `iterations` and `duration` fuzzing limits.
+    """
+
+    limits = {key: kwargs.pop(key) for key in ('iterations', 'duration') if key in kwargs}
+
+    driver = QlFuzzDriver(ql, place_input_callback, exits, validate_crash_callback, always_validate, **kwargs)
+
+    return driver.fuzz(seeds, **limits)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from __future__ import annotations
+
+import time
+from enum import IntEnum
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+from unicorn import UcError, UC_ERR_OK, UC_ERR_EXCEPTION
+
+from qiling.arch.arm import QlArchARM
+from qiling.extensions.afl.persistent import QlPersistentState
+
+if TYPE_CHECKING:
+    from qiling import Qiling
+    from qiling.extensions.coverage.collector import QlCoverageCollector
+
+
+PlaceInputCallback = Callable[['Qiling', bytes, int], Optional[bool]]
+ValidateCrashCallback = Callable[['Qiling', int, bytes, int], bool]
+
+
+class QlFuzzResult(IntEnum):
+    OK = 0
+    CRASH = 1
+    HANG = 2
+    SKIPPED = 3
+
+
+class QlFuzzExecutor:
+    """Run testcases on a prepared Qiling instance, starting each of them from the same snapshot.
+
+    Resetting the emulation state between testcases writes back only the memory pages that were
+    modified by the previous one.
+    """
+
+    def __init__(self, ql: Qiling,
+                 place_input_callback: PlaceInputCallback,
+                 exits: Sequence[int],
+                 validate_crash_callback: Optional[ValidateCrashCallback] = None,
+                 always_validate: bool = False,
+                 timeout: int = 0,
+                 count: int = 0):
+        """Initialize a testcases executor.
+
+        Args:
+            place_input_callback: called before every testcase to place the input; may return
+            False to have the input skipped
+            exits: addresses at which a testcase is considered done
+            validate_crash_callback: called to determine whether a testcase has crashed, with its
+            unicorn error code (UC_ERR_OK if none)
+            always_validate: call validate_crash_callback after every testcase rather than only on
+            emulation errors
+            timeout: max time per testcase (in microseconds); unlimited by default
+            count: max instructions per testcase; unlimited by default
+        """
+
+        self.ql = ql
+        self.place_input_callback = place_input_callback
+        self.exits = list(exits)
+        self.validate_crash_callback = validate_crash_callback
+        self.always_validate = always_validate
+        self.timeout = timeout
+        self.count = count
+
+        # coverage collector whose edges map is reset before every testcase
+        self.collector: Optional[QlCoverageCollector] = None
+
+        self.begin = 0
+        self.state = QlPersistentState(ql)
+
+    def prepare(self) -> None:
+        """Snapshot the current emulation state as the starting point of every testcase.
+        This is meant to be called outside of emulation (i.e. not from within a hook).
+        """
+
+        ql = self.ql
+
+        self.begin = ql.arch.effective_pc if isinstance(ql.arch, QlArchARM) else ql.arch.regs.arch_pc
+
+        ql.uc.ctl_exits_enabled(True)
+        ql.uc.ctl_set_exits(self.exits)
+
+        self.state.save()
+
+    def run(self, data: bytes, iteration: int = 0) -> QlFuzzResult:
+        """Run a single testcase.
+
+        Args:
+            data: testcase input
+            iteration: testcase serial number, passed on to the callbacks
+
+        Returns: testcase outcome
+        """
+
+        ql = self.ql
+
+        self.state.restore()
+
+        if self.collector is not None:
+            self.collector.reset_edges()
+
+        if self.place_input_callback(ql, data, iteration) is False:
+            return QlFuzzResult.SKIPPED
+
+        errno = UC_ERR_OK
+        started = time.perf_counter()
+
+        try:
+            ql.emu_start(self.begin, 0, self.timeout, self.count)
+        except UcError as ex:
+            errno = ex.errno
+        except Exception as ex:
+            ql.log.debug(f'testcase raised an exception: {ex!r}')
+            errno = UC_ERR_EXCEPTION
+
+        if errno != UC_ERR_OK or self.always_validate:
+            if self.validate_crash_callback is None:
+                crashed = errno != UC_ERR_OK
+            else:
+                crashed = self.validate_crash_callback(ql, errno, data, iteration)
+
+            if crashed:
+                return QlFuzzResult.CRASH
+
+        # testcases that neither reached an exit nor stopped before the time limit was up
+        if self.timeout and ql.arch.regs.arch_pc not in self.exits:
+            if (time.perf_counter() - started) * 1000000 >= self.timeout:
+                return QlFuzzResult.HANG
+
+        return QlFuzzResult.OK
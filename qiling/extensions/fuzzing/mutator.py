@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+import random
+from typing import Callable, List, Optional
+
+
+# boundary values that tend to trigger edge cases, as used by AFL
+INTERESTING_8  = (-128, -1, 0, 1, 16, 32, 64, 100, 127)
+INTERESTING_16 = (-32768, -129, 128, 255, 256, 512, 1000, 1024, 4096, 32767)
+INTERESTING_32 = (-2147483648, -100663046, -32769, 32768, 65535, 65536, 100663045, 2147483647)
+
+ARITH_MAX = 35
+
+
+class QlMutator:
+    """A simple havoc-style mutator, which applies a random stack of AFL-like mutations
+    to an input.
+    """
+
+    def __init__(self, max_size: int = 0x1000, seed: Optional[int] = None):
+        """Initialize a mutator.
+
+        Args:
+            max_size: maximal size of a mutated input
+            seed: random generator seed, for reproducible mutations
+        """
+
+        self.max_size = max_size
+        self.random = random.Random(seed)
+
+        self.__mutations: List[Callable[[bytearray], None]] = [
+            self.__flip_bit,
+            self.__set_interesting,
+            self.__arith,
+            self.__set_random_byte,
+            self.__delete_block,
+            self.__clone_block,
+            self.__overwrite_block
+        ]
+
+    def __flip_bit(self, data: bytearray) -> None:
+        bit = self.random.randrange(len(data) * 8)
+
+        data[bit // 8] ^= 1 << (bit % 8)
+
+    def __set_interesting(self, data: bytearray) -> None:
+        size, values = self.random.choice(((1, INTERESTING_8), (2, INTERESTING_16), (4, INTERESTING_32)))
+
+        if len(data) < size:
+            return
+
+        pos = self.random.randrange(len(data) - size + 1)
+        endian = self.random.choice(('little', 'big'))
+
+        data[pos:pos + size] = self.random.choice(values).to_bytes(size, endian, signed=True)
+
+    def __arith(self, data: bytearray) -> None:
+        size = self.random.choice((1, 2, 4))
+
+        if len(data) < size:
+            return
+
+        pos = self.random.randrange(len(data) - size + 1)
+        endian = self.random.choice(('little', 'big'))
+        delta = self.random.randint(1, ARITH_MAX) * self.random.choice((-1, 1))
+
+        value = int.from_bytes(data[pos:pos + size], endian) + delta
+        data[pos:pos + size] = (value % (1 << (size * 8))).to_bytes(size, endian)
+
+    def __set_random_byte(self, data: bytearray) -> None:
+        data[self.random.randrange(len(data))] = self.random.randrange(256)
+
+    def __block_size(self, limit: int) -> int:
+        # prefer small blocks
+        return self.random.randint(1, max(1, min(limit, self.random.choice((8, 32, 128)))))
+
+    def __delete_block(self, data: bytearray) -> None:
+        if len(data) < 2:
+            return
+
+        size = self.__block_size(len(data) - 1)
+        pos = self.random.randrange(len(data) - size + 1)
+
+        del data[pos:pos + size]
+
+    def __clone_block(self, data: bytearray) -> None:
+        room = self.max_size - len(data)
+
+        if room <= 0:
+            return
+
+        size = self.__block_size(min(len(data), room))
+        src = self.random.randrange(len(data) - size + 1)
+        dst = self.random.randrange(len(data) + 1)
+
+        # occasionally insert a run of a constant byte rather than a copy
+        if self.random.randrange(4) == 0:
+            block = bytes([self.random.randrange(256)]) * size
+        else:
+            block = data[src:src + size]
+
+        data[dst:dst] = block
+
+    def __overwrite_block(self, data: bytearray) -> None:
+        if len(data) < 2:
+            return
+
+        size = self.__block_size(len(data) - 1)
+        src = self.random.randrange(len(data) - size + 1)
+        dst = self.random.randrange(len(data) - size + 1)
+
+        data[dst:dst + size] = data[src:src + size]
+
+    def mutate(self, data: bytes) -> bytes:
+        """Generate a mutated version of an input.
+        """
+
+        mutated = bytearray(data or b'\x00')
+
+        for _ in range(1 << self.random.randint(1, 5)):
+            self.random.choice(self.__mutations)(mutated)
+
+            # mutations never empty the input, but may grow it
+            del mutated[self.max_size:]
+
+        return bytes(mutated)
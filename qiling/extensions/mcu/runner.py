@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from __future__ import annotations
+
+import importlib
+import os
+import pkgutil
+import signal
+import time
+import traceback
+from collections import deque
+from enum import Enum
+from functools import lru_cache
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+from qiling.exception import QlErrorNotImplemented
+from qiling.hw.connectivity import QlConnectivityPeripheral
+
+
+# boards families whose cores are not cortex-m
+FAMILY_ARCH = {
+    'gd32vf1' : QL_ARCH.RISCV
+}
+
+
+@lru_cache(maxsize=None)
+def board_profiles() -> Mapping[str, Tuple[QL_ARCH, Mapping[str, Any]]]:
+    """Collect the board profiles shipped with qiling, by board name.
+
+    Returns: board name -> (architecture, profile)
+    """
+
+    package = importlib.import_module(__package__)
+    boards = {}
+
+    for family in pkgutil.iter_modules(package.__path__):
+        if not family.ispkg:
+            continue
+
+        module = importlib.import_module(f'{__package__}.{family.name}')
+        archtype = FAMILY_ARCH.get(family.name, QL_ARCH.CORTEX_M)
+
+        for name, profile in vars(module).items():
+            if not name.startswith('_') and isinstance(profile, dict):
+                boards[name] = (archtype, profile)
+
+    return boards
+
+
+class QlMcuExit(Enum):
+    END     = 'end'         # reached the job end address
+    COUNT   = 'count'       # emulated the job instructions count
+    STOP    = 'stop'        # stopped by the job script (e.g. from a hook)
+    TIMEOUT = 'timeout'     # ran out of time
+    ERROR   = 'error'       # failed on an emulation error or an exception
+    CRASH   = 'crash'       # the worker process died
+    KILLED  = 'killed'      # the worker process did not respond past its timeout and was killed
+
+
+class QlMcuJob(NamedTuple):
+    """A firmware to run on a board.
+    """
+
+    firmware: str                                   # firmware path; either an elf, a hex or a raw binary file
+    board: Union[str, Mapping[str, Any]]            # board name (see `board_profiles`) or a board profile
+    base: Optional[int] = None                      # raw binary map address
+    archtype: Optional[QL_ARCH] = None              # board architecture; resolved from the board name if not specified
+    peripherals: Sequence[str] = ()                 # peripherals to create before the run
+    inputs: Optional[Mapping[str, bytes]] = None    # data to send to connectivity peripherals before the run
+    script: Optional[Callable[[Qiling], Any]] = None    # called with the Qiling instance before the run
+    count: int = 0                                  # max instructions to emulate; unlimited by default
+    end: Optional[int] = None                       # address to stop emulation at
+    quantum: int = 1                                # instructions to emulate between peripheral updates
+    timeout: Optional[float] = None                 # max run time (in seconds); defaults to the runner one
+    name: Optional[str] = None                      # job name to report; defaults to the firmware file name
+    verbose: QL_VERBOSE = QL_VERBOSE.DISABLED
+
+
+class QlMcuResult(NamedTuple):
+    """A job outcome.
+    """
+
+    name: str                   # job name
+    reason: QlMcuExit           # why the job run was over
+    count: int                  # emulated instructions count
+    output: Dict[str, bytes]    # data emitted by the connectivity peripherals, by peripheral label
+    elapsed: float              # job wall time (in seconds)
+    error: Optional[str] = None # error details, if the job did not complete normally
+
+
+class QlMcuRunner:
+    """Run MCU firmware jobs in parallel, each one on a fresh Qiling instance of its own.
+
+    Board profiles are resolved once in the parent process, which then forks a worker process
+    per job. Workers share the parent modules and profiles copy-on-write, and report the job
+    outcome back when done. A job that does not finish within its timeout is stopped at the next
+    peripheral update; a worker that does not respond past that is killed.
+
+    Workers are spawned with os.fork, so this is available only on hosts that support it.
+    """
+
+    def __init__(self, *, workers: Optional[int] = None, timeout: Optional[float] = None, grace: float = 5.0):
+        """Initialize a jobs runner.
+
+        Args:
+            workers: number of jobs to run simultaneously; defaults to the number of host cpus
+            timeout: max run time per job (in seconds); unlimited by default
+            grace: time to wait for a worker past its job timeout before killing it (in seconds)
+        """
+
+        if not hasattr(os, 'fork'):
+            raise QlErrorNotImplemented('multi-process mcu runner requires a host that supports fork')
+
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.grace = grace
+
+    @staticmethod
+    def __name(job: QlMcuJob) -> str:
+        return job.name or os.path.basename(job.firmware)
+
+    def __resolve(self, job: QlMcuJob) -> Tuple[QL_ARCH, Mapping[str, Any]]:
+        """[internal] Get the job architecture and board profile.
+        """
+
+        if isinstance(job.board, str):
+            boards = board_profiles()
+
+            if job.board not in boards:
+                raise KeyError(f'unknown board: {job.board}')
+
+            archtype, profile = boards[job.board]
+        else:
+            archtype, profile = QL_ARCH.CORTEX_M, job.board
+
+        return job.archtype or archtype, profile
+
+    @staticmethod
+    def __exit_reason(ql: Qiling, job: QlMcuJob) -> QlMcuExit:
+        if not ql.os.runable:
+            return QlMcuExit.STOP
+
+        if job.end is not None:
+            pc = ql.arch.effective_pc if hasattr(ql.arch, 'effective_pc') else ql.arch.regs.arch_pc
+
+            if pc == job.end:
+                return QlMcuExit.END
+
+        if job.count and ql.os.counter >= job.count:
+            return QlMcuExit.COUNT
+
+        return QlMcuExit.TIMEOUT
+
+    @staticmethod
+    def __output(ql: Qiling) -> Dict[str, bytes]:
+        output = {}
+
+        for label, entity in ql.hw.entity.items():
+            if isinstance(entity, QlConnectivityPeripheral):
+                data = bytearray()
+
+                while entity.otube.readable():
+                    data.extend(entity.recv())
+
+                output[label] = bytes(data)
+
+        return output
+
+    def __execute(self, job: QlMcuJob, archtype: QL_ARCH, profile: Mapping[str, Any], timeout: Optional[float]) -> QlMcuResult:
+        """[internal] Run a job in the current process.
+        """
+
+        argv = [job.firmware] if job.base is None else [job.firmware, job.base]
+
+        ql = None
+        reason = QlMcuExit.ERROR
+        error = None
+
+        started = time.monotonic()
+
+        try:
+            ql = Qiling(argv, archtype=archtype, ostype=QL_OS.MCU, env=profile, verbose=job.verbose)
+            ql.os.quantum = job.quantum
+
+            for label in job.peripherals:
+                ql.hw.create(label)
+
+            for label, data in (job.inputs or {}).items():
+                ql.hw[label].send(data)
+
+            if job.script is not None:
+                job.script(ql)
+
+            ql.run(end=job.end, count=job.count, timeout=int(timeout * 1000000) if timeout else 0)
+
+            reason = self.__exit_reason(ql, job)
+
+        except Exception:
+            error = traceback.format_exc()
+
+        count = getattr(ql.os, 'counter', 0) if ql is not None else 0
+        output = self.__output(ql) if ql is not None else {}
+
+        return QlMcuResult(self.__name(job), reason, count, output, time.monotonic() - started, error)
+
+    def __spawn(self, job: QlMcuJob, archtype: QL_ARCH, profile: Mapping[str, Any], timeout: Optional[float], conns: Iterable[Connection]) -> Tuple[int, Connection]:
+        parent_conn, child_conn = Pipe()
+
+        pid = os.fork()
+
+        if pid == 0:
+            # worker processes must never return to the caller
+            try:
+                parent_conn.close()
+
+                for conn in conns:
+                    conn.close()
+
+                child_conn.send(self.__execute(job, archtype, profile, timeout))
+            finally:
+                os._exit(0)
+
+        child_conn.close()
+
+        return pid, parent_conn
+
+    @staticmethod
+    def __reap(pid: int, conn: Connection) -> None:
+        conn.close()
+
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+        os.waitpid(pid, 0)
+
+    def run(self, jobs: Iterable[QlMcuJob], callback: Optional[Callable[[int, QlMcuResult], Any]] = None) -> List[QlMcuResult]:
+        """Run jobs across the worker processes.
+
+        Args:
+            jobs: jobs to run
+            callback: called in the parent process with the job index and result as soon as
+            each job is done (optional)
+
+        Returns: jobs results, in the jobs order
+        """
+
+        jobs = list(jobs)
+        results: List[Optional[QlMcuResult]] = [None] * len(jobs)
+
+        # resolve all boards upfront, so a bad one fails the batch before anything runs
+        resolved = [self.__resolve(job) for job in jobs]
+
+        pending = deque(range(len(jobs)))
+
+        # running jobs: connection -> (job index, worker pid, start time, kill deadline)
+        running: Dict[Connection, Tuple[int, int, float, Optional[float]]] = {}
+
+        def complete(index: int, result: QlMcuResult) -> None:
+            results[index] = result
+
+            if callback is not None:
+                callback(index, result)
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.workers:
+                    index = pending.popleft()
+                    job = jobs[index]
+
+                    timeout = self.timeout if job.timeout is None else job.timeout
+                    started = time.monotonic()
+                    deadline = started + timeout + self.grace if timeout else None
+
+                    pid, conn = self.__spawn(job, *resolved[index], timeout, list(running))
+                    running[conn] = (index, pid, started, deadline)
+
+                deadlines = [deadline for _, _, _, deadline in running.values() if deadline is not None]
+                delay = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+
+                for conn in wait(list(running), timeout=delay):
+                    index, pid, started, _ = running.pop(conn)
+
+                    try:
+                        result = conn.recv()
+                    except EOFError:
+                        # the worker died while running the job (e.g. the emulation aborted)
+                        result = QlMcuResult(self.__name(jobs[index]), QlMcuExit.CRASH, 0, {}, time.monotonic() - started, 'worker process died')
+
+                    self.__reap(pid, conn)
+                    complete(index, result)
+
+                now = time.monotonic()
+
+                for conn, (index, pid, started, deadline) in list(running.items()):
+                    if deadline is not None and now >= deadline:
+                        del running[conn]
+                        self.__reap(pid, conn)
+
+                        complete(index, QlMcuResult(self.__name(jobs[index]), QlMcuExit.KILLED, 0, {}, now - started, 'worker process killed'))
+
+        finally:
+            for conn, (_, pid, _, _) in running.items():
+                self.__reap(pid, conn)
+
+        return results
+
+
+def ql_mcu_run(jobs: Iterable[QlMcuJob], **kwargs) -> List[QlMcuResult]:
+    """Run MCU firmware jobs across multiple worker processes.
+
+    This is a convenience wrapper of `QlMcuRunner`; see it for the list of keyword arguments.
+    """
+
+    return QlMcuRunner(**kwargs).run(jobs)
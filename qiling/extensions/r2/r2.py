@@ -293,8 +293,8 @@ class R2:
         self.ql.hook_code(self.disassembler, filt)
 
     def enable_trace(self, mode='full'):
-        # simple map from addr to flag name, cannot resolve addresses in the middle
-        self.ql.loader.symsmap = {flag.offset: flag.name for flag in self.flags}
+        # make flags available to the tracer as global symbols
+        self.ql.loader.symbols.add_source(lambda: ((flag.name, flag.offset) for flag in self.flags))
         if mode == 'full':
             trace.enable_full_trace(self.ql)
         elif mode == 'history':
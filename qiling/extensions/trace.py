@@ -3,7 +3,7 @@
 # More info, please refer to https://github.com/qilingframework/qiling/pull/765
 
 from collections import deque
-from typing import Deque, Iterable, Iterator, Mapping, Tuple
+from typing import Callable, Deque, Iterable, Iterator, Mapping, Optional, Tuple
 
 from capstone import Cs, CsInsn, CS_ARCH_X86, CS_OP_IMM, CS_OP_MEM, CS_OP_REG
 from capstone.x86 import X86Op
@@ -63,7 +63,7 @@ def __get_trace_records(ql: Qiling, address: int, size: int, md: Cs) -> Iterator
 
         yield (insn, state)
 
-def __to_trace_line(record: TraceRecord, symsmap: Mapping[int, str] = {}) -> str:
+def __to_trace_line(record: TraceRecord, get_name: Callable[[int], Optional[str]] = lambda _: None) -> str:
     """[private] Transform trace info into a formatted trace line.
     """
 
@@ -88,7 +88,7 @@ def __to_trace_line(record: TraceRecord, symsmap: Mapping[int, str] = {}) -> str
         """[internal] Find the symbol that matches to the specified address (if any).
         """
 
-        return symsmap.get(address, '')
+        return get_name(address) or ''
 
     def __parse_op(op: X86Op) -> str:
         """[internal] Parse an operand and return its string representation. Indirect memory
@@ -158,8 +158,8 @@ def enable_full_trace(ql: Qiling):
 
     assert md.arch == CS_ARCH_X86, 'currently available only for intel architecture'
 
-    # if available, use symbols map to resolve memory accesses
-    symsmap = getattr(ql.loader, 'symsmap', {})
+    # use the loaded images symbols to resolve memory accesses
+    get_name = ql.loader.symbols.get_name
 
     # show trace lines in a darker color so they would be easily distinguished from
     # ordinary log records
@@ -171,7 +171,7 @@ def enable_full_trace(ql: Qiling):
         """
 
         for record in __get_trace_records(ql, address, size, md):
-            line = __to_trace_line(record, symsmap)
+            line = __to_trace_line(record, get_name)
 
             ql.log.debug(f'{faded_color}{line}{reset_color}')
 
@@ -195,8 +195,8 @@ def enable_history_trace(ql: Qiling, nrecords: int):
 
     assert md.arch == CS_ARCH_X86, 'currently available only for intel architecture'
 
-    # if available, use symbols map to resolve memory accesses
-    symsmap = getattr(ql.loader, 'symsmap', {})
+    # use the loaded images symbols to resolve memory accesses
+    get_name = ql.loader.symbols.get_name
 
     history: Deque[TraceRecord] = deque(maxlen=nrecords)
 
@@ -221,7 +221,7 @@ def enable_history_trace(ql: Qiling, nrecords: int):
         # then parse and emit the trace info we collected
         ql.log.error(f'History:')
         for record in history:
-            line = __to_trace_line(record, symsmap)
+            line = __to_trace_line(record, get_name)
 
             ql.log.error(line)
 
@@ -1,20 +1,55 @@
 # This code structure is copied and modified from the coverage extension
 
+import gzip
+import lzma
+
+from ctypes import addressof, c_int, c_uint64, c_void_p, sizeof
+from typing import Callable, List, Optional, TextIO
+
 import qiling
 from qiling.const import QL_ENDIAN
 from .base import QlBaseTrace
 from .registers import ArchRegs
-from unicorn.unicorn_const import UC_MEM_READ, UC_MEM_WRITE
+from unicorn import UcError
+from unicorn.unicorn_const import UC_ERR_OK, UC_MEM_READ, UC_MEM_WRITE
+
+# unicorn native library handle, used for reading all traced registers at once.
+# not part of unicorn public api, so fall back to reading registers one by one if unavailable
+try:
+    from unicorn.unicorn import _uc as _uclib
+except ImportError:
+    _uclib = None
+
+# streamed trace file buffer size
+BUFFER_SIZE = 1 << 20
+
+
+def _open_trace(trace_file: str) -> TextIO:
+    """Open a trace file for streaming, compressing it according to its suffix.
+    """
+
+    if trace_file.endswith('.gz'):
+        return gzip.open(trace_file, 'wt')
+
+    if trace_file.endswith('.xz'):
+        return lzma.open(trace_file, 'wt')
+
+    return open(trace_file, 'w', buffering=BUFFER_SIZE)
+
 
 class QlDrTrace(QlBaseTrace):
     """
     Traces emulation and puts it into a format viewable in Tenet
     IDAPro plugin Tenet: https://github.com/gaasedelen/tenet
+
+    When a trace file is specified, deltas are streamed to it while emulating instead of
+    being kept in memory until the trace is dumped, so memory usage does not grow with
+    the trace length. A '.gz' or '.xz' trace file suffix makes it compressed.
     """
 
     FORMAT_NAME = "tenet"
 
-    def __init__(self, ql: qiling.Qiling):
+    def __init__(self, ql: qiling.Qiling, trace_file: Optional[str] = None):
         super().__init__()
         self.ql             = ql
         self.deltas         = []
@@ -22,18 +57,59 @@ class QlDrTrace(QlBaseTrace):
         self.current_pc     = 0x0
 
         self.arch_regs = ArchRegs(ql.arch)
-        self.register_values= dict()
+
+        registers = self.arch_regs.registers
+
+        self.register_names = [register[1::] for register in registers]
+        self.pc_index = list(registers).index(self.arch_regs.pc_key)
+        self.read_registers = self.__batch_reader(list(registers.values()))
 
         # Initialize with ridiculous value so first delta isn't missed
-        for register in self.arch_regs.registers:
-            self.register_values[register] = 0xFEEDBABE
+        self.register_values = [0xFEEDBABE] * len(registers)
+
+        self.stream = _open_trace(trace_file) if trace_file else None
+        self.trace_file = trace_file
+
+    def __batch_reader(self, regs: List[int]) -> Callable[[], List[int]]:
+        """Create a method that reads all the specified registers at once.
+        """
+
+        if _uclib is None:
+            read = self.ql.arch.regs.read
 
+            return lambda: [read(reg) for reg in regs]
+
+        count = len(regs)
+
+        # traced registers are all 64 bits wide at most
+        ids = (c_int * count)(*regs)
+        vals = (c_uint64 * count)()
+        ptrs = (c_void_p * count)(*(addressof(vals) + i * sizeof(c_uint64) for i in range(count)))
+
+        uc_reg_read_batch = _uclib.uc_reg_read_batch
+        uch = self.ql.uc._uch
+
+        def __read() -> List[int]:
+            status = uc_reg_read_batch(uch, ids, ptrs, count)
+
+            if status != UC_ERR_OK:
+                raise UcError(status)
+
+            return vals[:]
+
+        return __read
 
     def _add_delta(self):
         # Cover glitch cases where nothing changed
         if self.current_delta != []:
             # Join all delta fragments into delta line and append 
-            self.deltas.append(",".join(self.current_delta))
+            delta = ",".join(self.current_delta)
+
+            if self.stream is None:
+                self.deltas.append(delta)
+            else:
+                self.stream.write(delta + "\n")
+
             self.current_delta = []
         return
 
@@ -69,21 +145,20 @@ class QlDrTrace(QlBaseTrace):
 
     @staticmethod
     def code_callback(ql, address, size, self):
+        values = self.read_registers()
+
         # Check if PC changed for next delta
-        pc = ql.arch.regs.read(self.arch_regs.registers[self.arch_regs.pc_key])
+        pc = values[self.pc_index]
         if pc != self.current_pc:
             self._add_delta()
             self.current_pc = pc
         # Go through each register and see if it changed
-        for register in self.arch_regs.registers:
-            value = ql.arch.regs.read(self.arch_regs.registers[register])
-            if value != self.register_values[register]:
+        for name, value, previous in zip(self.register_names, values, self.register_values):
+            if value != previous:
                 # <REG_NAME>=<REG_VALUE_AS_BASE_16>
-                delta = f"{register[1::]}={hex(value)}"
-                self.current_delta.append(delta)
-                # Update value
-                self.register_values[register] = value
-        
+                self.current_delta.append(f"{name}={hex(value)}")
+
+        self.register_values = values
         return
         
     def activate(self):
@@ -97,6 +172,16 @@ class QlDrTrace(QlBaseTrace):
         self.ql.hook_del(self.mem_read_callback)
     
     def dump_trace(self, trace_file: str):
+        # Flush the last delta, which is otherwise added only when PC changes
+        self._add_delta()
+
+        if self.stream is not None:
+            assert trace_file == self.trace_file, 'trace is being streamed to another file'
+
+            self.stream.close()
+            self.stream = None
+            return
+
         with open(trace_file, "w") as trace:
             # Write out each delta on a separate line
             for delta in self.deltas:
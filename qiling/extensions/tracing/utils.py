@@ -22,21 +22,27 @@ class TraceFactory():
     def formats(self):
         return self.trace_collectors.keys()
 
-    def get_trace_collector(self, ql, name):
-        return self.trace_collectors[name](ql)
+    def get_trace_collector(self, ql, name, **kwargs):
+        return self.trace_collectors[name](ql, **kwargs)
 
 factory = TraceFactory()
 
 @contextmanager
-def collect_trace(ql, name: str, trace_file: str):
+def collect_trace(ql, name: str, trace_file: str, stream: bool = False):
     """
     Context manager for emulating a given piece of code with tracing.
     Example:
     with collect_trace(ql, 'tenet', 'trace.0.log'):
         ql.run(...)
+
+    If `stream` is set, the trace is written to `trace_file` while emulating rather than
+    collected in memory, which is preferable for long traces. Not all formats support that.
     """
 
-    trace = factory.get_trace_collector(ql, name)
+    if stream:
+        trace = factory.get_trace_collector(ql, name, trace_file=trace_file)
+    else:
+        trace = factory.get_trace_collector(ql, name)
     trace.activate()
     try:
         yield
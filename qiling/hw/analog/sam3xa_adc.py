@@ -58,9 +58,7 @@ class SAM3xaAdc(QlPeripheral):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -75,5 +73,4 @@ class SAM3xaAdc(QlPeripheral):
                 self.instance.ISR |= ISR.DRDY
 
         else:
-            data = (value).to_bytes(size, 'little')
-            ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+            self.raw_write(offset, size, value)
@@ -50,5 +50,4 @@ class SAM3xaDac(QlPeripheral):
         if offset == self.struct.CDR.offset:
             self.instance.ISR |= ISR.EOC
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
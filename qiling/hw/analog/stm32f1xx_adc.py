@@ -58,9 +58,7 @@ class STM32F1xxAdc(QlPeripheral):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):      
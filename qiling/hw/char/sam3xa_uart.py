@@ -50,9 +50,7 @@ class SAM3xaUart(QlConnectivityPeripheral):
                 self.instance.SR &= ~SR.RXRDY
                 return self.recv_from_user()
 
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):      
@@ -66,8 +64,7 @@ class SAM3xaUart(QlConnectivityPeripheral):
             self.instance.IER |= value
         
         else:
-            data = (value).to_bytes(size, byteorder='little')
-            ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+            self.raw_write(offset, size, value)
 
     def step(self):
         if  self.instance.IER & IER.RXRDY and \
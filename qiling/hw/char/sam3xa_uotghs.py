@@ -107,9 +107,7 @@ class SAM3xaUotghs(QlConnectivityPeripheral):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:        
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -117,5 +115,4 @@ class SAM3xaUotghs(QlConnectivityPeripheral):
             if value & CTRL.OTGPADE == 0:
                 self.instance.SR |= SR.CLKUSABLE
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
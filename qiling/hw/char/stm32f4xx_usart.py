@@ -78,8 +78,7 @@ class STM32F4xxUsart(QlConnectivityPeripheral):
             self.send_to_user(value)
 
         else:
-            data = (value).to_bytes(size, byteorder='little')
-            ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+            self.raw_write(offset, size, value)
 
     def transfer(self):
         if not (self.instance.SR & USART_SR.RXNE): 
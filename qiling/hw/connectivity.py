@@ -7,6 +7,8 @@
 import ctypes
 import queue
 
+from typing import Optional
+
 from qiling.core import Qiling
 from qiling.hw.peripheral import QlPeripheral
 
@@ -105,6 +107,23 @@ class QlConnectivityPeripheral(QlPeripheral):
         if len(self.device_list) < self.limit:
             self.device_list.append(device)
 
+    def advance(self, cycles: int):
+        if cycles <= 0:
+            return
+
+        self.step()
+
+        # attached devices take a single byte per step
+        for _ in range(cycles - 1):
+            if not (self.device_list and self.otube.readable()):
+                break
+
+            self.step()
+
+    def next_event(self) -> Optional[int]:
+        # pending input is polled on each step; do not let the cpu run ahead of it
+        return 1 if self.itube.readable() else None
+
     @staticmethod
     def device_handler(func):
         """ Send one byte to all devices
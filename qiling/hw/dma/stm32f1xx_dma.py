@@ -4,6 +4,7 @@
 #
 
 import ctypes
+from typing import Optional
 
 from qiling.hw.peripheral import QlPeripheral
 from qiling.hw.const.stm32f1xx_dma import DMA_CR, DMA
@@ -117,9 +118,7 @@ class STM32F1xxDma(QlPeripheral):
 
     @QlPeripheral.monitor(width=15)
     def read(self, offset: int, size: int) -> int:        
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor(width=15)
     def write(self, offset: int, size: int, value: int):
@@ -130,8 +129,7 @@ class STM32F1xxDma(QlPeripheral):
             self.instance.ISR &= ~value
 
         else:
-            data = (value).to_bytes(size, byteorder='little')
-            ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+            self.raw_write(offset, size, value)
 
     def transfer_complete(self, id):
         tc_bits = [1, 5, 9, 13, 17, 21, 25]
@@ -147,3 +145,18 @@ class STM32F1xxDma(QlPeripheral):
                                     
             if stream.step(self.ql.mem):
                 self.transfer_complete(id)
+
+    def advance(self, cycles: int):
+        # a stream transfers one data item per cycle
+        for id, stream in enumerate(self.instance.stream):
+            if not stream.enable():
+                continue
+
+            for _ in range(min(cycles, stream.NDTR)):
+                if stream.step(self.ql.mem):
+                    self.transfer_complete(id)
+
+    def next_event(self) -> Optional[int]:
+        events = [stream.NDTR for id, stream in enumerate(self.instance.stream) if stream.enable() and stream.NDTR and self.intn[id] is not None]
+
+        return min(events, default=None)
@@ -4,6 +4,7 @@
 #
 
 import ctypes
+from typing import Optional
 from qiling.hw.peripheral import QlPeripheral
 from qiling.hw.const.stm32f4xx_dma import DMA, DMA_SxCR
 
@@ -131,9 +132,7 @@ class STM32F4xxDma(QlPeripheral):
 
     @QlPeripheral.monitor(width=15)
     def read(self, offset: int, size: int) -> int:        
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor(width=15)
     def write(self, offset: int, size: int, value: int):        
@@ -144,8 +143,7 @@ class STM32F4xxDma(QlPeripheral):
             self.instance.HISR &= ~value
 
         elif offset > self.struct.HIFCR.offset:
-            data = (value).to_bytes(size, byteorder='little')
-            ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+            self.raw_write(offset, size, value)
 
     def transfer_complete(self, id):
         tc_bits = [5, 11, 21, 27]
@@ -163,4 +161,19 @@ class STM32F4xxDma(QlPeripheral):
                 continue
                                     
             if stream.step(self.ql.mem):
-                self.transfer_complete(id)                
+                self.transfer_complete(id)
+
+    def advance(self, cycles: int):
+        # a stream transfers one data item per cycle
+        for id, stream in enumerate(self.instance.stream):
+            if not stream.enable():
+                continue
+
+            for _ in range(min(cycles, stream.NDTR)):
+                if stream.step(self.ql.mem):
+                    self.transfer_complete(id)
+
+    def next_event(self) -> Optional[int]:
+        events = [stream.NDTR for id, stream in enumerate(self.instance.stream) if stream.enable() and stream.NDTR and self.intn[id] is not None]
+
+        return min(events, default=None)
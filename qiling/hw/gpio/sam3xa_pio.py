@@ -77,9 +77,7 @@ class SAM3xaPio(QlPeripheral, GpioHooks):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int): 
@@ -95,8 +93,7 @@ class SAM3xaPio(QlPeripheral, GpioHooks):
                     self.reset_pin(i)
             return
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
 
     def set_pin(self, i):
         self.ql.log.debug(f'[{self.label}] Set P{self.label[-1].upper()}{i}')
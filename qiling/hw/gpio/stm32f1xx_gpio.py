@@ -46,9 +46,7 @@ class STM32F1xxGpio(QlPeripheral, GpioHooks):
         if offset == self.struct.BSRR.offset:
             return 0x00
         
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -79,8 +77,7 @@ class STM32F1xxGpio(QlPeripheral, GpioHooks):
             
             return    
         
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size) 
+        self.raw_write(offset, size, value)
 
     def set_pin(self, i):
         self.ql.log.debug(f'[{self.label}] Set P{self.label[-1].upper()}{i}')
@@ -3,10 +3,13 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
-import ctypes
+from bisect import bisect_right
+from typing import Optional, Tuple
 
 from qiling.core import Qiling
 from qiling.hw.peripheral import QlPeripheral
+from qiling.hw.scheduler import QlHwScheduler
+from qiling.hw.timer.timer import QlTimerPeripheral
 from qiling.utils import ql_get_module_function
 from qiling.exception import QlErrorModuleFunctionNotFound
 
@@ -20,6 +23,20 @@ class QlHwManager:
 
         self.stepable = {}    
 
+        ## Timers are not stepped; they are brought up to date when their
+        ## registers are accessed or when their next event is due
+        self.timed = {}
+        self.synced = {}
+
+        ## Emulated cycles count
+        self.cycles = 0
+        self.scheduler = QlHwScheduler()
+
+        ## Peripheral regions sorted by address, and a cache of resolved addresses
+        self.__bounds = []
+        self.__index = []
+        self.__cache = {}
+
     def create(self, label: str, struct: str=None, base: int=None, kwargs: dict={}) -> "QlPeripheral":
         """ Create the peripheral accroding the label and envs.
 
@@ -35,11 +52,15 @@ class QlHwManager:
             entity = ql_get_module_function('qiling.hw', struct)(self.ql, label, **kwargs)
             
             self.entity[label] = entity
-            if hasattr(entity, 'step'):
+            if isinstance(entity, QlTimerPeripheral):
+                self.timed[label] = entity
+                self.synced[label] = self.cycles
+
+            elif hasattr(entity, 'step'):
                 self.stepable[label] = entity            
 
             self.region[label] = [(lbound + base, rbound + base) for (lbound, rbound) in entity.region]
-
+            self.__reindex()
 
             return entity
         except QlErrorModuleFunctionNotFound:
@@ -54,6 +75,13 @@ class QlHwManager:
             if label in self.stepable:
                 self.stepable.pop(label)            
 
+            if label in self.timed:
+                self.timed.pop(label)
+                self.synced.pop(label)
+                self.scheduler.cancel(label)
+
+            self.__reindex()
+
     def load_env(self, label: str):
         """ Get peripheral information (structure, base address, initialization list) from env.
 
@@ -70,46 +98,132 @@ class QlHwManager:
             if args['type'] == 'peripheral':
                 self.create(label.lower(), args['struct'], args['base'], args.get("kwargs", {}))
 
+    def __reindex(self):
+        self.__index = sorted((lbound, rbound, label) for label, region in self.region.items() for lbound, rbound in region)
+        self.__bounds = [lbound for lbound, _, _ in self.__index]
+        self.__cache.clear()
+
+    def __locate(self, address: int) -> Optional[Tuple[QlPeripheral, int]]:
+        """ Find the peripheral at `address` along with its base address.
+            Resolved addresses are cached, as firmware tends to access the same registers over and over.
+        """
+
+        if address in self.__cache:
+            return self.__cache[address]
+
+        located = None
+        i = bisect_right(self.__bounds, address) - 1
+
+        if i >= 0:
+            _, rbound, label = self.__index[i]
+
+            if address < rbound:
+                entity = self.entity[label]
+                located = (entity, entity.base)
+
+        self.__cache[address] = located
+
+        return located
+
     def find(self, address: int):
         """ Find the peripheral at `address`
         """
-        
-        for label in self.entity.keys():
-            for lbound, rbound in self.region[label]:
-                if lbound <= address < rbound:
-                    return self.entity[label]
+
+        located = self.__locate(address)
+
+        if located is not None:
+            return located[0]
 
     def step(self):
         """ Update all peripheral's state 
         """
+        self.advance(1)
+
+    def advance(self, cycles: int):
+        """ Update all peripheral's state by a number of cycles at once
+        """
+        self.cycles += cycles
+
+        for label in self.scheduler.due(self.cycles):
+            self.__sync(label)
+            self.__reschedule(label)
+
         for entity in self.stepable.values():
-            entity.step()
+            entity.advance(cycles)
+
+    def next_event(self) -> Optional[int]:
+        """ Get the number of cycles until the earliest peripheral interrupt.
+
+        Returns:
+            Optional[int]: Cycles count, or None if no peripheral has an event in sight
+        """
+        events = [cycles for cycles in (entity.next_event() for entity in self.stepable.values()) if cycles is not None]
+
+        deadline = self.scheduler.peek()
+        if deadline is not None:
+            events.append(deadline - self.cycles)
+
+        return min(events, default=None)
+
+    def __sync(self, label: str):
+        elapsed = self.cycles - self.synced[label]
+
+        if elapsed > 0:
+            self.timed[label].advance(elapsed)
+            self.synced[label] = self.cycles
+
+    def __reschedule(self, label: str):
+        cycles = self.timed[label].next_event()
+
+        if cycles is None:
+            self.scheduler.cancel(label)
+        else:
+            self.scheduler.schedule(label, self.cycles + cycles)
+
+    def sync(self):
+        """ Bring all timers up to date and recalculate their next events,
+            e.g. after their state was changed from outside of the emulation.
+        """
+        for label in self.timed:
+            self.__sync(label)
+            self.__reschedule(label)
 
     def setup_mmio(self, begin, size, info=""):
-        mmio = ctypes.create_string_buffer(size)        
+        mmio = bytearray(size)
 
         def mmio_read_cb(ql, offset, size):
-            address = begin + offset                        
-            hardware = self.find(address)
-            
-            if hardware:
-                return hardware.read(address - hardware.base, size)
+            address = begin + offset
+            located = self.__locate(address)
+
+            if located:
+                hardware, base = located
+
+                if hardware.label in self.timed:
+                    self.__sync(hardware.label)
+
+                return hardware.read(address - base, size)
             else:
                 ql.log.debug('%s Read non-mapped hardware [0x%08x]' % (info, address))                
                 
-                buf = ctypes.create_string_buffer(size)
-                ctypes.memmove(buf, ctypes.addressof(mmio) + offset, size)
-                return int.from_bytes(buf.raw, byteorder='little')
+                return int.from_bytes(mmio[offset:offset + size], byteorder='little')
 
         def mmio_write_cb(ql, offset, size, value):
             address = begin + offset
-            hardware = self.find(address)
+            located = self.__locate(address)
 
-            if hardware:
-                hardware.write(address - hardware.base, size, value)
+            if located:
+                hardware, base = located
+
+                if hardware.label in self.timed:
+                    self.__sync(hardware.label)
+                    hardware.write(address - base, size, value)
+                    self.__reschedule(hardware.label)
+
+                else:
+                    hardware.write(address - base, size, value)
             else:
                 ql.log.debug('%s Write non-mapped hardware [0x%08x] = 0x%08x' % (info, address, value))
-                ctypes.memmove(ctypes.addressof(mmio) + offset, (value).to_bytes(size, 'little'), size)
+                mmio[offset:offset + size] = (value).to_bytes(size, 'little')
 
         self.ql.mem.map_mmio(begin, size, mmio_read_cb, mmio_write_cb, info=info)
 
@@ -131,8 +245,15 @@ class QlHwManager:
         return self.entity.get(key)
 
     def save(self):
+        self.sync()
+
         return {label : entity.save() for label, entity in self.entity.items()}
 
     def restore(self, saved_state):
         for label, data in saved_state.items():
             self.entity[label].restore(data)
+
+        for label in self.timed:
+            self.synced[label] = self.cycles
+
+        self.sync()
@@ -111,8 +111,7 @@ class STM32F4xxI2c(QlConnectivityPeripheral):
 
             return
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
 
     ## I2C Control register 2 (I2C_CR2)
     def send_event_interrupt(self):
@@ -4,7 +4,9 @@
 #
 
 import ctypes
+from typing import Optional
 
+from qiling.const import QL_STATE
 from qiling.hw.peripheral import QlPeripheral
 
 
@@ -83,6 +85,11 @@ class CortexMNvic(QlPeripheral):
         if self.get_enable(IRQn):
             self.intrs.append(IRQn)
 
+            # an interrupt raised by the running code is taken right away rather
+            # than at the end of the current run quantum
+            if self.ql.emu_state == QL_STATE.STARTED:
+                self.ql.emu_stop()
+
     def clear_pending(self, IRQn):
         if IRQn >= 0:
             self.instance.ISPR[IRQn >> self.OFFSET] &= self.MASK ^ (1 << (IRQn & self.MASK))
@@ -113,11 +120,16 @@ class CortexMNvic(QlPeripheral):
             self.clear_pending(IRQn)
             self.interrupt_handler(self.ql, IRQn)
 
+    def advance(self, cycles: int):
+        # pending interrupts are delivered regardless of the elapsed time
+        self.step()
+
+    def next_event(self) -> Optional[int]:
+        return 0 if self.intrs else None
+
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -54,9 +54,7 @@ class STM32F1xxExti(QlPeripheral):
     
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:        
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -74,8 +72,7 @@ class STM32F1xxExti(QlPeripheral):
 
             return
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
 
     def send_interrupt(self, index):
         if 0 <= index < 20 and (self.instance.IMR >> index) & 1:
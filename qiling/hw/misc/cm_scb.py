@@ -4,8 +4,6 @@
 #
 
 
-import ctypes
-
 from qiling.hw.peripheral import QlPeripheral
 from qiling.arch.cortex_m_const import IRQ
 
@@ -93,9 +91,7 @@ class CortexMScb(QlPeripheral):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -103,5 +99,4 @@ class CortexMScb(QlPeripheral):
             if (value >> 28) & 1:
                 self.ql.hw.nvic.set_pending(IRQ.PENDSV)                
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
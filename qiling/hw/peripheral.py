@@ -4,7 +4,9 @@
 #
 
 import ctypes
-from typing import List, Tuple
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from qiling.core import Qiling
 from qiling.const import QL_INTERCEPT
@@ -12,9 +14,17 @@ from qiling.exception import QlErrorBase
 from qiling.hw.utils.access import Access, Action
 
 
+# register offset -> (field name, width, value mask, getter, setter)
+Accessors = Dict[int, Tuple[str, int, int, Callable[[Any], int], Callable[[Any, int], None]]]
+
+
 class QlPeripheralUtils:
     def __init__(self):
         self.verbose = False
+
+        # whether there are any user hooks, so accesses can skip them altogether
+        self.read_hooked = False
+        self.write_hooked = False
         
         self.user_read = {
             QL_INTERCEPT.ENTER: [],
@@ -34,18 +44,23 @@ class QlPeripheralUtils:
     def hook_read(self, callback, user_data=None, intercept=QL_INTERCEPT.ENTER):
         hook_function = (callback, user_data)
         self.user_read[intercept].append(hook_function)
+        self.read_hooked = True
         return (0, intercept, hook_function)
 
     def hook_write(self, callback, user_data=None, intercept=QL_INTERCEPT.ENTER):
         hook_function = (callback, user_data)
         self.user_write[intercept].append(hook_function)
+        self.write_hooked = True
         return (1, intercept, hook_function)
 
     def hook_del(self, hook_struct):
         hook_type, hook_flag, hook_function = hook_struct
-        mapper = self.user_read if hook_type else self.user_write
+        mapper = self.user_write if hook_type else self.user_read
         mapper[hook_flag].remove(hook_function)
 
+        self.read_hooked = any(self.user_read.values())
+        self.write_hooked = any(self.user_write.values())
+
     def _hook_call(self, hook_list, access, offset, size, value=0):
         retval = None
         for callback, user_data in hook_list:
@@ -60,6 +75,9 @@ class QlPeripheralUtils:
     def monitor(width=4):
         def decorator(func):
             def read(self, offset: int, size: int) -> int:
+                if not (self.read_hooked or self.verbose):
+                    return func(self, offset, size)
+
                 self._hook_call(self.user_read[QL_INTERCEPT.ENTER], Action.READ, offset, size)
 
                 if self.user_read[QL_INTERCEPT.CALL]:
@@ -75,6 +93,9 @@ class QlPeripheralUtils:
                 return retval
 
             def write(self, offset: int, size: int, value: int):
+                if not (self.write_hooked or self.verbose):
+                    return func(self, offset, size, value)
+
                 self._hook_call(self.user_write[QL_INTERCEPT.ENTER], Action.WRITE, offset, size, value)
 
                 if self.verbose:
@@ -154,13 +175,85 @@ class QlPeripheral(QlPeripheralUtils):
         self.struct = type(self).Type
         self.instance = self.struct()
 
+        self.accessors = QlPeripheral.__compile_accessors(self.struct)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def __compile_accessors(struct) -> Accessors:
+        """ Generate accessors for all the integer registers of a peripheral structure,
+            nested ones included. This is done once per structure type.
+
+        Returns:
+            Accessors: Registers accessors, by offset
+        """
+
+        accessors = {}
+
+        def visit(ctype, offset: int, name: str, getter: Optional[Callable]):
+            if issubclass(ctype, ctypes.Array):
+                for i in range(ctype._length_):
+                    item_getter = lambda instance, g=getter, i=i: g(instance)[i]
+                    item_setter = lambda instance, value, g=getter, i=i: g(instance).__setitem__(i, value)
+
+                    visit_item(ctype._type_, offset + i * ctypes.sizeof(ctype._type_), f'{name}[{i}]', item_getter, item_setter)
+
+            elif issubclass(ctype, ctypes.Structure):
+                prefix = f'{name}.' if name.endswith(']') else name
+
+                for field in ctype._fields_:
+                    # bit fields are left to the generic memory access
+                    if len(field) != 2:
+                        continue
+
+                    fname, ftype = field
+
+                    if getter is None:
+                        field_getter = attrgetter(fname)
+                        field_setter = lambda instance, value, n=fname: setattr(instance, n, value)
+                    else:
+                        field_getter = lambda instance, g=getter, n=fname: getattr(g(instance), n)
+                        field_setter = lambda instance, value, g=getter, n=fname: setattr(g(instance), n, value)
+
+                    visit_item(ftype, offset + getattr(ctype, fname).offset, prefix + fname, field_getter, field_setter)
+
+        def visit_item(ctype, offset: int, name: str, getter: Callable, setter: Callable):
+            if issubclass(ctype, (ctypes.Array, ctypes.Structure)):
+                visit(ctype, offset, name, getter)
+
+            # integer types only; a byte string or a float would not fit in a register value
+            elif getattr(ctype, '_type_', None) in tuple('bBhHiIlLqQ'):
+                width = ctypes.sizeof(ctype)
+
+                accessors[offset] = (name, width, (1 << (width * 8)) - 1, getter, setter)
+
+        # structures with a non-native byte order are left to the generic memory access
+        if issubclass(struct, ctypes.Structure):
+            visit(struct, 0, '', None)
+
+        return accessors
+
     def raw_read(self, offset: int, size: int) -> int:
+        accessor = self.accessors.get(offset)
+
+        if accessor is not None and accessor[1] == size:
+            _, _, mask, getter, _ = accessor
+
+            return getter(self.instance) & mask
+
         buf = ctypes.create_string_buffer(size)
         ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
 
         return int.from_bytes(buf.raw, byteorder='little')
 
     def raw_write(self, offset: int, size: int, value: int):
+        accessor = self.accessors.get(offset)
+
+        if accessor is not None and accessor[1] == size:
+            _, _, mask, _, setter = accessor
+
+            setter(self.instance, value & mask)
+            return
+
         data = (value).to_bytes(size, 'little')
         ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
     
@@ -172,6 +265,26 @@ class QlPeripheral(QlPeripheralUtils):
     def write(self, offset: int, size: int, value: int):
         self.raw_write(offset, size, value)
 
+    def advance(self, cycles: int):
+        """ Bring the peripheral state forward by a number of cycles at once.
+            This is only called for peripherals that have a `step` method.
+
+            The default implementation steps the peripheral once, which is good
+            enough for peripherals that only poll their inputs. Peripherals whose
+            state depends on the elapsed time should override it so that advancing
+            by `cycles` has the same effect as stepping `cycles` times.
+        """
+        if cycles > 0:
+            self.step()
+
+    def next_event(self) -> Optional[int]:
+        """ 
+        Returns:
+            Optional[int]: Number of cycles until the peripheral raises its next interrupt,
+            or None if there is no such event in sight
+        """
+        return None
+
     def contain(self, field, offset: int, size: int) -> bool:
         """ 
         Returns:
@@ -187,6 +300,11 @@ class QlPeripheral(QlPeripheralUtils):
             str: Field description
         """
 
+        accessor = self.accessors.get(offset)
+
+        if accessor is not None and accessor[1] == size:
+            return accessor[0]
+
         result = []
 
         def parse_array(struct, left, right, prefix):
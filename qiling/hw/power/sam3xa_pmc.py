@@ -67,9 +67,7 @@ class SAM3xaPmc(QlPeripheral):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:        
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
@@ -91,5 +89,4 @@ class SAM3xaPmc(QlPeripheral):
             if value & CKGR_UCKR.UPLLEN:
                 self.instance.SR |= SR.LOCKU
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
\ No newline at end of file
+        self.raw_write(offset, size, value)
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+import heapq
+import itertools
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class QlHwScheduler:
+    """ Peripheral events queue, keyed by the emulated cycles count.
+
+        Every peripheral has at most one pending event. Rescheduling or canceling
+        an event leaves its stale entry in the queue, where it is skipped once it
+        reaches the head.
+    """
+
+    def __init__(self):
+        self.queue: List[Tuple[int, int, str]] = []
+
+        # label -> (deadline, token) of the peripheral pending event
+        self.pending: Dict[str, Tuple[int, int]] = {}
+
+        self.__token = itertools.count()
+
+    def schedule(self, label: str, deadline: int):
+        """ Set the peripheral event, replacing its previous one (if any).
+
+        Args:
+            label (str): Peripheral label
+            deadline (int): Cycles count to wake the peripheral at
+        """
+
+        token = next(self.__token)
+
+        self.pending[label] = (deadline, token)
+        heapq.heappush(self.queue, (deadline, token, label))
+
+        # do not let stale entries pile up
+        if len(self.queue) > 2 * len(self.pending) + 16:
+            self.queue = [(deadline, token, label) for label, (deadline, token) in self.pending.items()]
+            heapq.heapify(self.queue)
+
+    def cancel(self, label: str):
+        """ Drop the peripheral event (if any).
+        """
+
+        self.pending.pop(label, None)
+
+    def __stale(self, entry: Tuple[int, int, str]) -> bool:
+        deadline, token, label = entry
+
+        return self.pending.get(label) != (deadline, token)
+
+    def peek(self) -> Optional[int]:
+        """ Get the earliest deadline.
+
+        Returns:
+            Optional[int]: Cycles count, or None if there are no events
+        """
+
+        while self.queue and self.__stale(self.queue[0]):
+            heapq.heappop(self.queue)
+
+        return self.queue[0][0] if self.queue else None
+
+    def due(self, cycles: int) -> Iterator[str]:
+        """ Pop the events that are due, earliest first.
+
+        Args:
+            cycles (int): Current cycles count
+
+        Returns:
+            Iterator[str]: Labels of the peripherals to wake
+        """
+
+        while self.queue and self.queue[0][0] <= cycles:
+            entry = heapq.heappop(self.queue)
+
+            if not self.__stale(entry):
+                label = entry[2]
+                del self.pending[label]
+
+                yield label
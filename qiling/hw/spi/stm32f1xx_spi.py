@@ -62,8 +62,7 @@ class STM32F1xxSpi(QlConnectivityPeripheral):
             self.send_to_user(value)
 
         else:
-            data = (value).to_bytes(size, 'little')
-            ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)           
+            self.raw_write(offset, size, value)
 
     def send_interrupt(self):
         self.ql.hw.nvic.set_pending(self.intn)
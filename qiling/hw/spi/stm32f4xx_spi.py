@@ -98,8 +98,7 @@ class STM32F4xxSpi(QlConnectivityPeripheral):
         elif offset == self.struct.I2SPR.offset:
             value &= SPI_I2SPR.RW_MASK
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)   
+        self.raw_write(offset, size, value)
 
         if self.contain(self.struct.DR, offset, size):
             self.send_to_user(self.instance.DR)
@@ -4,6 +4,7 @@
 #
 
 import ctypes
+from typing import Optional
 from qiling.arch.cortex_m_const import IRQ
 from qiling.hw.peripheral import QlPeripheral
 from qiling.hw.timer.timer import QlTimerPeripheral
@@ -41,6 +42,51 @@ class CortexMSysTick(QlTimerPeripheral):
                 if self.instance.CTRL & SYSTICK_CTRL.TICKINT:
                     self.ql.hw.nvic.set_pending(IRQ.SYSTICK)
 
+    def advance(self, cycles: int):
+        if not self.instance.CTRL & SYSTICK_CTRL.ENABLE:
+            return
+
+        expired = False
+
+        while cycles > 0:
+            if self.instance.VAL <= 0:
+                self.instance.CTRL |= SYSTICK_CTRL.COUNTFLAG
+                self.instance.VAL = self.instance.LOAD
+                cycles -= 1
+
+                if self.instance.LOAD <= 0:
+                    break
+
+            else:
+                # count down as far as the elapsed cycles go, but no further than zero
+                ticks = min(cycles, -(-self.instance.VAL // self.ratio))
+
+                self.instance.VAL -= ticks * self.ratio
+                cycles -= ticks
+
+                expired |= self.instance.VAL <= 0
+
+        # the counter may have wrapped more than once if it was enabled in the
+        # middle of a run quantum; that still makes a single pending interrupt
+        if expired and self.instance.CTRL & SYSTICK_CTRL.TICKINT:
+            self.ql.hw.nvic.set_pending(IRQ.SYSTICK)
+
+    def next_event(self) -> Optional[int]:
+        if not self.instance.CTRL & SYSTICK_CTRL.ENABLE:
+            return None
+
+        if not self.instance.CTRL & SYSTICK_CTRL.TICKINT:
+            return None
+
+        if self.instance.VAL > 0:
+            return -(-self.instance.VAL // self.ratio)
+
+        # reload first, then count down
+        if self.instance.LOAD > 0:
+            return 1 + -(-self.instance.LOAD // self.ratio)
+
+        return None
+
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
         buf = ctypes.create_string_buffer(size)
@@ -62,5 +108,4 @@ class CortexMSysTick(QlTimerPeripheral):
         if offset == self.struct.LOAD.offset:            
             self.instance.VAL = value
 
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)        
+        self.raw_write(offset, size, value)
@@ -64,3 +64,35 @@ class MK64F12Ftm(QlTimerPeripheral):
                 self.instance.CNT -= self.ratio
                 if self.instance.CNT <= 0:                    
                     self.ql.hw.nvic.set_pending(self.intn)
+
+    def advance(self, cycles: int):
+        if not (self.instance.MODE & MODE.FTMEN and self.instance.SC & SC.CLKS):
+            return
+
+        expired = False
+
+        while cycles > 0:
+            if self.instance.CNT <= 0:
+                self.instance.CNT = 1000000 // ((self.instance.SC & SC.PS) + 1)
+                cycles -= 1
+
+            else:
+                ticks = min(cycles, -(-self.instance.CNT // self.ratio))
+
+                self.instance.CNT -= ticks * self.ratio
+                cycles -= ticks
+
+                expired |= self.instance.CNT <= 0
+
+        if expired:
+            self.ql.hw.nvic.set_pending(self.intn)
+
+    def next_event(self) -> Optional[int]:
+        if not (self.instance.MODE & MODE.FTMEN and self.instance.SC & SC.CLKS):
+            return None
+
+        if self.instance.CNT > 0:
+            return -(-self.instance.CNT // self.ratio)
+
+        # reload first, then count down
+        return 1 + -(-(1000000 // ((self.instance.SC & SC.PS) + 1)) // self.ratio)
@@ -86,14 +86,11 @@ class STM32F4xxTim(QlTimerPeripheral):
 
     @QlPeripheral.monitor()
     def read(self, offset: int, size: int) -> int:
-        buf = ctypes.create_string_buffer(size)
-        ctypes.memmove(buf, ctypes.addressof(self.instance) + offset, size)
-        return int.from_bytes(buf.raw, byteorder='little')
+        return self.raw_read(offset, size)
 
     @QlPeripheral.monitor()
     def write(self, offset: int, size: int, value: int):
-        data = (value).to_bytes(size, 'little')
-        ctypes.memmove(ctypes.addressof(self.instance) + offset, data, size)
+        self.raw_write(offset, size, value)
 
     def send_update_interrupt(self):
         if self.up_intn is None:
@@ -136,3 +133,71 @@ class STM32F4xxTim(QlTimerPeripheral):
 
             else:
                 self.prescale_count += 1
+
+    def advance(self, cycles: int):
+        if not self.instance.CR1 & TIM_CR1.CEN:
+            return
+
+        overflow = False
+
+        while cycles > 0:
+            if self.instance.CNT >= self.instance.ARR:
+                self.instance.CNT = 0
+                self.prescale_count = 0
+                overflow = True
+                cycles -= 1
+                continue
+
+            prescale = self.prescale
+
+            # the prescaler counter went past the prescaler value; the
+            # counter will not move anymore
+            if self.prescale_count > prescale:
+                self.prescale_count += cycles
+                break
+
+            ratio = self.ratio
+
+            # cycles to the next counter increment and between subsequent ones
+            first = prescale - self.prescale_count + 1
+            period = prescale + 1
+
+            if cycles < first:
+                self.prescale_count += cycles
+                break
+
+            # increments to go before the counter reaches its reload value
+            remaining = -(-(self.instance.ARR - self.instance.CNT) // ratio)
+            increments = min(remaining, 1 + (cycles - first) // period)
+
+            self.instance.CNT += increments * ratio
+            self.prescale_count = 0
+            cycles -= first + (increments - 1) * period
+
+            if increments < remaining:
+                self.prescale_count = cycles
+                break
+
+        # the counter may have overflowed more than once if it was enabled in
+        # the middle of a run quantum; that still makes a single update event
+        if overflow:
+            self.send_update_interrupt()
+
+    def next_event(self) -> Optional[int]:
+        if not self.instance.CR1 & TIM_CR1.CEN:
+            return None
+
+        if self.up_intn is None or not self.instance.DIER & TIM_DIER.UIE:
+            return None
+
+        if self.instance.CNT >= self.instance.ARR:
+            return 1
+
+        prescale = self.prescale
+        if self.prescale_count > prescale:
+            return None
+
+        remaining = -(-(self.instance.ARR - self.instance.CNT) // self.ratio)
+
+        # count up to the reload value, then overflow
+        return (prescale - self.prescale_count + 1) + (remaining - 1) * (prescale + 1) + 1
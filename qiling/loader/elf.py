@@ -7,7 +7,7 @@ import io
 import os
 
 from enum import IntEnum
-from typing import AnyStr, Optional, Sequence, Mapping, Tuple
+from typing import AnyStr, Iterator, Optional, Sequence, Mapping, Tuple, Union
 
 from elftools.common.utils import preserve_stream_pos
 from elftools.elf.constants import P_FLAGS, SH_FLAGS
@@ -21,6 +21,7 @@ from qiling import Qiling
 from qiling.const import QL_ARCH, QL_ENDIAN, QL_OS
 from qiling.exception import QlErrorELFFormat, QlMemoryMappedError
 from qiling.loader.loader import QlLoader, Image
+from qiling.loader.elf_cache import QlElfCache, QlElfImage, shared_cache
 from qiling.os.linux.function_hook import FunctionHook
 from qiling.os.linux.syscall_nums import SYSCALL_NR
 from qiling.os.linux.kernel_api.hook import *
@@ -66,9 +67,64 @@ SYSCALL_SIZE = 0x1000
 
 
 class QlLoaderELF(QlLoader):
-    def __init__(self, ql: Qiling):
+    def __init__(self, ql: Qiling, libcache: Union[bool, QlElfCache] = False):
         super().__init__(ql)
 
+        # loaded elf files may be served from a cache instance, or the process-wide one
+        if isinstance(libcache, QlElfCache):
+            self.libcache = libcache
+        else:
+            self.libcache = shared_cache if libcache else None
+
+    def get_elf_image(self, path: str, elffile: Optional[ELFFile] = None) -> QlElfImage:
+        """Get the loading information of an ELF file, either from cache or by
+        parsing it.
+
+        Args:
+            path: host path of the ELF file
+            elffile: the ELF file, in case it was already opened
+
+        Returns: ELF file image
+        """
+
+        if self.libcache:
+            return self.libcache.get(path)
+
+        if elffile is not None:
+            return QlElfImage.from_elffile(elffile)
+
+        with open(path, 'rb') as infile:
+            return QlElfImage.from_elffile(ELFFile(infile))
+
+    @staticmethod
+    def elf_symbols(path: str, load_address: int) -> Iterator[Tuple[str, int]]:
+        """Enumerate the defined symbols of an ELF file.
+
+        Args:
+            path: host path of the ELF file
+            load_address: base address the file was loaded to
+
+        Returns: an iterator of symbol names and their absolute addresses
+        """
+
+        with open(path, 'rb') as infile:
+            elffile = ELFFile(infile)
+
+            # prefer the full symbols table over the dynamic one, if available
+            for secname in ('.symtab', '.dynsym'):
+                symtab = elffile.get_section_by_name(secname)
+
+                if not isinstance(symtab, SymbolTableSection):
+                    continue
+
+                for sym in symtab.iter_symbols():
+                    # skip undefined symbols and arm mapping symbols ($a, $t, $d, etc.)
+                    if not sym.name or sym.name.startswith('$') or sym['st_shndx'] == 'SHN_UNDEF':
+                        continue
+
+                    if sym['st_value'] and sym['st_info']['type'] in ('STT_FUNC', 'STT_OBJECT', 'STT_NOTYPE'):
+                        yield sym.name, load_address + sym['st_value']
+
     def run(self):
         if self.ql.code:
             self.ql.mem.map(self.ql.os.entry_point, self.ql.os.code_ram_size, info="[shellcode_stack]")
@@ -107,13 +163,13 @@ class QlLoaderELF(QlLoader):
         elif elftype == 'ET_EXEC':
             load_address = 0
 
-            self.load_with_ld(elffile, top_of_stack, load_address, self.argv, self.env)
+            self.load_with_ld(self.get_elf_image(self.path, elffile), top_of_stack, load_address, self.argv, self.env)
 
         # is it a shared object?
         elif elftype == 'ET_DYN':
             load_address = self.profile.getint('load_address')
 
-            self.load_with_ld(elffile, top_of_stack, load_address, self.argv, self.env)
+            self.load_with_ld(self.get_elf_image(self.path, elffile), top_of_stack, load_address, self.argv, self.env)
 
         else:
             raise QlErrorELFFormat(f'unexpected elf type value (e_type = {elftype})')
@@ -146,11 +202,11 @@ class QlLoaderELF(QlLoader):
 
         return prot
 
-    def load_with_ld(self, elffile: ELFFile, stack_addr: int, load_address: int, argv: Sequence[str] = [], env: Mapping[AnyStr, AnyStr] = {}):
+    def load_with_ld(self, elffile: QlElfImage, stack_addr: int, load_address: int, argv: Sequence[str] = [], env: Mapping[AnyStr, AnyStr] = {}):
 
-        def load_elf_segments(elffile: ELFFile, load_address: int, info: str):
+        def load_elf_segments(elffile: QlElfImage, load_address: int, info: str):
             # get list of loadable segments; these segments will be loaded to memory
-            load_segments = sorted(elffile.iter_segments(type='PT_LOAD'), key=lambda s: s['p_vaddr'])
+            load_segments = elffile.segments
 
             # determine the memory regions that need to be mapped in order to load the segments.
             # note that region boundaries are aligned to page, which means they may be larger than
@@ -160,9 +216,9 @@ class QlLoaderELF(QlLoader):
 
             # iterate over loadable segments
             for seg in load_segments:
-                lbound = self.ql.mem.align(load_address + seg['p_vaddr'])
-                ubound = self.ql.mem.align_up(load_address + seg['p_vaddr'] + seg['p_memsz'])
-                perms = QlLoaderELF.seg_perm_to_uc_prot(seg['p_flags'])
+                lbound = self.ql.mem.align(load_address + seg.vaddr)
+                ubound = self.ql.mem.align_up(load_address + seg.vaddr + seg.memsz)
+                perms = QlLoaderELF.seg_perm_to_uc_prot(seg.flags)
 
                 if load_regions:
                     prev_lbound, prev_ubound, prev_perms = load_regions[-1]
@@ -198,22 +254,46 @@ class QlLoaderELF(QlLoader):
                 else:
                     load_regions.append((lbound, ubound, perms))
 
+            # there might be a region with zero size. in this case, do not mmap it
+            load_regions = [(lbound, ubound, perms) for lbound, ubound, perms in load_regions if ubound > lbound]
+
+            # cached images can have their contents mapped directly from host pages, sparing the
+            # need to copy them. that is possible only if all regions can be mapped that way
+            hosts = []
+
+            for lbound, ubound, _ in load_regions:
+                host = elffile.host_pages(lbound - load_address, ubound - lbound)
+
+                if host is None:
+                    for h in hosts:
+                        h.close()
+
+                    hosts = []
+                    break
+
+                hosts.append(host)
+
             # map the memory regions
-            for lbound, ubound, perms in load_regions:
+            for i, (lbound, ubound, perms) in enumerate(load_regions):
                 size = ubound - lbound
 
-                # there might be a region with zero size. in this case, do not mmap it
-                if size:
-                    try:
-                        self.ql.mem.map(lbound, size, perms, os.path.basename(info))
-                    except QlMemoryMappedError:
-                        self.ql.log.exception(f'Failed to map {lbound:#x}-{ubound:#x}')
+                try:
+                    if hosts:
+                        self.ql.mem.map_host(lbound, size, hosts[i], perms, os.path.basename(info))
                     else:
-                        self.ql.log.debug(f'Mapped {lbound:#x}-{ubound:#x}')
+                        self.ql.mem.map(lbound, size, perms, os.path.basename(info))
+                except QlMemoryMappedError:
+                    self.ql.log.exception(f'Failed to map {lbound:#x}-{ubound:#x}')
 
-            # load loadable segments contents to memory
-            for seg in load_segments:
-                self.ql.mem.write(load_address + seg['p_vaddr'], seg.data())
+                    if hosts:
+                        hosts[i].close()
+                else:
+                    self.ql.log.debug(f'Mapped {lbound:#x}-{ubound:#x}')
+
+            # load loadable segments contents to memory, unless they are already there
+            if not hosts:
+                for i, seg in enumerate(load_segments):
+                    self.ql.mem.write(load_address + seg.vaddr, elffile.data(i))
 
             return load_regions[0][0], load_regions[-1][1]
 
@@ -225,13 +305,13 @@ class QlLoaderELF(QlLoader):
 
         # by convention the loaded binary is first on the list
         self.images.append(Image(mem_start, mem_end, os.path.abspath(self.path)))
+        self.symbols.add_source(lambda: QlLoaderELF.elf_symbols(self.path, load_address), mem_start)
 
         # note: 0x2000 is the size of [hook_mem]
         self.brk_address = mem_end + 0x2000
 
         # determine interpreter path
-        interp_seg = next(elffile.iter_segments(type='PT_INTERP'), None)
-        interp_path = str(interp_seg.get_interp_name()) if interp_seg else ''
+        interp_path = elffile.interp
 
         interp_address = 0
 
@@ -245,24 +325,24 @@ class QlLoaderELF(QlLoader):
             if not self.ql.os.path.is_safe_host_path(interp_hpath):
                 raise PermissionError(f'unsafe path: {interp_hpath}')
 
-            with open(interp_hpath, 'rb') as infile:
-                interp = ELFFile(infile)
-                min_vaddr = min(seg['p_vaddr'] for seg in interp.iter_segments(type='PT_LOAD'))
+            interp = self.get_elf_image(interp_hpath)
+            min_vaddr = min(seg.vaddr for seg in interp.segments)
 
-                # determine interpreter base address
-                # some old interpreters may not be PIE: p_vaddr of the first LOAD segment is not zero
-                # we should load interpreter at the address p_vaddr specified in such situation
-                interp_address = self.profile.getint('interp_address') if min_vaddr == 0 else 0
-                self.ql.log.debug(f'Interpreter addr: {interp_address:#x}')
+            # determine interpreter base address
+            # some old interpreters may not be PIE: p_vaddr of the first LOAD segment is not zero
+            # we should load interpreter at the address p_vaddr specified in such situation
+            interp_address = self.profile.getint('interp_address') if min_vaddr == 0 else 0
+            self.ql.log.debug(f'Interpreter addr: {interp_address:#x}')
 
-                # load interpreter segments data to memory
-                interp_start, interp_end = load_elf_segments(interp, interp_address, interp_vpath)
+            # load interpreter segments data to memory
+            interp_start, interp_end = load_elf_segments(interp, interp_address, interp_vpath)
 
-                # add interpreter to the loaded images list
-                self.images.append(Image(interp_start, interp_end, interp_hpath))
+            # add interpreter to the loaded images list
+            self.images.append(Image(interp_start, interp_end, interp_hpath))
+            self.symbols.add_source(lambda: QlLoaderELF.elf_symbols(interp_hpath, interp_address), interp_start)
 
-                # determine entry point
-                entry_point = interp_address + interp['e_entry']
+            # determine entry point
+            entry_point = interp_address + interp['e_entry']
 
         # set mmap addr
         mmap_address = self.profile.getint('mmap_address')
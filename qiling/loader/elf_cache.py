@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+"""Shared cache of parsed ELF files.
+
+Loading an ELF file requires parsing its headers and copying its loadable segments to
+memory, which becomes wasteful when many Qiling instances load the same files (e.g. the
+same interpreter and libraries) over and over. The cache parses every distinct file only
+once, and lays out its loadable segments in a pages file the way they should appear in
+memory. Loaders then map that pages file to emulated memory as private copy-on-write host
+mappings, so unmodified pages are shared among all instances rather than copied.
+
+Cache entries are addressed by the files content, and kept for the lifetime of the process.
+When a cache directory is specified, entries are also stored there so other processes may
+use them as well; a directory on a memory-backed filesystem (e.g. /dev/shm) is recommended.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import pickle
+import tempfile
+
+from threading import Lock
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from elftools.elf.elffile import ELFFile
+
+
+class QlElfSegment(NamedTuple):
+    vaddr: int
+    memsz: int
+    filesz: int
+    flags: int
+
+
+class QlElfImage:
+    """ELF file metadata required for loading it to memory, along with the contents of
+    its loadable segments.
+    """
+
+    # header fields to keep
+    HEADER_FIELDS = ('e_type', 'e_entry', 'e_phoff', 'e_phentsize', 'e_phnum')
+
+    def __init__(self, header: Mapping[str, Any], interp: str, segments: Sequence[QlElfSegment], contents: Sequence[bytes] = ()):
+        self.header = dict(header)
+        self.interp = interp
+
+        # loadable segments, sorted by their virtual address
+        self.segments = tuple(segments)
+
+        self.__contents = tuple(contents)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.header[name]
+
+    @classmethod
+    def from_elffile(cls, elffile: ELFFile) -> QlElfImage:
+        header = {name: elffile[name] for name in QlElfImage.HEADER_FIELDS}
+
+        interp_seg = next(elffile.iter_segments(type='PT_INTERP'), None)
+        interp = str(interp_seg.get_interp_name()) if interp_seg else ''
+
+        load_segments = sorted(elffile.iter_segments(type='PT_LOAD'), key=lambda s: s['p_vaddr'])
+
+        segments = [QlElfSegment(seg['p_vaddr'], seg['p_memsz'], seg['p_filesz'], seg['p_flags']) for seg in load_segments]
+        contents = [seg.data() for seg in load_segments]
+
+        return cls(header, interp, segments, contents)
+
+    def data(self, index: int) -> bytes:
+        """Get the file content of a loadable segment.
+        """
+
+        return self.__contents[index]
+
+    def host_pages(self, vaddr: int, size: int) -> Optional[mmap.mmap]:
+        """Get a private host mapping of the loadable segments contents in the specified
+        memory range, as it should appear in memory.
+
+        Returns: a copy-on-write host mapping, or `None` if the contents are not backed by
+        pages that can be mapped from the host
+        """
+
+        return None
+
+
+class QlElfCachedImage(QlElfImage):
+    """An ELF image whose loadable segments contents are backed by a pages file.
+    """
+
+    def __init__(self, header: Mapping[str, Any], interp: str, segments: Sequence[QlElfSegment], base: int, fd: int):
+        super().__init__(header, interp, segments)
+
+        # virtual address that corresponds to the pages file start
+        self.base = base
+        self.fd = fd
+
+    def data(self, index: int) -> bytes:
+        seg = self.segments[index]
+
+        return os.pread(self.fd, seg.filesz, seg.vaddr - self.base)
+
+    def host_pages(self, vaddr: int, size: int) -> Optional[mmap.mmap]:
+        offset = vaddr - self.base
+
+        if offset < 0 or offset % mmap.ALLOCATIONGRANULARITY:
+            return None
+
+        try:
+            return mmap.mmap(self.fd, size, access=mmap.ACCESS_COPY, offset=offset)
+        except (OSError, ValueError):
+            return None
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class QlElfCache:
+    """A content-addressed cache of ELF images.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """Initialize a cache instance.
+
+        Args:
+            directory: a directory to share cache entries with other processes through,
+            or `None` to keep cache entries private to the current process
+        """
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+
+        self.images: Dict[str, QlElfCachedImage] = {}
+
+        # file contents digests, keyed by their identity and modification time. this saves
+        # the need to hash files that were already seen and did not change since
+        self.digests: Dict[Tuple[int, int, int, int], str] = {}
+
+        self.__lock = Lock()
+
+    @staticmethod
+    def __digest(path: str) -> str:
+        h = hashlib.sha256()
+
+        with open(path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(0x100000), b''):
+                h.update(chunk)
+
+        return h.hexdigest()
+
+    def __entry_path(self, digest: str, ext: str) -> str:
+        assert self.directory is not None
+
+        return os.path.join(self.directory, f'{digest}.{ext}')
+
+    def __restore(self, digest: str) -> Optional[QlElfCachedImage]:
+        fmeta = self.__entry_path(digest, 'meta')
+        fpages = self.__entry_path(digest, 'pages')
+
+        # the metadata file is stored last, so if it exists the pages file is complete
+        try:
+            with open(fmeta, 'rb') as infile:
+                header, interp, segments, base = pickle.load(infile)
+
+            fd = os.open(fpages, os.O_RDONLY)
+        except (OSError, pickle.UnpicklingError, ValueError):
+            return None
+
+        return QlElfCachedImage(header, interp, [QlElfSegment(*seg) for seg in segments], base, fd)
+
+    def __store(self, path: str, digest: str) -> QlElfCachedImage:
+        with open(path, 'rb') as infile:
+            image = QlElfImage.from_elffile(ELFFile(infile))
+
+        segments = image.segments
+
+        # lay out segments contents as they appear in memory. the pages file starts at the
+        # first segment allocation unit, so memory pages may be mapped from it directly
+        gran = mmap.ALLOCATIONGRANULARITY
+
+        base = (segments[0].vaddr & ~(gran - 1)) if segments else 0
+        size = max((seg.vaddr + seg.memsz for seg in segments), default=base) - base
+
+        if self.directory is None:
+            fd = os.memfd_create(f'qiling-{digest[:16]}') if hasattr(os, 'memfd_create') else None
+
+            if fd is None:
+                with tempfile.TemporaryFile() as tmp:
+                    fd = os.dup(tmp.fileno())
+
+        else:
+            fd, tmpname = tempfile.mkstemp(dir=self.directory)
+
+        # areas not covered by segments contents are left as holes, and read as zeros
+        os.ftruncate(fd, (size + gran - 1) & ~(gran - 1))
+
+        for i, seg in enumerate(segments):
+            os.pwrite(fd, image.data(i), seg.vaddr - base)
+
+        if self.directory is not None:
+            os.replace(tmpname, self.__entry_path(digest, 'pages'))
+
+            fd_meta, tmpname = tempfile.mkstemp(dir=self.directory)
+
+            with os.fdopen(fd_meta, 'wb') as outfile:
+                pickle.dump((image.header, image.interp, [tuple(seg) for seg in segments], base), outfile)
+
+            os.replace(tmpname, self.__entry_path(digest, 'meta'))
+
+        return QlElfCachedImage(image.header, image.interp, segments, base, fd)
+
+    def get(self, path: str) -> QlElfCachedImage:
+        """Get the image of an ELF file, parsing it only if it is not already cached.
+
+        Args:
+            path: host path of the ELF file
+
+        Returns: ELF file image
+        """
+
+        st = os.stat(path)
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+        with self.__lock:
+            digest = self.digests.get(key)
+
+            if digest is None:
+                digest = self.digests[key] = QlElfCache.__digest(path)
+
+            image = self.images.get(digest)
+
+            if image is None:
+                if self.directory is not None:
+                    image = self.__restore(digest)
+
+                if image is None:
+                    image = self.__store(path, digest)
+
+                self.images[digest] = image
+
+        return image
+
+    def clear(self) -> None:
+        """Drop all cache entries kept by this process. Memory ranges that were already
+        mapped from them are not affected.
+        """
+
+        with self.__lock:
+            for image in self.images.values():
+                image.close()
+
+            self.images.clear()
+            self.digests.clear()
+
+
+# process-wide cache instance
+shared_cache = QlElfCache()
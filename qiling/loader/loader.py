@@ -8,6 +8,8 @@ from __future__ import annotations
 import os
 from typing import TYPE_CHECKING, Any, Mapping, MutableSequence, NamedTuple, Optional
 
+from qiling.loader.symbols import QlSymbolResolver
+
 if TYPE_CHECKING:
     from qiling import Qiling
 
@@ -26,13 +28,18 @@ class QlLoader:
         self.images: MutableSequence[Image] = []
         self.skip_exit_check = False
 
+        # symbols of the loaded images; populated by the loaders
+        self.symbols = QlSymbolResolver(self)
+
     def find_containing_image(self, address: int) -> Optional[Image]:
         """Retrieve the image object that contains the specified address.
 
         Returns: image containing the specified address, or `None` if not found
         """
 
-        return next((image for image in self.images if image.base <= address < image.end), None)
+        found = self.symbols.find_image(address)
+
+        return found and found[1]
 
     def get_image_by_name(self, name: str, *, casefold: bool = False) -> Optional[Image]:
         """Retrieve an image by its basename.
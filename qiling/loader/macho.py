@@ -280,6 +280,10 @@ class QlLoaderMACHO(QlLoader):
         num = self.macho_file.dysymbol_table.defext_num
         self.kext_extern_symbols = self.macho_file.symbol_table.details(index, num, self.macho_file.string_table)
 
+        # kext symbols, along with the kernel symbols it was linked against
+        self.symbols.add_source(lambda: ((name.decode('ascii'), loadbase + sym['n_value']) for symtab in (self.kext_local_symbols, self.kext_extern_symbols) for name, sym in symtab.items()))
+        self.symbols.add_source(lambda: ((name, address) for address, name in self.import_symbols.items()))
+
         if self.IOKit is True:
             # Get exported vtables
             self.vtables = {}
@@ -6,11 +6,16 @@
 from __future__ import annotations
 
 import os
+import mmap
 import pefile
-import pickle
 import secrets
+import sys
+import tempfile
 import ntpath
-from typing import TYPE_CHECKING, Any, Dict, MutableMapping, NamedTuple, Optional, Mapping, Sequence, Tuple, Union
+import hashlib
+from array import array
+from struct import Struct, error as StructError
+from typing import TYPE_CHECKING, Any, Dict, List, MutableMapping, NamedTuple, Optional, Mapping, Sequence, Tuple, Union
 
 from unicorn import UcError
 from unicorn.x86_const import UC_X86_REG_CR4, UC_X86_REG_CR8
@@ -32,38 +37,227 @@ if TYPE_CHECKING:
 
 class QlPeCacheEntry(NamedTuple):
     ba: int
-    data: bytearray
-    cmdlines: Sequence
-    import_symbols: MutableMapping[int, dict]
-    import_table: MutableMapping[Union[str, int], int]
+    preferred: int
+    data: Union[bytearray, mmap.mmap]
+    relocs: Optional[Tuple[Sequence[int], Sequence[int]]]
+    exports: Sequence[Tuple[int, int, Optional[bytes]]]
 
 
 class QlPeCache:
-    @staticmethod
-    def cache_filename(path: str) -> str:
+    """Cache DLL images as they are mapped to memory, along with their base relocations
+    and exported symbols. A cached image may be loaded to any base address without parsing
+    the DLL again: it is rebased in bulk by applying the relocations delta.
+
+    Cache files are stored either next to the cached DLLs or in a central directory, e.g.
+    when the rootfs is read-only. Cached images are mapped from the cache files as private
+    copy-on-write host mappings, so they are not copied unless modified.
+    """
+
+    # magic, version, flags, source size, source mtime, image base, preferred image base, image size,
+    # 32-bit relocations count, 64-bit relocations count, exports count, names pool size, data offset
+    HEADER = Struct('<4sIIQQQQQIIIIQ')
+
+    # rva, ordinal, name offset, name length
+    EXPORT = Struct('<IIII')
+
+    MAGIC = b'QLPC'
+    VERSION = 3
+
+    # image has relocations info and may be rebased
+    FLAG_REBASABLE = 1
+
+    # marks exports that have no name
+    NONAME = 0xffffffff
+
+    def __init__(self, directory: Optional[str] = None):
+        """Initialize a cache instance.
+
+        Args:
+            directory: a central directory to keep cache files in, or `None` to keep them
+            next to the cached DLLs
+        """
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+
+    def cache_filename(self, path: str) -> str:
         dirname, basename = os.path.split(path)
 
-        # canonicalize basename while preserving the path
-        path = os.path.join(dirname, basename.casefold())
+        if self.directory is None:
+            # canonicalize basename while preserving the path
+            path = os.path.join(dirname, basename.casefold())
+
+        else:
+            # tell apart same named dlls of different rootfs
+            tag = hashlib.sha1(os.path.abspath(dirname).encode()).hexdigest()[:16]
+
+            path = os.path.join(self.directory, f'{basename.casefold()}.{tag}')
+
+        return f'{path}.cache3'
+
+    @staticmethod
+    def __load_array(buffer, count: int) -> array:
+        arr = array('I')
+        arr.frombytes(buffer[:count * arr.itemsize])
+
+        if sys.byteorder != 'little':
+            arr.byteswap()
 
-        return f'{path}.cache2'
+        return arr
 
     def restore(self, path: str) -> Optional[QlPeCacheEntry]:
-        fcache = QlPeCache.cache_filename(path)
+        fcache = self.cache_filename(path)
 
-        # check whether cache file exists and it is not older than the cached file itself
-        if os.path.exists(fcache) and os.stat(fcache).st_mtime > os.stat(path).st_mtime:
-            with open(fcache, "rb") as fcache_file:
-                return QlPeCacheEntry(*pickle.load(fcache_file))
+        try:
+            st = os.stat(path)
+
+            with open(fcache, 'rb') as fcache_file:
+                meta = mmap.mmap(fcache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+                with meta, memoryview(meta) as buffer:
+                    magic, version, flags, src_size, src_mtime, ba, preferred, image_size, nreloc32, nreloc64, nexports, npool, data_offset = QlPeCache.HEADER.unpack_from(buffer)
+
+                    # cache file should match the dll it was created for
+                    if (magic, version, src_size, src_mtime) != (QlPeCache.MAGIC, QlPeCache.VERSION, st.st_size, st.st_mtime_ns):
+                        return None
+
+                    offset = QlPeCache.HEADER.size
+
+                    reloc32 = QlPeCache.__load_array(buffer[offset:], nreloc32)
+                    offset += nreloc32 * 4
+
+                    reloc64 = QlPeCache.__load_array(buffer[offset:], nreloc64)
+                    offset += nreloc64 * 4
+
+                    exports_table = buffer[offset:offset + nexports * QlPeCache.EXPORT.size]
+                    offset += nexports * QlPeCache.EXPORT.size
+
+                    pool = bytes(buffer[offset:offset + npool])
+
+                    exports = [(rva, ordinal, None if name_offset == QlPeCache.NONAME else pool[name_offset:name_offset + name_length])
+                               for rva, ordinal, name_offset, name_length in QlPeCache.EXPORT.iter_unpack(exports_table)]
+
+                    del exports_table
 
-        return None
+                # map the image as a private copy, so it may be rebased and modified
+                data = mmap.mmap(fcache_file.fileno(), image_size, access=mmap.ACCESS_COPY, offset=data_offset)
+
+        except (OSError, ValueError, StructError):
+            return None
+
+        relocs = (reloc32, reloc64) if flags & QlPeCache.FLAG_REBASABLE else None
+
+        return QlPeCacheEntry(ba, preferred, data, relocs, exports)
 
     def save(self, path: str, entry: QlPeCacheEntry) -> None:
-        fcache = QlPeCache.cache_filename(path)
+        fcache = self.cache_filename(path)
+        st = os.stat(path)
+
+        reloc32, reloc64 = entry.relocs or ((), ())
+
+        pool = bytearray()
+        exports = bytearray()
 
-        # cache this dll file
-        with open(fcache, "wb") as fcache_file:
-            pickle.dump(entry, fcache_file)
+        for rva, ordinal, name in entry.exports:
+            if name is None:
+                exports.extend(QlPeCache.EXPORT.pack(rva, ordinal, QlPeCache.NONAME, 0))
+            else:
+                exports.extend(QlPeCache.EXPORT.pack(rva, ordinal, len(pool), len(name)))
+                pool.extend(name)
+
+        relocs = array('I', reloc32) + array('I', reloc64)
+
+        if sys.byteorder != 'little':
+            relocs.byteswap()
+
+        meta_size = QlPeCache.HEADER.size + len(relocs) * relocs.itemsize + len(exports) + len(pool)
+
+        # image data is aligned so it may be mapped directly from the cache file
+        gran = mmap.ALLOCATIONGRANULARITY
+        data_offset = (meta_size + gran - 1) & ~(gran - 1)
+
+        image_size = (len(entry.data) + mmap.PAGESIZE - 1) & ~(mmap.PAGESIZE - 1)
+
+        header = QlPeCache.HEADER.pack(
+            QlPeCache.MAGIC,
+            QlPeCache.VERSION,
+            QlPeCache.FLAG_REBASABLE if entry.relocs is not None else 0,
+            st.st_size,
+            st.st_mtime_ns,
+            entry.ba,
+            entry.preferred,
+            image_size,
+            len(reloc32),
+            len(reloc64),
+            len(entry.exports),
+            len(pool),
+            data_offset
+        )
+
+        # write to a temporary file first, so concurrent instances never see a partial file
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(fcache))
+
+        try:
+            with os.fdopen(fd, 'wb') as fcache_file:
+                fcache_file.write(header)
+                fcache_file.write(relocs.tobytes())
+                fcache_file.write(exports)
+                fcache_file.write(pool)
+
+                fcache_file.seek(data_offset)
+                fcache_file.write(entry.data)
+                fcache_file.truncate(data_offset + image_size)
+
+            os.replace(tmpname, fcache)
+        except OSError:
+            os.remove(tmpname)
+            raise
+
+    @staticmethod
+    def rebase(entry: QlPeCacheEntry, base: int) -> None:
+        """Relocate a cached image to a new base address, in place.
+        """
+
+        assert entry.relocs is not None, 'image cannot be rebased'
+
+        delta = base - entry.ba
+        data = entry.data
+
+        for fmt, rvas, mask in zip(('<I', '<Q'), entry.relocs, (0xffffffff, 0xffffffffffffffff)):
+            st = Struct(fmt)
+
+            unpack_from = st.unpack_from
+            pack_into = st.pack_into
+
+            for rva in rvas:
+                value, = unpack_from(data, rva)
+                pack_into(data, rva, (value + delta) & mask)
+
+        # keep the image base in the optional header in line with where the image is mapped
+        e_lfanew, = Struct('<I').unpack_from(data, 0x3c)
+
+        # skip the pe signature and the file header
+        opthdr = e_lfanew + 4 + 20
+        magic, = Struct('<H').unpack_from(data, opthdr)
+
+        if magic == pefile.OPTIONAL_HEADER_MAGIC_PE_PLUS:
+            Struct('<Q').pack_into(data, opthdr + 24, base)
+        else:
+            Struct('<I').pack_into(data, opthdr + 28, base)
+
+
+# DLLs that seem to contain most of the symbols of the api-ms-win-* virtual DLLs
+APISET_HOSTS = (
+    'ntdll.dll',
+    'kernelbase.dll',
+    'ucrtbase.dll'
+)
+
+# lazy DLL stubs are allocated in chunks of this size; each stub takes this many bytes
+LAZY_STUBS_CHUNK = 0x10000
+LAZY_STUB_SIZE = 0x10
 
 
 class Process:
@@ -79,6 +273,12 @@ class Process:
     export_symbols: MutableMapping[int, Dict[str, Any]]
     libcache: Optional[QlPeCache]
 
+    lazy_dlls: bool
+    lazy_stubs: MutableMapping[int, Tuple[str, Union[bytes, int], bool]]
+    lazy_slots: MutableMapping[str, List[Tuple[int, Union[bytes, int]]]]
+    lazy_iat: MutableMapping[str, MutableMapping[Union[bytes, int], int]]
+    lazy_inits: MutableMapping[str, Tuple[int, int, int]]
+
     def __init__(self, ql: Qiling):
         self.ql = ql
 
@@ -106,6 +306,57 @@ class Process:
 
         return self.ql.os.path.virtual_to_host_path(vpath), basename.casefold()
 
+    def __select_image_base(self, preferred: int, image_size: int) -> Tuple[int, bool]:
+        """Determine where a DLL should be loaded.
+
+        Args:
+            preferred: dll preferred base address, or 0 if it has none
+            image_size: dll image size in memory
+
+        Returns: selected base address, and whether the dll has to be relocated there
+        """
+
+        image_base = preferred or self.dll_last_address
+        relocate = False
+
+        self.ql.log.debug(f'DLL preferred base address: {image_base:#x}')
+
+        if (image_base + image_size) > self.ql.mem.max_mem_addr:
+            image_base = self.dll_last_address
+            self.ql.log.debug(f'DLL preferred base address exceeds memory upper bound, loading to: {image_base:#x}')
+            relocate = True
+
+        if not self.ql.mem.is_available(image_base, image_size):
+            image_base = self.ql.mem.find_free_space(image_size, minaddr=image_base, align=0x10000)
+            self.ql.log.debug(f'DLL preferred base address is taken, loading to: {image_base:#x}')
+            relocate = True
+
+        return image_base, relocate
+
+    @staticmethod
+    def get_relocs(pe: pefile.PE) -> Optional[Tuple[Sequence[int], Sequence[int]]]:
+        """Collect the rvas of a PE image base relocations, split by their size.
+
+        Returns: rvas of 32-bit and 64-bit relocations, or `None` if the image contains relocations
+        that cannot be applied in bulk
+        """
+
+        reloc32 = []
+        reloc64 = []
+
+        for block in getattr(pe, 'DIRECTORY_ENTRY_BASERELOC', []):
+            for reloc in block.entries:
+                if reloc.type == pefile.RELOCATION_TYPE['IMAGE_REL_BASED_HIGHLOW']:
+                    reloc32.append(reloc.rva)
+
+                elif reloc.type == pefile.RELOCATION_TYPE['IMAGE_REL_BASED_DIR64']:
+                    reloc64.append(reloc.rva)
+
+                elif reloc.type != pefile.RELOCATION_TYPE['IMAGE_REL_BASED_ABSOLUTE']:
+                    return None
+
+        return reloc32, reloc64
+
     def load_dll(self, name: str, is_driver: bool = False) -> int:
         dll_path, dll_name = self.__get_path_elements(name)
 
@@ -147,23 +398,25 @@ class Process:
         if cached:
             data = cached.data
 
-            image_base = cached.ba
             image_size = self.ql.mem.align_up(len(data))
+            image_base, _ = self.__select_image_base(cached.preferred, image_size)
 
-            # verify whether we can load the dll to the same address it was loaded when it was cached.
-            # if not, the dll will have to be realoded in order to have its symbols relocated using the
-            # new address
-            if self.ql.mem.is_available(image_base, image_size):
-                import_symbols = cached.import_symbols
-                import_table = cached.import_table
+            # a cached dll may be loaded to a different address if it can be rebased. if not, the
+            # dll will have to be reloaded in order to have its symbols relocated using the new address
+            if image_base == cached.ba or cached.relocs is not None:
+                if image_base != cached.ba:
+                    with ShowProgress(self.ql.log, 0.1337):
+                        QlPeCache.rebase(cached, image_base)
 
-                for entry in cached.cmdlines:
-                    self.set_cmdline(entry['name'], entry['address'], data)
+                exports = cached.exports
 
                 self.ql.log.info(f'Loaded {dll_name} from cache')
                 loaded = True
 
-        # either file was not cached, or could not be loaded to the same location in memory
+            elif isinstance(data, mmap.mmap):
+                data.close()
+
+        # either file was not cached, or could not be loaded to the chosen location in memory
         if not cached or not loaded:
             dll = pefile.PE(dll_path, fast_load=True)
             dll.parse_data_directories()
@@ -175,21 +428,11 @@ class Process:
                 for warning in warnings:
                     self.ql.log.debug(f' - {warning}')
 
-            image_base = dll.OPTIONAL_HEADER.ImageBase or self.dll_last_address
-            image_size = self.ql.mem.align_up(dll.OPTIONAL_HEADER.SizeOfImage)
-            relocate = False
-
-            self.ql.log.debug(f'DLL preferred base address: {image_base:#x}')
-
-            if (image_base + image_size) > self.ql.mem.max_mem_addr:
-                image_base = self.dll_last_address
-                self.ql.log.debug(f'DLL preferred base address exceeds memory upper bound, loading to: {image_base:#x}')
-                relocate = True
+            # relocating the image updates its image base
+            preferred = dll.OPTIONAL_HEADER.ImageBase
 
-            if not self.ql.mem.is_available(image_base, image_size):
-                image_base = self.ql.mem.find_free_space(image_size, minaddr=image_base, align=0x10000)
-                self.ql.log.debug(f'DLL preferred base address is taken, loading to: {image_base:#x}')
-                relocate = True
+            image_size = self.ql.mem.align_up(dll.OPTIONAL_HEADER.SizeOfImage)
+            image_base, relocate = self.__select_image_base(preferred, image_size)
 
             if relocate:
                 with ShowProgress(self.ql.log, 0.1337):
@@ -198,47 +441,64 @@ class Process:
             data = bytearray(dll.get_memory_mapped_image())
             assert image_size >= len(data)
 
-            cmdlines = []
+            exports = [(sym.address, sym.ordinal, sym.name) for sym in dll.DIRECTORY_ENTRY_EXPORT.symbols]
 
-            for sym in dll.DIRECTORY_ENTRY_EXPORT.symbols:
-                ea = image_base + sym.address
-
-                import_symbols[ea] = {
-                    'name'    : sym.name,
-                    'ordinal' : sym.ordinal,
-                    'dll'     : dll_name.split('.')[0]
-                }
-
-                if sym.name:
-                    import_table[sym.name] = ea
-
-                import_table[sym.ordinal] = ea
-                cmdline_entry = self.set_cmdline(sym.name, sym.address, data)
+            if self.libcache:
+                cached = QlPeCacheEntry(image_base, preferred, data, Process.get_relocs(dll), exports)
+
+                try:
+                    self.libcache.save(dll_path, cached)
+                except OSError as ex:
+                    self.ql.log.debug(f'Could not cache {dll_name}: {ex}')
+                else:
+                    self.ql.log.info(f'Cached {dll_name}')
+
+        for rva, ordinal, name in exports:
+            ea = image_base + rva
+
+            import_symbols[ea] = {
+                'name'    : name,
+                'ordinal' : ordinal,
+                'dll'     : dll_name.split('.')[0]
+            }
 
-                if cmdline_entry:
-                    cmdlines.append(cmdline_entry)
+            if name:
+                import_table[name] = ea
 
-            if self.libcache:
-                cached = QlPeCacheEntry(image_base, data, cmdlines, import_symbols, import_table)
-                self.libcache.save(dll_path, cached)
-                self.ql.log.info(f'Cached {dll_name}')
+            import_table[ordinal] = ea
+            self.set_cmdline(name, rva, data)
 
         # Add dll to IAT
         self.import_address_table[dll_name] = import_table
         self.import_symbols.update(import_symbols)
 
+        # bind import slots that were pointing to this dll stubs
+        for slot, key in self.lazy_slots.pop(dll_name, []):
+            if key in import_table:
+                self.ql.mem.write_ptr(slot, import_table[key])
+
         dll_base = image_base
         dll_len = image_size
 
         self.dll_size += dll_len
-        self.ql.mem.map(dll_base, dll_len, info=dll_name)
-        self.ql.mem.write(dll_base, bytes(data))
+
+        # cached images are mapped from the cache file rather than copied
+        if isinstance(data, mmap.mmap):
+            self.ql.mem.map_host(dll_base, dll_len, data, info=dll_name)
+        else:
+            self.ql.mem.map(dll_base, dll_len, info=dll_name)
+            self.ql.mem.write(dll_base, bytes(data))
 
         if dll_base == self.dll_last_address:
             self.dll_last_address = self.ql.mem.align_up(self.dll_last_address + dll_len, 0x10000)
 
         # add DLL to coverage images
         self.images.append(Image(dll_base, dll_base + dll_len, dll_path))
+        self.symbols.add_source(lambda: ((name.decode(), image_base + rva) for rva, _, name in exports if name), dll_base)
+
+        # intercept calls to dll exported functions. note that the exported symbols table
+        # is shared among all dlls, and may be updated later on (e.g. by ntoskrnl)
+        self.ql.hook_entries(self.ql.os.hook_winapi, self.import_symbols, dll_base, dll_base + dll_len - 1)
 
         # if this is NOT a driver, add dll to ldr data
         if not is_driver:
@@ -256,23 +516,33 @@ class Process:
             # a hook.
             #
             # in case of a dll loaded from a hooked API call, failures would not be
-            # recoverable and we have to give up its DllMain.
+            # recoverable and we have to give up its DllMain. dlls that are loaded lazily
+            # have their DllMain called by the lazy binder, once the hook returns.
             if self.ql.emu_state is not QL_STATE.STARTED:
                 self.call_dll_entrypoint(dll, dll_base, dll_len, dll_name)
 
+            elif dll_name in self.lazy_iat:
+                entry_point = self.__get_dll_entrypoint(dll, dll_base, dll_name)
+
+                if entry_point is not None:
+                    self.lazy_inits[dll_name] = (dll_base, entry_point, dll_base + dll_len - 16)
+
         self.ql.log.info(f'Done loading {dll_name}')
 
         return dll_base
 
-    def call_dll_entrypoint(self, dll: pefile.PE, dll_base: int, dll_len: int, dll_name: str):
+    def __get_dll_entrypoint(self, dll: pefile.PE, dll_base: int, dll_name: str) -> Optional[int]:
+        """Get the address of a dll DllMain function, if it should be called.
+        """
+
         entry_address = dll.OPTIONAL_HEADER.AddressOfEntryPoint
 
         if dll.get_section_by_rva(entry_address) is None:
-            return
+            return None
 
         if dll_name in ('kernelbase.dll', 'kernel32.dll'):
             self.ql.log.debug(f'Ignoring {dll_name} entry point')
-            return
+            return None
 
         # DllMain functions often call many APIs that may crash the program if they
         # are not implemented correctly (if at all). here we blacklist the problematic
@@ -287,9 +557,16 @@ class Process:
 
         if dll_name in blacklist:
             self.ql.log.debug(f'Ignoring {dll_name} entry point (blacklisted)')
+            return None
+
+        return dll_base + entry_address
+
+    def call_dll_entrypoint(self, dll: pefile.PE, dll_base: int, dll_len: int, dll_name: str):
+        entry_point = self.__get_dll_entrypoint(dll, dll_base, dll_name)
+
+        if entry_point is None:
             return
 
-        entry_point = dll_base + entry_address
         exit_point = dll_base + dll_len - 16
 
         args = (
@@ -493,11 +770,7 @@ class Process:
                 # don't even exist on windows. Therefore this approach is a bad idea.
 
                 # DLLs that seem to contain most of the requested symbols
-                key_dlls = (
-                    'ntdll.dll',
-                    'kernelbase.dll',
-                    'ucrtbase.dll'
-                )
+                key_dlls = APISET_HOSTS
 
                 imports = iter(entry.imports)
                 failed = False
@@ -533,6 +806,17 @@ class Process:
             if unbound_imports:
                 # Only load dll if encountered unbound symbol
                 if not redirected:
+                    # in lazy mode, dlls that were not loaded yet are only loaded once they are called
+                    if self.lazy_dlls and dll_name not in self.import_address_table and dll_name not in APISET_HOSTS:
+                        self.ql.log.debug(f'Deferring {dll_name} loading')
+
+                        for imp in unbound_imports:
+                            key = imp.name if imp.name else imp.ordinal
+
+                            self.ql.mem.write_ptr(imp.address, self.__lazy_stub(dll_name, key, imp.address, is_driver))
+
+                        continue
+
                     dll_base = self.load_dll(entry.dll.decode(), is_driver)
 
                     if not dll_base:
@@ -552,6 +836,121 @@ class Process:
 
                     self.ql.mem.write_ptr(imp.address, addr)
 
+    def __lazy_stub(self, dll_name: str, key: Union[bytes, int], slot: int, is_driver: bool) -> int:
+        """Get a stub to stand for an imported symbol of a dll that was not loaded yet. The
+        dll gets loaded when any of its stubs is executed.
+
+        Args:
+            dll_name: imported dll name, in a canonicalized form
+            key: imported symbol name, or ordinal if it has no name
+            slot: address of the import slot that refers to the stub
+            is_driver: whether the dll is imported by a driver
+
+        Returns: stub address
+        """
+
+        stubs = self.lazy_iat.setdefault(dll_name, {})
+        stub = stubs.get(key)
+
+        if stub is None:
+            # stubs are allocated sequentially, so the last one is the most recent
+            last = next(reversed(self.lazy_stubs), None)
+
+            # no more room for stubs? allocate a new chunk
+            if last is None or (last + LAZY_STUB_SIZE) % LAZY_STUBS_CHUNK == 0:
+                base = self.ql.mem.map_anywhere(LAZY_STUBS_CHUNK, minaddr=self.dll_address, align=LAZY_STUBS_CHUNK, info='[lazy stubs]')
+
+                # stubs are never meant to actually run
+                self.ql.mem.write(base, b'\xcc' * LAZY_STUBS_CHUNK)
+                self.ql.hook_entries(self.__lazy_bind, self.lazy_stubs, base, base + LAZY_STUBS_CHUNK - 1)
+
+                stub = base
+            else:
+                stub = last + LAZY_STUB_SIZE
+
+            stubs[key] = stub
+            self.lazy_stubs[stub] = (dll_name, key, is_driver)
+
+        self.lazy_slots.setdefault(dll_name, []).append((slot, key))
+
+        return stub
+
+    def __lazy_bind(self, ql: Qiling, address: int, size: int) -> None:
+        """Load the dll a stub stands for, if not already loaded, and resume execution at
+        the actual symbol the stub stands for.
+        """
+
+        dll_name, key, is_driver = self.lazy_stubs[address]
+
+        if dll_name not in self.import_address_table:
+            ql.log.info(f'Lazily loading {dll_name}')
+
+            if not self.load_dll(dll_name, is_driver):
+                ql.log.error(f'Could not load {dll_name}')
+                ql.emu_stop()
+
+                return
+
+        target = self.import_address_table[dll_name].get(key)
+
+        if target is None:
+            ql.log.error(f'Could not resolve {key!r} ({dll_name})')
+            ql.emu_stop()
+
+            return
+
+        init = self.lazy_inits.pop(dll_name, None)
+
+        if init is None:
+            ql.arch.regs.arch_pc = target
+        else:
+            self.__lazy_init(dll_name, *init, target)
+
+    def load_lazy_dll(self, name: str) -> None:
+        """Load an imported dll whose loading was deferred, so it may be looked up by name
+        or handle. The dll has its DllMain called once any of its stubs is executed.
+
+        Args:
+            name: dll name or path
+        """
+
+        _, dll_name = self.__get_path_elements(name)
+
+        if dll_name in self.lazy_iat and dll_name not in self.import_address_table:
+            self.ql.log.info(f'Loading deferred {dll_name}')
+
+            self.load_dll(dll_name)
+
+    def __lazy_init(self, dll_name: str, dll_base: int, entry_point: int, exit_point: int, target: int) -> None:
+        """Call DllMain of a lazily loaded dll, and resume execution at the symbol it was loaded
+        for once DllMain returns.
+
+        DllMain cannot be emulated from within a hook, so the current call is put on hold instead:
+        a DllMain call frame is staged on top of it and the registers are restored on its return.
+        """
+
+        regs_state = self.ql.arch.regs.save()
+
+        def __resume(ql: Qiling) -> None:
+            ql.log.info(f'Returned from {dll_name} DllMain')
+
+            hret.remove()
+
+            ql.arch.regs.restore(regs_state)
+            ql.arch.regs.arch_pc = target
+
+        hret = self.ql.hook_address(__resume, exit_point)
+
+        args = (
+            (HINSTANCE, dll_base),  # hinstDLL = base address of DLL
+            (DWORD, 1),             # fdwReason = DLL_PROCESS_ATTACH
+            (LPVOID, 0)             # lpReserved = 0
+        )
+
+        self.ql.log.info(f'Calling {dll_name} DllMain at {entry_point:#x}')
+
+        self.ql.os.fcall_select(CDECL).call_native(entry_point, args, exit_point)
+
     def init_exports(self, pe: pefile.PE):
         if not Process.directory_exists(pe, 'IMAGE_DIRECTORY_ENTRY_EXPORT'):
             return
@@ -664,12 +1063,16 @@ class Process:
         self.ql.mem.write_ptr(cookie_rva + image_base, cookie)
 
 class QlLoaderPE(QlLoader, Process):
-    def __init__(self, ql: Qiling, libcache: bool):
+    def __init__(self, ql: Qiling, libcache: Union[bool, QlPeCache]):
         super().__init__(ql)
 
         self.ql       = ql
         self.path     = self.ql.path
-        self.libcache = QlPeCache() if libcache else None
+
+        if isinstance(libcache, QlPeCache):
+            self.libcache = libcache
+        else:
+            self.libcache = QlPeCache() if libcache else None
 
     def run(self):
         self.init_dlls = (
@@ -708,6 +1111,13 @@ class QlLoaderPE(QlLoader, Process):
         self.import_symbols = {}
         self.export_symbols = {}
         self.import_address_table = {}
+        self.lazy_stubs = {}
+        self.lazy_slots = {}
+        self.lazy_iat = {}
+        self.lazy_inits = {}
+
+        # map imported dlls as stubs, and load them only when they are actually called
+        self.lazy_dlls = self.ql.os.profile.getboolean('MISC', 'lazy_dlls', fallback=False) and not self.is_driver
         self.ldr_list = []
         self.pe_image_address = 0
         self.pe_image_size = 0
@@ -749,6 +1159,9 @@ class QlLoaderPE(QlLoader, Process):
             self.ql.mem.map(image_base, image_size, info=f'{image_name}')
             self.images.append(Image(image_base, image_base + pe.NT_HEADERS.OPTIONAL_HEADER.SizeOfImage, os.path.abspath(self.path)))
 
+            # exports are parsed later on; the source is consumed only when symbols are queried
+            self.symbols.add_source(lambda: ((sym['name'].decode(), ea) for ea, sym in self.export_symbols.items() if sym['name']), image_base)
+
             if self.is_driver:
                 self.init_driver_object()
                 self.init_registry_path()
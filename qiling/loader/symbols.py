@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from __future__ import annotations
+
+import itertools
+import os
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from qiling.loader.loader import Image, QlLoader
+
+
+SymbolsSource = Callable[[], Iterable[Tuple[str, int]]]
+
+
+class QlSymbol(NamedTuple):
+    name: str
+    address: int
+    image: Optional[Image]
+
+
+class QlSymbolTable:
+    """Symbols of a single image, indexed both by address and by name.
+
+    Symbols may be added either directly or through sources that produce them. Sources
+    are consumed only when the table is first queried, so images whose symbols are never
+    looked up incur no parsing overhead.
+    """
+
+    def __init__(self):
+        self.__sources: List[SymbolsSource] = []
+        self.__pending: List[Tuple[int, str]] = []
+
+        # symbols sorted by address, and their names; one name per address
+        self.__addrs: List[int] = []
+        self.__names: List[str] = []
+
+        self.__by_name: Dict[str, int] = {}
+
+    def add_source(self, source: SymbolsSource) -> None:
+        """Register a source of symbols to consume once the table is queried.
+        """
+
+        self.__sources.append(source)
+
+    def add(self, name: str, address: int) -> None:
+        self.__pending.append((address, name))
+
+    def __build(self) -> None:
+        while self.__sources:
+            source = self.__sources.pop(0)
+
+            self.__pending.extend((address, name) for name, address in source())
+
+        if not self.__pending:
+            return
+
+        # earlier symbols take precedence over later ones at the same address
+        merged: Dict[int, str] = dict(zip(self.__addrs, self.__names))
+
+        for address, name in self.__pending:
+            merged.setdefault(address, name)
+            self.__by_name.setdefault(name, address)
+
+        self.__pending.clear()
+
+        self.__addrs = sorted(merged)
+        self.__names = [merged[address] for address in self.__addrs]
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Get the address of a symbol by its name.
+        """
+
+        self.__build()
+
+        return self.__by_name.get(name)
+
+    def get(self, address: int) -> Optional[str]:
+        """Get the name of the symbol at the specified address, if there is one.
+        """
+
+        self.__build()
+
+        i = bisect_right(self.__addrs, address) - 1
+
+        if i >= 0 and self.__addrs[i] == address:
+            return self.__names[i]
+
+        return None
+
+    def nearest(self, address: int) -> Optional[Tuple[str, int]]:
+        """Get the symbol with the highest address that does not exceed the specified one.
+
+        Returns: symbol name and address, or `None` if there is no such symbol
+        """
+
+        self.__build()
+
+        i = bisect_right(self.__addrs, address) - 1
+
+        if i >= 0:
+            return self.__names[i], self.__addrs[i]
+
+        return None
+
+    def __len__(self) -> int:
+        self.__build()
+
+        return len(self.__addrs)
+
+
+class QlSymbolResolver:
+    """A central symbols index of the loaded images.
+
+    Images are indexed by their base address, so locating the image that contains an address
+    is done by bisection. Every image has its own symbols table, populated by its loader. Symbols
+    that do not belong to a specific image are kept in a global table.
+    """
+
+    def __init__(self, loader: QlLoader):
+        self.loader = loader
+
+        # symbols tables, keyed by their image base address, or `None` for the global one
+        self.tables: Dict[Optional[int], QlSymbolTable] = {}
+
+        # images sorted by base address, along with their indices
+        self.__images: Optional[Sequence[Image]] = None
+        self.__count = 0
+        self.__bases: List[int] = []
+        self.__index: List[Tuple[int, Image]] = []
+
+        # highest end address among the images indexed so far, at every index position.
+        # used to tell when no earlier image may overlap an address anymore
+        self.__reach: List[int] = []
+
+    def __reindex(self) -> None:
+        images = self.loader.images
+
+        self.__index = sorted(enumerate(images), key=lambda entry: entry[1].base)
+        self.__bases = [image.base for _, image in self.__index]
+        self.__reach = list(itertools.accumulate((image.end for _, image in self.__index), max))
+
+        self.__images = images
+        self.__count = len(images)
+
+    def find_image(self, address: int) -> Optional[Tuple[int, Image]]:
+        """Locate the image that contains the specified address.
+
+        Returns: a tuple of image index and image, or `None` if address does not belong to any image.
+        If images overlap, the one that was loaded first is returned
+        """
+
+        images = self.loader.images
+
+        # images are added as they get loaded; index them again if needed
+        if images is not self.__images or len(images) != self.__count:
+            self.__reindex()
+
+        i = bisect_right(self.__bases, address) - 1
+        found = None
+
+        # walk back through the images that start below the address, as long as any of them
+        # may still reach it. with no overlapping images, only the closest one is examined
+        while i >= 0 and address < self.__reach[i]:
+            index, image = self.__index[i]
+
+            if address < image.end and (found is None or index < found[0]):
+                found = (index, image)
+
+            i -= 1
+
+        return found
+
+    def table(self, base: Optional[int] = None) -> QlSymbolTable:
+        """Get the symbols table of an image, creating it if needed.
+
+        Args:
+            base: image base address, or `None` for the global symbols table
+        """
+
+        if base not in self.tables:
+            self.tables[base] = QlSymbolTable()
+
+        return self.tables[base]
+
+    def add_source(self, source: SymbolsSource, base: Optional[int] = None) -> None:
+        """Register a source of symbols for an image. Symbols addresses are absolute.
+
+        Args:
+            source: a callable that returns an iterable of symbol names and addresses
+            base: image base address, or `None` for the global symbols table
+        """
+
+        self.table(base).add_source(source)
+
+    def add(self, name: str, address: int, base: Optional[int] = None) -> None:
+        """Add a single symbol.
+
+        Args:
+            name: symbol name
+            address: symbol absolute address
+            base: image base address, or `None` for the global symbols table
+        """
+
+        self.table(base).add(name, address)
+
+    def get_name(self, address: int) -> Optional[str]:
+        """Get the name of the symbol at the specified address, if there is one.
+        """
+
+        found = self.find_image(address)
+
+        if found is not None:
+            _, image = found
+            table = self.tables.get(image.base)
+
+            if table is not None:
+                name = table.get(address)
+
+                if name is not None:
+                    return name
+
+        table = self.tables.get(None)
+
+        return None if table is None else table.get(address)
+
+    def resolve(self, address: int) -> Optional[QlSymbol]:
+        """Resolve an address to the nearest symbol preceding it within its image. For addresses
+        that do not belong to any image, only an exact match in the global table is considered.
+        """
+
+        found = self.find_image(address)
+
+        if found is None:
+            name = self.get_name(address)
+
+            return None if name is None else QlSymbol(name, address, None)
+
+        _, image = found
+        table = self.tables.get(image.base)
+
+        nearest = table.nearest(address) if table is not None else None
+
+        # symbols tables are not bound to their image range; ignore symbols that precede it
+        if nearest is None or nearest[1] < image.base:
+            return None
+
+        name, symaddr = nearest
+
+        return QlSymbol(name, symaddr, image)
+
+    def lookup(self, name: str, image_name: Optional[str] = None) -> Optional[int]:
+        """Get the address of a symbol by its name.
+
+        Args:
+            name: symbol name
+            image_name: basename of the image to look in, or `None` to look in all images,
+            and the global table
+
+        Returns: symbol address, or `None` if not found
+        """
+
+        for base, table in self.tables.items():
+            if image_name is not None:
+                if base is None:
+                    continue
+
+                found = self.find_image(base)
+
+                if found is None or os.path.basename(found[1].path) != image_name:
+                    continue
+
+            address = table.lookup(name)
+
+            if address is not None:
+                return address
+
+        return None
+
+    def format(self, address: int) -> str:
+        """Get a human readable representation of an address, e.g. 'libc.so.6!puts+0x1c'.
+        """
+
+        sym = self.resolve(address)
+
+        if sym is None:
+            return f'{address:#x}'
+
+        offset = f'+{address - sym.address:#x}' if address != sym.address else ''
+        prefix = f'{os.path.basename(sym.image.path)}!' if sym.image else ''
+
+        return f'{prefix}{sym.name}{offset}'
@@ -39,16 +39,7 @@ def read_dos_string(ql: Qiling, address: int):
     Returns: an ascii string
     """
 
-    ba = bytearray()
-
-    while True:
-        ch = ql.mem.read(address, 1)
-
-        if ch == b'$':
-            break
-
-        ba.extend(ch)
-        address += 1
+    ba = ql.mem.read_terminated(address, b'$')
 
     return ba.decode('ascii')
 
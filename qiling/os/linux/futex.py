@@ -3,66 +3,242 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
-import gevent
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
 
+from qiling.os.posix.const import EAGAIN, EINVAL, ENOSYS, ETIMEDOUT
+
+if TYPE_CHECKING:
+    from qiling import Qiling
+    from qiling.os.linux.thread import QlLinuxThread
+
+
+class QlFutexWaiter:
+    """A thread waiting on a futex.
+    """
+
+    __slots__ = ('thread', 'bitset', 'active')
+
+    def __init__(self, thread: 'QlLinuxThread', bitset: int):
+        self.thread = thread
+        self.bitset = bitset
+
+        # waiters are not removed from their queue when they time out; rather they are
+        # marked as inactive and dropped once they are reached
+        self.active = True
 
-from gevent.event import Event
-from queue import Queue
 
 class QlLinuxFutexManagement:
 
     FUTEX_BITSET_MATCH_ANY = 0xffffffff
 
     def __init__(self):
-        self._wait_list = {}
+        # waiters queues, keyed by futex address
+        self._wait_list: Dict[int, Deque[QlFutexWaiter]] = {}
 
     @property
     def wait_list(self):
         return self._wait_list
 
-    def futex_wait(self, ql, uaddr, t, val, bitset=FUTEX_BITSET_MATCH_ANY):
-        EAGAIN = 11
-        def _sched_wait_event(cur_thread):
-            ql.log.debug(f"Wait for notifications.")
-            event.wait()
-        uaddr_value = ql.unpack32(ql.mem.read(uaddr, 4))
+    def futex_wait(self, ql: 'Qiling', uaddr: int, t: 'QlLinuxThread', val: int, bitset: int = FUTEX_BITSET_MATCH_ANY, deadline: Optional[float] = None) -> int:
+        """Block a thread on a futex, as long as it holds the expected value.
+
+        Args:
+            uaddr: futex address
+            t: waiting thread
+            val: expected futex value
+            bitset: wake up only by wake operations whose bitset intersects this one
+            deadline: time by which the wait times out, or `None` to wait indefinitely
+
+        Returns: 0 on success, or a negative error code
+        """
+
+        if bitset == 0:
+            return -EINVAL
+
+        uaddr_value = ql.mem.read_ptr(uaddr, 4)
+
         if uaddr_value != val:
             ql.log.debug(f"uaddr: {hex(uaddr_value)} != {hex(val)}")
             return -EAGAIN
+
+        waiter = QlFutexWaiter(t, bitset)
+
+        if uaddr not in self._wait_list:
+            self._wait_list[uaddr] = deque()
+
+        self._wait_list[uaddr].append(waiter)
+
+        def _wait_timeout(th: 'QlLinuxThread'):
+            waiter.active = False
+
+            # the thread context is loaded by now; override the syscall return value
+            ql.os.syscall_abi.set_return_value(-ETIMEDOUT)
+
+        ql.log.debug(f"Wait for notifications.")
+        ql.os.thread_management.block(t, deadline, _wait_timeout)
         ql.emu_stop()
-        if uaddr not in self.wait_list.keys():
-            self.wait_list[uaddr] = Queue()
-        event = Event()
-        self.wait_list[uaddr].put((bitset, t, event))
-        t.sched_cb = _sched_wait_event
+
         return 0
 
-    def get_futex_wake_list(self, ql, addr, number, bitset=FUTEX_BITSET_MATCH_ANY):
-        wakes = []
-        if addr not in self.wait_list or number == 0:
-            ql.log.debug(f"No thread at {hex(addr)}")
-            return wakes
-        thread_queue = self.wait_list[addr]
-        if thread_queue.qsize() < number:
-            number = thread_queue.qsize()
-        for _ in range(number):
-            orig_bitset, thread, event = thread_queue.get()
-            if orig_bitset & bitset:
-                wakes.append((thread, event))
-        if self.wait_list[addr].qsize() == 0:
-            del self.wait_list[addr]
-        return wakes
-
-    def futex_wake(self, ql, uaddr, t, number, bitset=FUTEX_BITSET_MATCH_ANY):
-        def _sched_set_event(cur_thread):
-            for t, e in wakes:
-                ql.log.debug(f"Notify [Thread {t.get_id()}.")
-                e.set()
-            # Give up control.
-            gevent.sleep(0)
+    def __dequeue(self, uaddr: int, number: int, bitset: int = FUTEX_BITSET_MATCH_ANY) -> List[QlFutexWaiter]:
+        """Remove up to `number` waiters from the front of a futex queue, considering only
+        the ones whose bitset intersects the specified one.
+        """
 
-        ql.emu_stop()
-        wakes = self.get_futex_wake_list(ql, uaddr, number, bitset)
-        t.sched_cb = _sched_set_event
+        queue = self._wait_list.get(uaddr)
+        found = []
+
+        if queue is None:
+            return found
+
+        # fast path: every waiter is eligible
+        if bitset == QlLinuxFutexManagement.FUTEX_BITSET_MATCH_ANY:
+            while queue and len(found) < number:
+                waiter = queue.popleft()
+
+                if waiter.active and waiter.thread.is_blocking():
+                    found.append(waiter)
+
+        else:
+            skipped = deque()
+
+            while queue and len(found) < number:
+                waiter = queue.popleft()
+
+                if waiter.active and waiter.thread.is_blocking():
+                    (found if waiter.bitset & bitset else skipped).append(waiter)
+
+            # put back the skipped waiters, maintaining their original order
+            queue.extendleft(reversed(skipped))
+
+        if not queue:
+            del self._wait_list[uaddr]
+
+        return found
+
+    def __wake(self, ql: 'Qiling', waiters: List[QlFutexWaiter]) -> int:
+        for waiter in waiters:
+            waiter.active = False
+
+            ql.log.debug(f"Notify {waiter.thread}.")
+            ql.os.thread_management.wake(waiter.thread)
+
+        return len(waiters)
+
+    def futex_wake(self, ql: 'Qiling', uaddr: int, number: int, bitset: int = FUTEX_BITSET_MATCH_ANY) -> int:
+        """Wake up threads waiting on a futex.
+
+        Args:
+            uaddr: futex address
+            number: maximum number of threads to wake up
+            bitset: wake up only waiters whose bitset intersects this one
+
+        Returns: number of woken up threads, or a negative error code
+        """
+
+        if bitset == 0:
+            return -EINVAL
+
+        return self.__wake(ql, self.__dequeue(uaddr, number, bitset))
+
+    def futex_requeue(self, ql: 'Qiling', uaddr: int, number: int, uaddr2: int, nr_requeue: int, cmpval: Optional[int] = None) -> int:
+        """Wake up threads waiting on a futex, and move the remaining ones to wait on another
+        futex rather than waking them all.
+
+        Args:
+            uaddr: futex address
+            number: maximum number of threads to wake up
+            uaddr2: address of the futex to requeue waiters to
+            nr_requeue: maximum number of threads to requeue
+            cmpval: expected futex value, or `None` to skip the check
+
+        Returns: number of woken up threads; if `cmpval` was specified, the number of requeued
+        threads is added as well. A negative error code is returned on failure
+        """
+
+        if cmpval is not None:
+            uaddr_value = ql.mem.read_ptr(uaddr, 4)
+
+            if uaddr_value != cmpval:
+                ql.log.debug(f"uaddr: {hex(uaddr_value)} != {hex(cmpval)}")
+                return -EAGAIN
+
+        woken = self.__wake(ql, self.__dequeue(uaddr, number))
+
+        # requeueing to the same futex is pointless
+        if uaddr2 == uaddr:
+            return woken
+
+        moved = self.__dequeue(uaddr, nr_requeue)
+
+        if moved:
+            if uaddr2 not in self._wait_list:
+                self._wait_list[uaddr2] = deque()
+
+            self._wait_list[uaddr2].extend(moved)
+
+        return woken + (len(moved) if cmpval is not None else 0)
+
+    def futex_wake_op(self, ql: 'Qiling', uaddr: int, number: int, uaddr2: int, number2: int, encoded_op: int) -> int:
+        """Atomically modify a second futex, and wake up threads on both futexes depending
+        on its previous value.
+
+        Args:
+            uaddr: futex address
+            number: maximum number of threads to wake up on the first futex
+            uaddr2: address of the second futex
+            number2: maximum number of threads to wake up on the second futex
+            encoded_op: operation and comparison to perform, encoded as FUTEX_OP does
+
+        Returns: total number of woken up threads, or a negative error code
+        """
+
+        FUTEX_OP_OPARG_SHIFT = 8
+
+        op     = (encoded_op >> 28) & 0b1111
+        cmp    = (encoded_op >> 24) & 0b1111
+        oparg  = (encoded_op >> 12) & 0xfff
+        cmparg = (encoded_op >>  0) & 0xfff
+
+        # both arguments are signed 12 bits values
+        oparg  -= (oparg & 0x800) << 1
+        cmparg -= (cmparg & 0x800) << 1
+
+        if op & FUTEX_OP_OPARG_SHIFT:
+            if oparg not in range(32):
+                return -EINVAL
+
+            oparg = 1 << oparg
+            op &= ~FUTEX_OP_OPARG_SHIFT
+
+        operations = {
+            0: lambda _: oparg,         # FUTEX_OP_SET
+            1: lambda v: v + oparg,     # FUTEX_OP_ADD
+            2: lambda v: v | oparg,     # FUTEX_OP_OR
+            3: lambda v: v & ~oparg,    # FUTEX_OP_ANDN
+            4: lambda v: v ^ oparg      # FUTEX_OP_XOR
+        }
+
+        comparisons = {
+            0: lambda v: v == cmparg,   # FUTEX_OP_CMP_EQ
+            1: lambda v: v != cmparg,   # FUTEX_OP_CMP_NE
+            2: lambda v: v < cmparg,    # FUTEX_OP_CMP_LT
+            3: lambda v: v <= cmparg,   # FUTEX_OP_CMP_LE
+            4: lambda v: v > cmparg,    # FUTEX_OP_CMP_GT
+            5: lambda v: v >= cmparg    # FUTEX_OP_CMP_GE
+        }
+
+        if op not in operations or cmp not in comparisons:
+            return -ENOSYS
+
+        oldval = ql.mem.read_ptr(uaddr2, 4)
+        ql.mem.write_ptr(uaddr2, operations[op](oldval) & 0xffffffff, 4)
+
+        woken = self.futex_wake(ql, uaddr, number)
+
+        # comparison is done on the signed value
+        if comparisons[cmp](ql.unpack32s(ql.pack32(oldval))):
+            woken += self.futex_wake(ql, uaddr2, number2)
 
-        return len(wakes)
+        return woken
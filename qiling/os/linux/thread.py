@@ -3,9 +3,10 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
-import gevent, os
+import heapq, itertools, os, time
 
-from typing import Callable, Sequence
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
 from abc import abstractmethod
 
 from unicorn.unicorn import UcError
@@ -14,7 +15,7 @@ from qiling import Qiling
 from qiling.const import QL_ARCH
 from qiling.os.thread import *
 from qiling.arch.x86_const import *
-from qiling.exception import QlErrorExecutionStop
+from qiling.exception import QlErrorExecutionStop, QlErrorNotImplemented
 
 LINUX_THREAD_ID = 2000
 
@@ -41,6 +42,24 @@ class QlLinuxThread(QlThread):
         self._log_file_fd = None
         self._sched_cb = None
 
+        # scheduling parameters, as set by setpriority and sched_setscheduler: nice value,
+        # scheduling policy (SCHED_OTHER by default) and real-time priority
+        self.nice = 0
+        self.sched_policy = 0
+        self.rt_priority = 0
+
+        # scheduling metrics: number of times the thread was switched in, number of
+        # time slices it ran, and host time spent emulating it (in seconds)
+        self.switches = 0
+        self.slices = 0
+        self.cpu_time = 0.0
+
+        # a callback to invoke when the thread resumes after its wait has timed out
+        self._on_timeout: Optional[Callable[['QlLinuxThread'], None]] = None
+
+        # bumped whenever the thread blocks or wakes up, to invalidate pending timeouts
+        self._wait_token = 0
+
         # Compatibility
         self._log_file_fd = ql.log
 
@@ -194,71 +213,21 @@ class QlLinuxThread(QlThread):
     def sched_cb(self, cb):
         self._sched_cb = cb
 
-    def _default_sched_cb(self):
-        # Give up control.
-        gevent.sleep(0)
-
-    def _run(self):
-        # Some random notes for myself:
-        # Implement details:
-        #    The thread execution is divided in to two contexts:
-        #        - Unicorn context.
-        #        - Non-Unicorn context.
-        #    Within both contexts, our program is single thread.
-        #
-        #    The only fail safe: **Never give up control in Unicorn context.**
-        #
-        #    In Unicorn context, in other words, in Unicorn callbacks, we do:
-        #        - Implement non-blocking syscalls directly.
-        #        - Prepare sched_cb for non-unicorn context.
-        #
-        #    In Non-Unicorn context.
-        #    In this context, we do:
-        #        - Call gevent functions to switch threads.
-        #        - Forward blocking syscalls to gevent.
-        self.ql.arch.regs.arch_pc = self.start_address
-        if not self._saved_context:
-            self.save()
-
-        while self.status != THREAD_STATUS_TERMINATED:
-            # Rewrite our status and the current thread.
-            self.status = THREAD_STATUS_RUNNING
-            self.ql.os.thread_management.cur_thread = self
-
-            # Restore the context of the currently executing thread and set tls
-            self.restore()
-
-            # Sanity check
-            if self.ql.arch.regs.arch_pc == self.exit_point:
-                self.ql.log.warning(f"Nothing to do but still get scheduled!")
-
-            # Run and log the run event
-            start_address = getattr(self.ql.arch, 'effective_pc', self.ql.arch.regs.arch_pc) # For arm thumb.
-            self.sched_cb = QlLinuxThread._default_sched_cb
-
-            self.ql.log.debug(f"Scheduled from {hex(start_address)}.")
-            try:
-                # Known issue for timeout: https://github.com/unicorn-engine/unicorn/issues/1355
-                self.ql.emu_start(start_address, self.exit_point, count=31337)
-            except UcError as e:
-                self.ql.os.emu_error()
-                self.ql.log.exception("")
-                raise e
-            self.ql.log.debug(f"Suspended at {hex(self.ql.arch.regs.arch_pc)}")
-            self.save()
-
-            # Note that this callback may be set by UC callbacks.
-            # Some thought on this design:
-            #      1. Never give up control during a UC callback.
-            #      2. emu_stop only sends a signal to unicorn which won't stop it immediately.
-            #      3. According to 1, never call gevent functions in UC callbacks.
-            self.ql.log.debug(f"Call sched_cb: {self.sched_cb}")
-            self.sched_cb(self)
-
-            if self.status == THREAD_STATUS_TERMINATED or self.ql.arch.regs.arch_pc == self.exit_point:
-                break
-
-        self._on_stop()
+    @property
+    def priority(self) -> int:
+        """Scheduling priority; higher values are preferred by the 'priority' policy.
+        Real-time threads precede all others, which are then ordered by their nice value.
+        """
+
+        return 20 + self.rt_priority if self.rt_priority else -self.nice
+
+    @classmethod
+    def spawn(cls, *args, **kwargs) -> 'QlLinuxThread':
+        """Create a new thread. The thread is registered with the thread manager and becomes
+        runnable right away.
+        """
+
+        return cls(*args, **kwargs)
 
     # Depreciated.
     def get_id(self):
@@ -276,25 +245,6 @@ class QlLinuxThread(QlThread):
     def set_thread_tls(self, tls_addr):
         pass
 
-    @abstractmethod
-    def clone(self):
-        # This is a workaround to implement our thread based on gevent greenlet.
-        # Core idea:
-        #     A gevent greenlet can't re-run if it has finished _run method but our framework requires threads to be resumed anytime. Therefore, a workaround is to
-        #     use multiple greenlets to represent a single qiling thread.
-        #
-        #     Of course we can make the greenlet run forever and wait for notifications to resume but that would make the design much more complicated.
-        #
-        # Caveat:
-        #     Don't use thread id to identify the thread object.
-        new_thread = self.ql.os.thread_class.spawn(self._ql, self._start_address, self._exit_point, self._saved_context, set_child_tid_addr = None, thread_id = self._thread_id)
-        new_thread._return_val = self._return_val
-        new_thread._robust_list_head_len = self._robust_list_head_len
-        new_thread._robust_list_head_ptr = self._robust_list_head_ptr
-        new_thread._set_child_tid_address = self._set_child_tid_address
-        new_thread._clear_child_tid_address = self._clear_child_tid_address
-        return new_thread
-
     def save_context(self):
         self.saved_context = self.ql.arch.save()
 
@@ -326,24 +276,18 @@ class QlLinuxThread(QlThread):
         if self.clear_child_tid_address is not None:
             self.ql.log.debug(f"Perform CLONE_CHILD_CLEARTID at {hex(self.clear_child_tid_address)}")
             self.ql.mem.write_ptr(self.clear_child_tid_address, 0, 4)
-            wakes = self.ql.os.futexm.get_futex_wake_list(self.ql, self.clear_child_tid_address, 1)
+            self.ql.os.futexm.futex_wake(self.ql, self.clear_child_tid_address, 1)
             self.clear_child_tid_address = None
-            # When the thread is to stop, we don't have chance for next sched_cb, so
-            # we notify the thread directly.
-            for t, e in wakes:
-                self.ql.log.debug(f"Notify {t}.")
-                e.set()
 
     # This function should called outside unicorn callback.
     def stop(self):
         self.status = THREAD_STATUS_TERMINATED
 
     def is_stop(self):
-        #return self.status == THREAD_STATUS_TERMINATED
-        return self.dead
+        return self.status == THREAD_STATUS_TERMINATED
 
     def is_running(self):
-        return not self.dead
+        return self.status != THREAD_STATUS_TERMINATED
 
     def is_blocking(self):
         return self.status == THREAD_STATUS_BLOCKING
@@ -407,11 +351,6 @@ class QlLinuxX86Thread(QlLinuxThread):
 
         self.ql.log.debug(f'Context restored (fs={self.ql.arch.regs.fs:#06x} gs={self.ql.arch.regs.gs:#06x} gdt_buf=[{" ".join(ent.hex() for ent in self.tls)}])')
 
-    def clone(self):
-        new_thread = super(QlLinuxX86Thread, self).clone()
-        new_thread.tls = self.tls
-        return new_thread
-
 class QlLinuxX8664Thread(QlLinuxThread):
     """docstring for X8664Thread"""
     def __init__(self, ql, start_address, exit_point, context = None, set_child_tid_addr = None, thread_id = None):
@@ -436,11 +375,6 @@ class QlLinuxX8664Thread(QlLinuxThread):
         self.set_thread_tls(self.tls)
         self.ql.log.debug(f"Restored context: fs={hex(self.ql.arch.regs.fsbase)} tls={hex(self.tls)}")
 
-    def clone(self):
-        new_thread = super(QlLinuxX8664Thread, self).clone()
-        new_thread.tls = self.tls
-        return new_thread
-
 class QlLinuxMIPS32Thread(QlLinuxThread):
     """docstring for QlLinuxMIPS32Thread"""
     def __init__(self, ql, start_address, exit_point, context = None, set_child_tid_addr = None, thread_id = None):
@@ -465,11 +399,6 @@ class QlLinuxMIPS32Thread(QlLinuxThread):
         self.set_thread_tls(self.tls)
         self.ql.log.debug(f"Restored context. cp0={hex(self.ql.arch.regs.cp0_userlocal)}")
 
-    def clone(self):
-        new_thread = super(QlLinuxMIPS32Thread, self).clone()
-        new_thread.tls = self.tls
-        return new_thread
-
 class QlLinuxARMThread(QlLinuxThread):
     """docstring for QlLinuxARMThread"""
     def __init__(self, ql, start_address, exit_point, context = None, set_child_tid_addr = None, thread_id = None):
@@ -493,11 +422,6 @@ class QlLinuxARMThread(QlLinuxThread):
         self.set_thread_tls(self.tls)
         self.ql.log.debug(f"Restored context. c13_c0_3={hex(self.ql.arch.regs.c13_c0_3)}")
 
-    def clone(self):
-        new_thread = super(QlLinuxARMThread, self).clone()
-        new_thread.tls = self.tls
-        return new_thread
-
 
 class QlLinuxARM64Thread(QlLinuxThread):
     """docstring for QlLinuxARM64Thread"""
@@ -520,12 +444,25 @@ class QlLinuxARM64Thread(QlLinuxThread):
         self.set_thread_tls(self.tls)
         self.ql.log.debug(f"Restored context. tpidr_el0={hex(self.ql.arch.regs.tpidr_el0)}")
 
-    def clone(self):
-        new_thread = super(QlLinuxARM64Thread, self).clone()
-        new_thread.tls = self.tls
-        return new_thread
+
 
 class QlLinuxThreadManagement:
+    """A cooperative scheduler for emulated threads.
+
+    All threads share a single emulated cpu. Every thread keeps its own saved cpu context,
+    which is swapped in only when the scheduler picks a thread other than the one that ran
+    last. Threads run for a time slice, measured in either instructions or basic blocks,
+    unless they stop earlier on a syscall (e.g. a futex wait or sched_yield).
+
+    Scheduling is configured through the 'THREADS' section of the os profile.
+
+    Implementation notes:
+        The emulation is divided into unicorn context (i.e. hooks and syscalls) and the
+        scheduler context. Threads should never be switched from within unicorn context;
+        rather, syscalls may block the current thread, wake up others, or set a sched_cb
+        to run once the current time slice ends.
+    """
+
     def __init__(self, ql):
         self.ql = ql
         self.threads = set()
@@ -533,6 +470,44 @@ class QlLinuxThreadManagement:
         self._main_thread = None
         self._cur_thread = None
 
+        profile = ql.os.profile
+
+        self.policy = profile.get('THREADS', 'sched_policy', fallback='rr')
+        self.slice = profile.getint('THREADS', 'sched_slice', fallback=31337)
+        self.slice_unit = profile.get('THREADS', 'sched_slice_unit', fallback='insn')
+
+        if self.policy not in ('rr', 'priority'):
+            raise QlErrorNotImplemented(f'Unsupported scheduling policy: {self.policy}')
+
+        if self.slice_unit not in ('insn', 'block'):
+            raise QlErrorNotImplemented(f'Unsupported time slice unit: {self.slice_unit}')
+
+        # runnable threads queues, keyed by priority. when scheduling in a round-robin
+        # fashion all threads are kept in the same queue
+        self._ready: Dict[int, Deque[QlLinuxThread]] = {}
+
+        # emulated time reference for blocking timeouts, in seconds. every time slice moves
+        # it forward by its full length, and it leaps forward to the earliest timeout when
+        # all threads are blocked
+        self._clock = 0.0
+        self.unit_time = profile.getint('THREADS', 'sched_unit_ns', fallback=1) / 1000000000
+
+        # blocked threads timeouts: a heap of deadline, sequence number, wait token and thread
+        self._timers: List[Tuple[float, int, int, QlLinuxThread]] = []
+        self._seq = itertools.count()
+
+        # the thread whose context is currently loaded to the cpu
+        self._loaded: Optional[QlLinuxThread] = None
+
+        # remaining basic blocks in the current time slice, when counting blocks
+        self._budget = 0
+
+        self._stopped = False
+
+        # scheduling metrics: number of context switches and time slices
+        self.switches = 0
+        self.slices = 0
+
     # cur_thread is only guaranteed to be correct in unicorn callbacks context.
     @property
     def cur_thread(self):
@@ -550,19 +525,296 @@ class QlLinuxThreadManagement:
     def main_thread(self, mt):
         self._main_thread = mt
 
+    def clock(self) -> float:
+        """Get the emulated time reference used for blocking timeouts, in seconds.
+        """
+
+        return self._clock
+
+    @property
+    def stats(self) -> Dict[int, Tuple[int, int, float]]:
+        """Scheduling metrics of the live threads: number of switches, number of time
+        slices and cpu time, keyed by thread id.
+        """
+
+        return {t.id: (t.switches, t.slices, t.cpu_time) for t in self.threads}
+
     def stop_thread(self, t):
         t.stop()
         if t in self.threads:
             self.threads.remove(t)
             self.ql.log.debug(f"[Thread Manager] Thread IDs: { {t.id for t in self.threads} }")
         # Exit the world.
-        if t == self.main_thread:
+        if t == self.main_thread and not self._stopped:
             self.stop()
 
     def add_thread(self, t):
         self.threads.add(t)
         self.ql.log.debug(f"[Thread Manager] Thread IDs: { {t.id for t in self.threads} }")
 
+        # new threads are runnable
+        self._enqueue(t)
+
+    def get_thread(self, tid: int) -> Optional[QlLinuxThread]:
+        """Look up a live thread by its id.
+
+        Args:
+            tid: thread id, or 0 for the current thread
+
+        Returns: thread object, or `None` if there is no such thread
+        """
+
+        if tid == 0:
+            return self.cur_thread
+
+        return next((t for t in self.threads if t.id == tid), None)
+
+    def set_sched_params(self, t: QlLinuxThread, *, nice: Optional[int] = None, policy: Optional[int] = None, rt_priority: Optional[int] = None) -> None:
+        """Update a thread scheduling parameters. A thread that is waiting for its turn is
+        moved to the queue that matches its new priority.
+        """
+
+        key = self._key(t)
+
+        if nice is not None:
+            t.nice = nice
+
+        if policy is not None:
+            t.sched_policy = policy
+
+        if rt_priority is not None:
+            t.rt_priority = rt_priority
+
+        if self._key(t) != key:
+            queue = self._ready.get(key)
+
+            if queue is not None and t in queue:
+                queue.remove(t)
+
+                self._enqueue(t)
+
+            # let the scheduler reconsider its choice once the current time slice ends
+            self.ql.emu_stop()
+
+    def _key(self, t: QlLinuxThread) -> int:
+        return t.priority if self.policy == 'priority' else 0
+
+    def _enqueue(self, t: QlLinuxThread) -> None:
+        key = self._key(t)
+
+        if key not in self._ready:
+            self._ready[key] = deque()
+
+        self._ready[key].append(t)
+
+    def block(self, t: QlLinuxThread, deadline: Optional[float] = None, on_timeout: Optional[Callable[[QlLinuxThread], None]] = None) -> None:
+        """Block a thread until it is woken up. This is meant to be called from unicorn
+        context on the current thread, along with emu_stop.
+
+        Args:
+            t: thread to block
+            deadline: time by which the thread resumes if it was not woken up, or `None` to wait indefinitely
+            on_timeout: a callback to invoke in the thread context if it resumes due to timeout
+        """
+
+        t.status = THREAD_STATUS_BLOCKING
+        t._wait_token += 1
+        t._on_timeout = on_timeout
+
+        if deadline is not None:
+            heapq.heappush(self._timers, (deadline, next(self._seq), t._wait_token, t))
+
+    def wake(self, t: QlLinuxThread) -> bool:
+        """Make a blocked thread runnable again.
+
+        Returns: `True` if the thread was blocked, `False` otherwise
+        """
+
+        if t.status != THREAD_STATUS_BLOCKING:
+            return False
+
+        t.status = THREAD_STATUS_RUNNING
+        t._wait_token += 1
+        t._on_timeout = None
+
+        self._enqueue(t)
+
+        return True
+
+    def has_pending(self) -> bool:
+        """Tell whether there are threads that are runnable or wait for a timeout. A thread
+        that waits on the host while there are such threads would hold them back.
+        """
+
+        if any(t.status == THREAD_STATUS_RUNNING for queue in self._ready.values() for t in queue):
+            return True
+
+        return any(t.status == THREAD_STATUS_BLOCKING and t._wait_token == token for _, _, token, t in self._timers)
+
+    def _expire_timers(self, now: float) -> None:
+        timers = self._timers
+
+        while timers and timers[0][0] <= now:
+            _, _, token, t = heapq.heappop(timers)
+
+            # skip timeouts of threads that were woken up in the meantime
+            if t.status == THREAD_STATUS_BLOCKING and t._wait_token == token:
+                t.status = THREAD_STATUS_RUNNING
+
+                self._enqueue(t)
+
+    def _pick(self) -> Optional[QlLinuxThread]:
+        for key in sorted(self._ready, reverse=True):
+            queue = self._ready[key]
+
+            while queue:
+                t = queue.popleft()
+
+                # queues may hold threads that were terminated while waiting for their turn
+                if t.status == THREAD_STATUS_RUNNING:
+                    return t
+
+        return None
+
+    def _idle(self) -> bool:
+        """Move the clock forward to the earliest timeout of a blocked thread.
+
+        Returns: `False` if there is nothing to wait for, `True` otherwise
+        """
+
+        timers = self._timers
+
+        while timers:
+            deadline, _, token, t = timers[0]
+
+            if t.status == THREAD_STATUS_BLOCKING and t._wait_token == token:
+                self._clock = max(self._clock, deadline)
+
+                return True
+
+            heapq.heappop(timers)
+
+        return False
+
+    def _switch(self, t: QlLinuxThread) -> None:
+        """Load a thread context to the cpu, unless it is already loaded.
+        """
+
+        loaded = self._loaded
+
+        if t is loaded:
+            return
+
+        if loaded is not None and loaded.status != THREAD_STATUS_TERMINATED:
+            loaded.save()
+
+        # a thread that has no saved context starts off the current cpu context
+        if t.saved_context is None:
+            self.ql.arch.regs.arch_pc = t.start_address
+        else:
+            t.restore()
+
+        self._loaded = t
+
+        self.switches += 1
+        t.switches += 1
+
+    def __count_block(self, ql: Qiling, address: int, size: int) -> None:
+        self._budget -= 1
+
+        if self._budget <= 0:
+            ql.emu_stop()
+
+    def _run_slice(self, t: QlLinuxThread) -> None:
+        self.cur_thread = t
+        self._switch(t)
+
+        # the thread resumed after its wait timed out
+        if t._on_timeout is not None:
+            on_timeout = t._on_timeout
+            t._on_timeout = None
+
+            on_timeout(t)
+
+            # the callback may have blocked the thread again to keep waiting
+            if t.status != THREAD_STATUS_RUNNING:
+                return
+
+        t.sched_cb = None
+
+        start_address = getattr(self.ql.arch, 'effective_pc', self.ql.arch.regs.arch_pc) # For arm thumb.
+
+        if self.slice_unit == 'block':
+            self._budget = self.slice
+            count = 0
+        else:
+            count = self.slice
+
+        self.ql.log.debug(f"Scheduled from {hex(start_address)}.")
+
+        started = time.perf_counter()
+
+        try:
+            # Known issue for timeout: https://github.com/unicorn-engine/unicorn/issues/1355
+            self.ql.emu_start(start_address, t.exit_point, count=count)
+        except UcError as e:
+            self.ql.os.emu_error()
+            self.ql.log.exception("")
+            raise e
+        finally:
+            t.cpu_time += time.perf_counter() - started
+
+        self._clock += self.slice * self.unit_time
+
+        t.slices += 1
+        self.slices += 1
+
+        self.ql.log.debug(f"Suspended at {hex(self.ql.arch.regs.arch_pc)}")
+
+        # Note that this callback may be set by UC callbacks.
+        if t.sched_cb is not None:
+            self.ql.log.debug(f"Call sched_cb: {t.sched_cb}")
+            t.sched_cb(t)
+
+    def _schedule(self) -> bool:
+        """Run threads until the main thread reaches its exit point.
+
+        Returns: `True` if the main thread reached its exit point, `False` if the emulation
+        was stopped or all threads are blocked indefinitely
+        """
+
+        main = self.main_thread
+
+        while not self._stopped:
+            self._expire_timers(self.clock())
+
+            t = self._pick()
+
+            if t is None:
+                if self._idle():
+                    continue
+
+                self.ql.log.error(f'[Thread Manager] All threads are blocked: { {t.id for t in self.threads} }')
+
+                return False
+
+            self._run_slice(t)
+
+            if t.status == THREAD_STATUS_RUNNING:
+                if self.ql.arch.regs.arch_pc == t.exit_point:
+                    if t is main:
+                        return True
+
+                    t.status = THREAD_STATUS_TERMINATED
+                else:
+                    self._enqueue(t)
+
+            if t.status == THREAD_STATUS_TERMINATED:
+                t._on_stop()
+                self.stop_thread(t)
+
+        return False
+
     def _clear_queued_msg(self):
         try:
             msg_before_main_thread = self.ql._msg_before_main_thread
@@ -581,8 +833,7 @@ class QlLinuxThreadManagement:
             self.main_thread = self.ql.os.thread_class.spawn(self.ql, self.ql.loader.entry_point, entry_address)
             self.cur_thread = self.main_thread
             self._clear_queued_msg()
-            gevent.joinall([self.main_thread], raise_error=True)
-            if self.ql.arch.regs.arch_pc != entry_address:
+            if not self._schedule() or self.ql.arch.regs.arch_pc != entry_address:
                 self.ql.log.error(f"{self.cur_thread} Expect {hex(self.ql.loader.elf_entry)} but get {hex(self.ql.arch.regs.arch_pc)} when running loader.")
                 raise QlErrorExecutionStop('Dynamic library .init() failed!')
             self.ql.do_lib_patch()
@@ -596,6 +847,7 @@ class QlLinuxThreadManagement:
     def stop(self):
         self.ql.log.debug("[Thread Manager] Stop the world.")
         self.ql.emu_stop()
+        self._stopped = True
         global LINUX_THREAD_ID
         LINUX_THREAD_ID = 2000
         while len(self.threads) != 0:
@@ -604,16 +856,20 @@ class QlLinuxThreadManagement:
             self.stop_thread(t)
 
     def run(self):
+        if self.slice_unit == 'block':
+            self.ql.hook_block(self.__count_block)
+
         previous_thread = self._prepare_lib_patch()
         if previous_thread is None:
             self.main_thread = self.ql.os.thread_class.spawn(self.ql, self.ql.loader.elf_entry, self.ql.os.exit_point)
         else:
-            self.main_thread = previous_thread.clone()
-            self.main_thread.start_address = self.ql.loader.elf_entry
+            # the main thread carries on from the program entry point
             self.main_thread.exit_point = self.ql.os.exit_point
+            self._enqueue(self.main_thread)
         self.cur_thread = self.main_thread
         self._clear_queued_msg()
-        # If we get exceptions from gevent here, it means a critical bug related to multithread.
-        # Please fire an issue if you encounter an exception from gevent.
-        gevent.joinall([self.main_thread], raise_error=True)
 
+        if self._schedule():
+            self.main_thread._on_stop()
+
+        self.stop_thread(self.main_thread)
@@ -3,7 +3,10 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
-from typing import TYPE_CHECKING
+import time
+
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, Tuple
 from unicorn import UC_ERR_OK, UcError
 
 from qiling.const import QL_OS
@@ -42,10 +45,64 @@ class QlOsMcu(QlOs):
         self.runable = True
         self.fast_mode = False
 
+        # max instructions to emulate between peripheral updates in non-fast mode.
+        # peripherals are then advanced by the elapsed cycles at once, and a run is
+        # cut short whenever an interrupt is due in the middle of it, or input waits
+        # on a connectivity peripheral. only the instructions that were actually
+        # executed are accounted
+        self.quantum = 1
+
+        # addresses of the instructions in each basic block, keyed by block address and size.
+        # used to tell how many instructions were executed in a run that was cut short
+        self.__blocks: Dict[Tuple[int, int], Tuple[int, ...]] = {}
+
+        # instructions executed in full blocks during the current run, and the block being executed
+        self.__executed = 0
+        self.__block: Tuple[int, ...] = ()
+
+        # blocks counting hook; set up on the first run in quanta
+        self.__counting = None
+
     def stop(self):
         self.ql.emu_stop()
         self.runable = False
 
+    def __block_insns(self, address: int, size: int) -> Tuple[int, ...]:
+        key = (address, size)
+        insns = self.__blocks.get(key)
+
+        if insns is None:
+            code = self.ql.mem.read(address, size)
+            insns = self.__blocks[key] = tuple(insn[0] for insn in self.ql.arch.disassembler.disasm_lite(code, address))
+
+        return insns
+
+    def __count_block(self, ql: 'Qiling', address: int, size: int) -> None:
+        # the previous block was executed in full by the time the next one is entered
+        self.__executed += len(self.__block)
+        self.__block = self.__block_insns(address, size)
+
+    def __run_quantum(self, begin: int, until: int, quantum: int) -> int:
+        """Emulate up to `quantum` instructions.
+
+        Returns: number of instructions actually executed, which may be lower than `quantum`
+        if the run was stopped early (e.g. by a pending interrupt or reaching the exit point)
+        """
+
+        self.__executed = 0
+        self.__block = ()
+
+        self.ql.emu_start(begin, until, count=quantum)
+
+        pc = self.ql.arch.regs.arch_pc
+        block = self.__block
+
+        # stopped in the middle of the last block entered
+        if block and block[0] <= pc <= block[-1]:
+            return self.__executed + bisect_left(block, pc)
+
+        return self.__executed + len(block)
+
     def run(self):
         def current_pc() -> int:
             if hasattr(self.ql.arch, 'effective_pc'):
@@ -57,6 +114,12 @@ class QlOsMcu(QlOs):
         end = self.ql.exit_point or -1
         timeout = self.ql.timeout or 0
 
+        # unicorn matches the exit address against pc, which does not have the thumb bit set
+        until = end & ~0b1 if end >= 0 else 0
+
+        # timers may have been modified since the last run
+        self.ql.hw.sync()
+
         if self.fast_mode:
             if count != 0:
                 self.ql.log.warning("`count` means 'Stop after sceduling *count* times' in fast mode.")
@@ -66,8 +129,12 @@ class QlOsMcu(QlOs):
             self.ql.uc.tasks_start(count=count, timeout=timeout)
 
         else:
-            if timeout != 0:
-                self.ql.log.warning("Timeout is not supported in non-fast mode.")
+            # timeout is in microseconds, and is checked between peripheral updates
+            deadline = time.monotonic() + timeout / 1000000 if timeout else None
+
+            # instructions are counted per basic block when running in quanta
+            if self.quantum > 1 and self.__counting is None:
+                self.__counting = self.ql.hook_block(self.__count_block)
 
             self.runable = True
             self.counter = 0
@@ -77,10 +144,35 @@ class QlOsMcu(QlOs):
                 if current_address == end:
                     break
 
-                self.ql.emu_start(current_address, 0, count=1)
-                self.ql.hw.step()
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+
+                if self.quantum > 1:
+                    quantum = self.quantum
+
+                    if count:
+                        quantum = min(quantum, count - self.counter)
 
-                self.counter += 1
+                    # do not run past the next peripheral interrupt or pending input
+                    horizon = self.ql.hw.next_event()
+
+                    if horizon is not None:
+                        quantum = min(quantum, horizon)
+
+                    # a zero-length quantum only delivers the pending interrupts
+                    executed = self.__run_quantum(current_address, until, quantum) if quantum > 0 else 0
+
+                    self.ql.hw.advance(executed)
+
+                else:
+                    executed = 1
+
+                    self.ql.emu_start(current_address, 0, count=1)
+                    self.ql.hw.step()
+
+                self.counter += executed
 
                 if count == self.counter:
                     break
+
+        self.ql.hw.sync()
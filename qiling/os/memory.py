@@ -4,11 +4,26 @@
 #
 
 import bisect
+import copy
+import itertools
+import mmap
 import os
 import re
-from typing import Any, Callable, Iterator, List, Mapping, Optional, Pattern, Sequence, Tuple, Union
-
-from unicorn import UC_PROT_NONE, UC_PROT_READ, UC_PROT_WRITE, UC_PROT_EXEC, UC_PROT_ALL
+from ctypes import addressof, c_char
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, MutableSet, Optional, Pattern, Sequence, Tuple, Union
+
+from unicorn import UC_PROT_NONE, UC_PROT_READ, UC_PROT_WRITE, UC_PROT_EXEC, UC_PROT_ALL, UcError, UC_ERR_OK
+from unicorn import UC_HOOK_MEM_WRITE_PROT
+
+# unicorn native library handle, used for reading directly into caller buffers.
+# not part of unicorn public api, so fall back to the regular read if unavailable
+try:
+    from unicorn.unicorn import _uc as _uclib
+except ImportError:
+    try:
+        from unicorn.unicorn_py3.unicorn import uclib as _uclib
+    except ImportError:
+        _uclib = None
 
 from qiling import Qiling
 from qiling.exception import *
@@ -31,6 +46,23 @@ class QlMemoryManager:
         self.map_info: List[MapInfoEntry] = []
         self.mmio_cbs = {}
 
+        # sorted arrays of map info entries bounds, kept in sync with map_info. since
+        # map info entries never overlap, both arrays are sorted and allow bisecting
+        # ranges in O(log n) instead of walking the entire map info list
+        self.__lbounds: List[int] = []
+        self.__ubounds: List[int] = []
+
+        # incremental snapshot state: the saved memory state being tracked, the
+        # pages that were modified since it was taken and the tracking hook handle
+        self.__tracked: Optional[Mapping[str, Any]] = None
+        self.__dirty: Optional[MutableSet[int]] = None
+        self.__tracking_hook = None
+
+        # host memory mappings backing mapped ranges, by range base address: range end, host
+        # mapping object and the buffer exported to unicorn. a host mapping is released once
+        # its entire range gets unmapped
+        self.__host_maps: Dict[int, Tuple[int, mmap.mmap, Any]] = {}
+
         bit_stuff = {
             64: (1 << 64) - 1,
             32: (1 << 32) - 1,
@@ -49,15 +81,7 @@ class QlMemoryManager:
         assert self.pagesize & (self.pagesize - 1) == 0, 'pagesize has to be a power of 2'
 
     def __read_string(self, addr: int) -> str:
-        ret = bytearray()
-        c = self.read(addr, 1)
-
-        while c[0]:
-            ret += c
-            addr += 1
-            c = self.read(addr, 1)
-
-        return ret.decode()
+        return self.read_terminated(addr).decode()
 
     def __write_string(self, addr: int, s: str, encoding: str):
         self.write(addr, bytes(s, encoding) + b'\x00')
@@ -91,7 +115,43 @@ class QlMemoryManager:
             is_mmio: memory range is mmio
         """
 
-        bisect.insort(self.map_info, (mem_s, mem_e, mem_p, mem_info, is_mmio))
+        idx = bisect.bisect_left(self.__lbounds, mem_s)
+
+        self.map_info.insert(idx, (mem_s, mem_e, mem_p, mem_info, is_mmio))
+        self.__lbounds.insert(idx, mem_s)
+        self.__ubounds.insert(idx, mem_e)
+
+    def __overlapping(self, mem_s: int, mem_e: int) -> Tuple[int, int]:
+        """Get the indices range of map info entries that overlap the specified range.
+
+        Args:
+            mem_s: memory range start
+            mem_e: memory range end (exclusive)
+
+        Returns: indices of first overlapping entry and one past the last overlapping
+        entry. if no entry overlaps, both indices are equal
+        """
+
+        # first entry to end after range start
+        i0 = bisect.bisect_right(self.__ubounds, mem_s)
+
+        # one past the last entry to start before range end
+        i1 = bisect.bisect_left(self.__lbounds, mem_e, i0)
+
+        return i0, i1
+
+    def __containing(self, addr: int) -> int:
+        """Get the index of the map info entry that contains the specified address.
+
+        Returns: entry index, or -1 if address is not mapped
+        """
+
+        idx = bisect.bisect_right(self.__lbounds, addr) - 1
+
+        if idx >= 0 and addr < self.__ubounds[idx]:
+            return idx
+
+        return -1
 
     def del_mapinfo(self, mem_s: int, mem_e: int):
         """Subtract a memory range from map.
@@ -101,51 +161,41 @@ class QlMemoryManager:
             mem_e: memory range end
         """
 
-        overlap_ranges = [idx for idx, (lbound, ubound, _, _, _) in enumerate(self.map_info) if (mem_s < ubound) and (mem_e > lbound)]
+        # indices of first and last overlapping ranges. since map info is always
+        # sorted, we know that all overlapping rages are consecutive
+        i0, i1 = self.__overlapping(mem_s, mem_e)
 
-        def __split_overlaps():
-            for idx in overlap_ranges:
-                lbound, ubound, perms, label, is_mmio = self.map_info[idx]
+        if i0 == i1:
+            return
 
+        def __split_overlaps():
+            for lbound, ubound, perms, label, is_mmio in self.map_info[i0:i1]:
                 if lbound < mem_s:
                     yield (lbound, mem_s, perms, label, is_mmio)
 
                 if mem_e < ubound:
                     yield (mem_e, ubound, perms, label, is_mmio)
 
-        # indices of first and last overlapping ranges. since map info is always
-        # sorted, we know that all overlapping rages are consecutive, so i1 > i0
-        i0 = overlap_ranges[0]
-        i1 = overlap_ranges[-1]
-
-        # create new entries by splitting overlapping ranges.
-        # this has to be done before removing overlapping entries
-        new_entries = tuple(__split_overlaps())
-
-        # remove overlapping entries
-        del self.map_info[i0:i1 + 1]
+        # create new entries by splitting overlapping ranges. the new entries remain
+        # sorted and occupy the place of the ones they were split from
+        new_entries = list(__split_overlaps())
 
-        # add new ones
-        for entry in new_entries:
-            bisect.insort(self.map_info, entry)
+        self.map_info[i0:i1] = new_entries
+        self.__lbounds[i0:i1] = [lbound for lbound, *_ in new_entries]
+        self.__ubounds[i0:i1] = [ubound for _, ubound, *_ in new_entries]
 
     def change_mapinfo(self, mem_s: int, mem_e: int, mem_p: Optional[int] = None, mem_info: Optional[str] = None):
-        tmp_map_info: Optional[MapInfoEntry] = None
-        info_idx: int = -1
-
-        for idx, map_info in enumerate(self.map_info):
-            if mem_s >= map_info[0] and mem_e <= map_info[1]:
-                tmp_map_info = map_info
-                info_idx = idx
-                break
+        info_idx = self.__containing(mem_s)
 
-        if tmp_map_info is None:
+        if info_idx == -1 or mem_e > self.__ubounds[info_idx]:
             self.ql.log.error(f'Cannot change mapinfo at {mem_s:#08x}-{mem_e:#08x}')
             return
 
+        tmp_map_info = self.map_info[info_idx]
+
         if mem_p is not None:
             self.del_mapinfo(mem_s, mem_e)
-            self.add_mapinfo(mem_s, mem_e, mem_p, mem_info if mem_info else tmp_map_info[3])
+            self.add_mapinfo(mem_s, mem_e, mem_p, mem_info if mem_info else tmp_map_info[3], tmp_map_info[4])
             return
 
         if mem_info is not None:
@@ -208,6 +258,12 @@ class QlMemoryManager:
 
     # TODO: relying on the label string is risky; find a more reliable method
     def get_lib_base(self, filename: str) -> Optional[int]:
+        # loaded images are indexed by the loader; look there first
+        image = self.ql.loader.get_image_by_name(filename)
+
+        if image is not None:
+            return image.base
+
         # regex pattern to capture boxed labels prefixes
         p = re.compile(r'^\[.+\]\s*')
 
@@ -261,8 +317,16 @@ class QlMemoryManager:
         # round up to nearest alignment
         return (value + alignment - 1) & ~(alignment - 1)
 
-    def save(self):
+    def save(self, incremental: bool = False):
         """Save entire memory content.
+
+        Args:
+            incremental: start tracking memory pages modified from this point on, so
+            restoring this saved state would only write back the pages that have changed
+
+        Notes:
+            Only one saved state may be tracked at a time; saving another one incrementally
+            stops tracking the previous one, which can still be restored in full
         """
 
         mem_dict = {
@@ -277,12 +341,19 @@ class QlMemoryManager:
                 data = self.read(lbound, ubound - lbound)
                 mem_dict['ram'].append((lbound, ubound, perm, label, bytes(data)))
 
+        if incremental:
+            self.__track(mem_dict)
+
         return mem_dict
 
     def restore(self, mem_dict):
         """Restore saved memory content.
         """
 
+        if mem_dict is self.__tracked:
+            self.__restore_dirty(mem_dict)
+            return
+
         for lbound, ubound, perms, label, data in mem_dict['ram']:
             self.ql.log.debug(f'restoring memory range: {lbound:#08x} {ubound:#08x} {label}')
 
@@ -294,6 +365,9 @@ class QlMemoryManager:
             self.ql.log.debug(f'writing {len(data):#x} bytes at {lbound:#08x}')
             self.write(lbound, data)
 
+        self.__restore_mmio(mem_dict)
+
+    def __restore_mmio(self, mem_dict) -> None:
         for lbound, ubound, perms, label, read_cb, write_cb in mem_dict['mmio']:
             self.ql.log.debug(f"restoring mmio range: {lbound:#08x} {ubound:#08x} {label}")
 
@@ -301,6 +375,163 @@ class QlMemoryManager:
             if not self.is_mapped(lbound, size):
                 self.map_mmio(lbound, size, read_cb, write_cb, info=label)
 
+    def __track(self, mem_dict) -> None:
+        """Start tracking modified memory pages against a saved memory state.
+
+        Writable ram pages are write-protected on the emulator level (map info keeps the
+        actual permissions), so the first write to each page faults once, marks the page
+        as dirty and lifts the protection. Writes made through this memory manager mark
+        the pages they touch without faulting.
+        """
+
+        self.__tracked = mem_dict
+        self.__dirty = set()
+
+        if self.map_info:
+            self.__protect_clean(self.map_info[0][0], self.map_info[-1][1])
+
+        if self.__tracking_hook is None:
+            self.__tracking_hook = self.ql.uc.hook_add(UC_HOOK_MEM_WRITE_PROT, self.__on_write_prot)
+
+    def __on_write_prot(self, uc, access: int, addr: int, size: int, value: int, user_data) -> bool:
+        """Write protection faults handler, used for dirty pages tracking.
+        """
+
+        return self.handle_write_prot(addr, size)
+
+    def handle_write_prot(self, addr: int, size: int) -> bool:
+        """Resolve a write protection fault caused by dirty pages tracking, if any.
+
+        Qiling memory hooks dispatcher calls this before any user hook gets to see the
+        fault, since unicorn stops at the first hook that handles it.
+
+        Args:
+            addr: faulting address
+            size: faulting access size
+
+        Returns: True if the faulting access was due to dirty pages tracking and may be
+        resumed, False if it is a genuine protection violation
+        """
+
+        if self.__dirty is None:
+            return False
+
+        for page in range(self.align(addr), self.align_up(addr + size), self.pagesize):
+            idx = self.__containing(page)
+
+            if idx == -1:
+                return False
+
+            _, _, perms, _, is_mmio = self.map_info[idx]
+
+            # page is not meant to be writable
+            if is_mmio or not perms & UC_PROT_WRITE:
+                return False
+
+            # pages marked as modified by the memory manager might still be protected
+            self.__dirty.add(page)
+            self.ql.uc.mem_protect(page, self.pagesize, perms)
+
+        return True
+
+    def __mark_dirty(self, addr: int, size: int) -> None:
+        """Mark memory pages in range as modified.
+        """
+
+        self.__dirty.update(range(self.align(addr), self.align_up(addr + size), self.pagesize))
+
+    def __protect_clean(self, mem_s: int, mem_e: int) -> None:
+        """Write-protect all writable pages in range that have not been modified yet.
+
+        Write-only pages cannot be write-protected without making them inaccessible
+        altogether, so they are considered modified at all times instead.
+        """
+
+        mem_s = self.align(mem_s)
+        mem_e = self.align_up(mem_e)
+
+        i0, i1 = self.__overlapping(mem_s, mem_e)
+
+        for lbound, ubound, perms, _, is_mmio in self.map_info[i0:i1]:
+            if is_mmio or not perms & UC_PROT_WRITE:
+                continue
+
+            lbound = max(lbound, mem_s)
+            ubound = min(ubound, mem_e)
+
+            pages = range(lbound, ubound, self.pagesize)
+
+            if not perms & UC_PROT_READ:
+                self.__dirty.update(pages)
+                continue
+
+            run_s = None
+
+            for page in pages:
+                if page in self.__dirty:
+                    if run_s is not None:
+                        self.ql.uc.mem_protect(run_s, page - run_s, perms & ~UC_PROT_WRITE)
+                        run_s = None
+
+                elif run_s is None:
+                    run_s = page
+
+            if run_s is not None:
+                self.ql.uc.mem_protect(run_s, ubound - run_s, perms & ~UC_PROT_WRITE)
+
+    def __restore_dirty(self, mem_dict) -> None:
+        """Restore a tracked memory state by writing back only the pages that were modified
+        since it was saved.
+        """
+
+        saved = [(lbound, ubound, perms, label) for lbound, ubound, perms, label, _ in mem_dict['ram']]
+        current = [(lbound, ubound, perms, label) for lbound, ubound, perms, label, is_mmio in self.map_info if not is_mmio]
+
+        # memory layout has changed since the state was saved: remove ranges that were
+        # not there and bring back ranges that went missing, in full
+        if current != saved:
+            saved_set = set(saved)
+            current_set = set(current)
+
+            for lbound, ubound, perms, label in current:
+                if (lbound, ubound, perms, label) not in saved_set:
+                    self.ql.log.debug(f'removing memory range: {lbound:#08x} {ubound:#08x} {label}')
+                    self.unmap(lbound, ubound - lbound)
+
+            for lbound, ubound, perms, label, data in mem_dict['ram']:
+                if (lbound, ubound, perms, label) not in current_set:
+                    self.ql.log.debug(f'restoring memory range: {lbound:#08x} {ubound:#08x} {label}')
+
+                    self.map(lbound, ubound - lbound, perms, label)
+                    self.write(lbound, data)
+
+            self.__restore_mmio(mem_dict)
+
+        ram = mem_dict['ram']
+        lbounds = [lbound for lbound, *_ in ram]
+
+        dirty = sorted(self.__dirty)
+        self.__dirty.clear()
+
+        self.ql.log.debug(f'restoring {len(dirty)} modified pages')
+
+        for page in dirty:
+            idx = bisect.bisect_right(lbounds, page) - 1
+
+            if idx >= 0:
+                lbound, ubound, _, _, data = ram[idx]
+
+                if page < ubound:
+                    offset = page - lbound
+
+                    self.ql.uc.mem_write(page, data[offset:offset + self.pagesize])
+
+        # restored pages are clean again: write-protect them, consecutive pages at once
+        for _, run in itertools.groupby(enumerate(dirty), lambda elem: elem[1] - elem[0] * self.pagesize):
+            pages = [page for _, page in run]
+
+            self.__protect_clean(pages[0], pages[-1] + self.pagesize)
+
     def read(self, addr: int, size: int) -> bytearray:
         """Read bytes from memory.
 
@@ -313,6 +544,112 @@ class QlMemoryManager:
 
         return self.ql.uc.mem_read(addr, size)
 
+    def read_into(self, addr: int, buffer: Union[bytearray, memoryview]) -> None:
+        """Read bytes from memory directly into a caller-provided writable buffer,
+        without allocating an intermediate one.
+
+        Args:
+            addr: source address
+            buffer: writable buffer to fill; its length determines the amount of bytes to read
+        """
+
+        view = memoryview(buffer).cast('B')
+        size = view.nbytes
+
+        uch = getattr(self.ql.uc, '_uch', None)
+
+        if _uclib is None or uch is None or view.readonly:
+            view[:] = self.read(addr, size)
+            return
+
+        status = _uclib.uc_mem_read(uch, addr, (c_char * size).from_buffer(view), size)
+
+        if status != UC_ERR_OK:
+            raise UcError(status)
+
+    def readv(self, ranges: Iterable[Tuple[int, int]]) -> List[bytearray]:
+        """Read several memory ranges at once.
+
+        Args:
+            ranges: an iterable of 2-tuples containing source address and amount of bytes to read
+
+        Returns: a list of the bytes read from each of the ranges, in the same order
+        """
+
+        return [self.read(addr, size) for addr, size in ranges]
+
+    def writev(self, chunks: Iterable[Tuple[int, bytes]]) -> None:
+        """Write several data chunks at once.
+
+        Args:
+            chunks: an iterable of 2-tuples containing destination address and bytes to write
+        """
+
+        for addr, data in chunks:
+            self.write(addr, data)
+
+    def read_terminated(self, addr: int, terminator: bytes = b'\x00', maxlen: int = 0) -> bytearray:
+        """Read a terminated sequence of bytes from memory, such as a null-terminated string.
+        Memory is read in chunks of growing size rather than byte by byte, and never beyond
+        the memory range that holds the terminator. MMIO ranges are read one element at a
+        time, to avoid triggering peripheral side effects past the terminator.
+
+        Args:
+            addr: source address
+            terminator: sequence terminator; its length also determines the element size
+            maxlen: limit number of elements to read before reaching the terminator, 0 for
+            unlimited length
+
+        Returns: bytes read, excluding the terminator
+        """
+
+        elemsize = len(terminator)
+        maxsize = maxlen * elemsize
+
+        data = bytearray()
+        pos = 0
+        chunk = 64
+
+        while True:
+            idx = self.__containing(addr)
+
+            # unmapped memory: let the read fail as it normally would
+            if idx == -1:
+                size = elemsize
+
+            else:
+                _, ubound, _, _, is_mmio = self.map_info[idx]
+
+                if is_mmio:
+                    size = elemsize
+                else:
+                    size = min(chunk, ubound - addr)
+                    chunk = min(chunk * 2, self.pagesize)
+
+            if maxsize:
+                size = min(size, maxsize - len(data))
+
+            data += self.read(addr, size)
+            addr += size
+
+            idx = data.find(terminator, pos)
+
+            # the terminator is valid only when it is aligned to elements boundary
+            while idx != -1 and idx % elemsize:
+                idx = data.find(terminator, idx + 1)
+
+            if idx != -1:
+                del data[idx:]
+                break
+
+            # resume the search on the last incomplete element, if any
+            pos = len(data) - len(data) % elemsize
+
+            if maxsize and len(data) >= maxsize:
+                break
+
+        return data
+
     def read_ptr(self, addr: int, size: int = 0) -> int:
         """Read an integer value from a memory address.
         Bytes read will be unpacked using emulated architecture properties.
@@ -349,6 +686,9 @@ class QlMemoryManager:
 
         self.ql.uc.mem_write(addr, data)
 
+        if self.__dirty is not None:
+            self.__mark_dirty(addr, len(data))
+
     def write_ptr(self, addr: int, value: int, size: int = 0) -> None:
         """Write an integer value to a memory address.
         Bytes written will be packed using emulated architecture properties.
@@ -396,7 +736,8 @@ class QlMemoryManager:
         assert begin < end, 'search arguments do not make sense'
 
         # narrow the search down to relevant ranges; mmio ranges are excluded due to potential read side effects
-        ranges = [(max(begin, lbound), min(ubound, end)) for lbound, ubound, _, _, is_mmio in self.map_info if not (end < lbound or ubound < begin or is_mmio)]
+        i0, i1 = self.__overlapping(begin, end)
+        ranges = [(max(begin, lbound), min(ubound, end)) for lbound, ubound, _, _, is_mmio in self.map_info[i0:i1] if not is_mmio]
         results = []
 
         # if needle is a bytes sequence use it verbatim, not as a pattern
@@ -425,6 +766,22 @@ class QlMemoryManager:
         if (addr, addr + size) in self.mmio_cbs:
             del self.mmio_cbs[(addr, addr+size)]
 
+        if self.__host_maps:
+            self.__release_host_maps()
+
+    def __release_host_maps(self) -> None:
+        """Release host mappings whose ranges are no longer mapped.
+        """
+
+        released = [base for base, (end, _, _) in self.__host_maps.items() if self.is_available(base, end - base)]
+
+        for base in released:
+            _, host, buffer = self.__host_maps.pop(base)
+
+            # host mapping cannot be closed while its buffer is exported
+            del buffer
+            host.close()
+
     def unmap_between(self, mem_s: int, mem_e: int) -> None:
         """Reclaim any allocated memory region within the specified range.
 
@@ -435,7 +792,8 @@ class QlMemoryManager:
 
         # map info is about to change during the unmapping loop, so we have to
         # determine the relevant ranges beforehand
-        mapped = [(lbound, ubound) for lbound, ubound, _, _, _ in self.map_info if (mem_s < ubound) and (mem_e > lbound)]
+        i0, i1 = self.__overlapping(mem_s, mem_e)
+        mapped = list(zip(self.__lbounds[i0:i1], self.__ubounds[i0:i1]))
 
         for lbound, ubound in mapped:
             lbound = max(mem_s, lbound)
@@ -450,30 +808,6 @@ class QlMemoryManager:
         for begin, end, _ in self.ql.uc.mem_regions():
             self.unmap(begin, end - begin + 1)
 
-    def __mapped_regions(self) -> Iterator[Tuple[int, int]]:
-        """Iterate through all mapped memory regions, consolidating adjacent regions
-        together to a continuous one. Protection bits and labels are ignored.
-        """
-
-        if not self.map_info:
-            return
-
-        iter_memmap = iter(self.map_info)
-
-        p_lbound, p_ubound, _, _, _ = next(iter_memmap)
-
-        # map_info is assumed to contain non-overlapping regions sorted by lbound
-        for lbound, ubound, _, _, _ in iter_memmap:
-            if lbound == p_ubound:
-                p_ubound = ubound
-            else:
-                yield (p_lbound, p_ubound)
-
-                p_lbound = lbound
-                p_ubound = ubound
-
-        yield (p_lbound, p_ubound)
-
     def is_available(self, addr: int, size: int) -> bool:
         """Query whether the memory range starting at `addr` and is of length of `size` bytes
         is available for allocation.
@@ -486,8 +820,10 @@ class QlMemoryManager:
         begin = addr
         end = addr + size
 
-        # make sure neither begin nor end are enclosed within a mapped range, or entirely enclosing one
-        return not any((lbound <= begin < ubound) or (lbound < end <= ubound) or (begin <= lbound < ubound <= end) for lbound, ubound in self.__mapped_regions())
+        # make sure no mapped range overlaps the requested one
+        i0, i1 = self.__overlapping(begin, end)
+
+        return i0 == i1
 
     def is_mapped(self, addr: int, size: int) -> bool:
         """Query whether the memory range starting at `addr` and is of length of `size` bytes
@@ -501,7 +837,20 @@ class QlMemoryManager:
         begin = addr
         end = addr + size
 
-        return any((lbound <= begin < end <= ubound) for lbound, ubound in self.__mapped_regions())
+        idx = self.__containing(begin)
+
+        if idx == -1:
+            return False
+
+        # walk through adjacent ranges until the requested range is covered or a gap is found
+        last = len(self.__lbounds) - 1
+        ubound = self.__ubounds[idx]
+
+        while ubound < end and idx < last and self.__lbounds[idx + 1] == ubound:
+            idx += 1
+            ubound = self.__ubounds[idx]
+
+        return end <= ubound
 
     def find_free_space(self, size: int, minaddr: Optional[int] = None, maxaddr: Optional[int] = None, align: Optional[int] = None) -> int:
         """Locate an unallocated memory that is large enough to contain a range in size of
@@ -536,12 +885,18 @@ class QlMemoryManager:
         if (maxaddr - minaddr) < size:
             raise ValueError('search domain is too small')
 
-        # get gap ranges between mapped ones and memory bounds
-        gaps_ubounds = tuple(lbound for lbound, _, _, _, _ in self.map_info) + (mem_ubound,)
-        gaps_lbounds = (mem_lbound,) + tuple(ubound for _, ubound, _, _, _ in self.map_info)
-        gaps = ((lbound, ubound) for lbound, ubound in zip(gaps_lbounds, gaps_ubounds) if lbound < maxaddr and minaddr < ubound)
+        # gap ranges lie between mapped ones and memory bounds: the i-th gap spans from the
+        # end of the (i-1)-th range to the start of the i-th one. skip all gaps that end
+        # before minaddr and start from the first relevant one
+        first = bisect.bisect_right(self.__lbounds, minaddr)
+
+        gaps_ubounds = itertools.chain(itertools.islice(self.__lbounds, first, None), (mem_ubound,))
+        gaps_lbounds = itertools.chain((self.__ubounds[first - 1] if first else mem_lbound,), itertools.islice(self.__ubounds, first, None))
+
+        for lbound, ubound in zip(gaps_lbounds, gaps_ubounds):
+            if lbound >= maxaddr:
+                break
 
-        for lbound, ubound in gaps:
             addr = self.align_up(max(minaddr, lbound), align)
             end = addr + size
 
@@ -585,7 +940,11 @@ class QlMemoryManager:
         self.ql.uc.mem_protect(aligned_address, aligned_size, perms)
         self.change_mapinfo(aligned_address, aligned_address + aligned_size, perms)
 
-    def map(self, addr: int, size: int, perms: int = UC_PROT_ALL, info: Optional[str] = None):
+        # keep unmodified pages write-protected while tracking them
+        if self.__dirty is not None and perms & UC_PROT_WRITE:
+            self.__protect_clean(aligned_address, aligned_address + aligned_size)
+
+    def map(self, addr: int, size: int, perms: int = UC_PROT_ALL, info: Optional[str] = None, ptr: Optional[int] = None):
         """Map a new memory range.
 
         Args:
@@ -604,9 +963,51 @@ class QlMemoryManager:
         if not self.is_available(addr, size):
             raise QlMemoryMappedError('Requested memory is unavailable')
 
-        self.ql.uc.mem_map(addr, size, perms)
+        if ptr is None:
+            self.ql.uc.mem_map(addr, size, perms)
+        else:
+            self.ql.uc.mem_map_ptr(addr, size, perms, ptr)
+
         self.add_mapinfo(addr, addr + size, perms, info or '[mapped]', is_mmio=False)
 
+    def map_host(self, addr: int, size: int, host: mmap.mmap, perms: int = UC_PROT_ALL, info: Optional[str] = None):
+        """Map a new memory range backed by a host memory mapping, without copying its content.
+        Modifications to the memory range are reflected in the host mapping and vice versa.
+
+        The memory manager takes ownership of the host mapping and closes it once the entire
+        memory range gets unmapped.
+
+        Args:
+            addr: memory range base address
+            size: memory range size (in bytes); must not exceed the host mapping pages
+            host: a writable host memory mapping
+            perms: requested permissions mask
+            info: range label string
+
+        Raises:
+            QlMemoryMappedError: in case requested memory range is not fully available
+        """
+
+        assert size <= (len(host) + mmap.PAGESIZE - 1) & ~(mmap.PAGESIZE - 1), 'memory range exceeds host mapping'
+
+        buffer = (c_char * len(host)).from_buffer(host)
+
+        try:
+            self.map(addr, size, perms, info, ptr=addressof(buffer))
+        except QlMemoryMappedError:
+            # let the caller close the host mapping
+            del buffer
+            raise
+
+        self.__host_maps[addr] = (addr + size, host, buffer)
+
+    def is_host_mapped(self, addr: int) -> bool:
+        """Query whether an address belongs to a memory range that is backed by a host
+        memory mapping.
+        """
+
+        return any(base <= addr < end for base, (end, _, _) in self.__host_maps.items()) and self.is_mapped(addr, 1)
+
     def map_mmio(self, addr: int, size: int, read_cb: Optional[MmioReadCallback], write_cb: Optional[MmioWriteCallback], info: str = '[mmio]'):
         # TODO: mmio memory overlap with ram? Is that possible?
         # TODO: Can read_cb or write_cb be None? How uc handle that access?
@@ -667,24 +1068,26 @@ class QlMemoryHeap:
         self.mem_alloc = []
 
     def save(self) -> Mapping[str, Any]:
+        # chunks are modified in place, so the saved state has to hold copies of them
         saved_state = {
-            'chunks'        : self.chunks,
+            'chunks'        : [copy.copy(chunk) for chunk in self.chunks],
             'start_address' : self.start_address,
             'end_address'   : self.end_address,
             'current_alloc' : self.current_alloc,
             'current_use'   : self.current_use,
-            'mem_alloc'     : self.mem_alloc
+            'mem_alloc'     : list(self.mem_alloc)
         }
 
         return saved_state
 
     def restore(self, saved_state: Mapping[str, Any]):
-        self.chunks         = saved_state['chunks']
+        # leave the saved state intact, so it may be restored again
+        self.chunks         = [copy.copy(chunk) for chunk in saved_state['chunks']]
         self.start_address  = saved_state['start_address']
         self.end_address    = saved_state['end_address']
         self.current_alloc  = saved_state['current_alloc']
         self.current_use    = saved_state['current_use']
-        self.mem_alloc      = saved_state['mem_alloc']
+        self.mem_alloc      = list(saved_state['mem_alloc'])
 
     def alloc(self, size: int) -> int:
         """Allocate heap memory.
@@ -1056,3 +1056,33 @@ SHMAT       = 21
 SHMDT       = 22
 SHMGET      = 23
 SHMCTL      = 24
+
+# poll events
+# see: https://elixir.bootlin.com/linux/v5.19.17/source/include/uapi/asm-generic/poll.h
+POLLIN      = 0x0001
+POLLPRI     = 0x0002
+POLLOUT     = 0x0004
+POLLERR     = 0x0008
+POLLHUP     = 0x0010
+POLLNVAL    = 0x0020
+
+# epoll syscall
+# see: https://elixir.bootlin.com/linux/v5.19.17/source/include/uapi/linux/eventpoll.h
+EPOLL_CTL_ADD = 1
+EPOLL_CTL_DEL = 2
+EPOLL_CTL_MOD = 3
+
+EPOLLIN         = 0x00000001
+EPOLLPRI        = 0x00000002
+EPOLLOUT        = 0x00000004
+EPOLLERR        = 0x00000008
+EPOLLHUP        = 0x00000010
+EPOLLRDNORM     = 0x00000040
+EPOLLRDBAND     = 0x00000080
+EPOLLWRNORM     = 0x00000100
+EPOLLWRBAND     = 0x00000200
+EPOLLRDHUP      = 0x00002000
+EPOLLEXCLUSIVE  = 1 << 28
+EPOLLWAKEUP     = 1 << 29
+EPOLLONESHOT    = 1 << 30
+EPOLLET         = 1 << 31
@@ -3,8 +3,11 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 import os
+import select
 from socket import socket, AddressFamily, SocketKind, socketpair
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
+
+from qiling.os.posix.const import EPOLLEXCLUSIVE, EPOLLWAKEUP
 
 try:
     import fcntl
@@ -183,3 +186,119 @@ class ql_pipe:
         new_fd = os.dup(self.__fd)
 
         return ql_pipe(new_fd)
+
+
+class ql_epoll:
+    """An epoll instance. The interest list is kept by the instance, while readiness
+    of the registered files is monitored by a host epoll instance.
+
+    Requested events are passed on to the host as they are, hence errors and hangups
+    are always reported, one-shot registrations are disarmed once they report until
+    they are modified, and edge-triggered registrations report only on state changes.
+    """
+
+    # events that have no meaning for the emulated process, and would only make the host
+    # refuse or restrict the registration
+    HOST_IGNORED = EPOLLEXCLUSIVE | EPOLLWAKEUP
+
+    def __init__(self):
+        self.__epoll = select.epoll()
+        self.__refs = 1
+
+        # interest list: requested events and user data, keyed by emulated fd
+        self.interest: Dict[int, Tuple[int, int]] = {}
+
+        # registered emulated fds, keyed by the host file they refer to
+        self.__fds: Dict[int, int] = {}
+
+    @classmethod
+    def open(cls) -> 'ql_epoll':
+        return cls()
+
+    def __disarm(self, fileno: int) -> None:
+        self.__fds.pop(fileno, None)
+
+        # the host drops files from its interest list once they are closed
+        try:
+            self.__epoll.unregister(fileno)
+        except OSError:
+            pass
+
+    def register(self, fd: int, fileno: int, events: int, data: int) -> None:
+        """Add a file to the interest list.
+
+        Raises: `KeyError` if fd is already registered, `OSError` if host file cannot be monitored
+        """
+
+        if fd in self.interest:
+            raise KeyError(fd)
+
+        # the host file may have been left registered by an emulated fd that was closed since
+        stale = self.__fds.get(fileno)
+
+        if stale is not None:
+            self.interest.pop(stale, None)
+            self.__disarm(fileno)
+
+        self.__epoll.register(fileno, events & ~ql_epoll.HOST_IGNORED)
+        self.__fds[fileno] = fd
+        self.interest[fd] = (events, data)
+
+    def modify(self, fd: int, fileno: int, events: int, data: int) -> None:
+        """Change the requested events and user data of a file in the interest list.
+        This also re-arms one-shot registrations.
+
+        Raises: `KeyError` if fd is not registered
+        """
+
+        if fd not in self.interest:
+            raise KeyError(fd)
+
+        self.__epoll.modify(fileno, events & ~ql_epoll.HOST_IGNORED)
+        self.interest[fd] = (events, data)
+
+    def unregister(self, fd: int, fileno: int) -> None:
+        """Remove a file from the interest list.
+
+        Raises: `KeyError` if fd is not registered
+        """
+
+        del self.interest[fd]
+        self.__disarm(fileno)
+
+    def poll(self, timeout: Optional[float], maxevents: int) -> List[Tuple[int, int]]:
+        """Wait for registered files to become ready.
+
+        Args:
+            timeout: max time to wait in seconds, or `None` to wait indefinitely
+            maxevents: max number of events to report
+
+        Returns: a list of reported events and user data
+        """
+
+        ready = []
+
+        for fileno, revents in self.__epoll.poll(-1 if timeout is None else timeout, maxevents):
+            fd = self.__fds.get(fileno)
+
+            if fd is not None:
+                _, data = self.interest[fd]
+
+                ready.append((revents, data))
+
+        return ready
+
+    def fileno(self) -> int:
+        return self.__epoll.fileno()
+
+    def close(self) -> None:
+        self.__refs -= 1
+
+        if not self.__refs:
+            self.__epoll.close()
+
+    def dup(self) -> 'ql_epoll':
+        # duplicated fds refer to the same epoll instance
+        self.__refs += 1
+
+        return self
@@ -3,22 +3,37 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
+import logging
 from inspect import signature, Parameter
-from typing import Dict, TextIO, Union, Callable, IO, List, Optional
+from typing import Dict, NamedTuple, Sequence, TextIO, Union, Callable, IO, List, Optional
 
 from qiling import Qiling
-from qiling.const import QL_ARCH, QL_INTERCEPT
+from qiling.const import QL_ARCH, QL_INTERCEPT, QL_VERBOSE
 from qiling.exception import QlErrorSyscallNotFound
 from qiling.os.os import QlOs
 from qiling.os.posix.const import NR_OPEN, errors
 from qiling.os.posix.msq import QlMsq
 from qiling.os.posix.shm import QlShm
 from qiling.os.posix.syscall.abi import QlSyscallABI, arm, intel, mips, ppc, riscv
+from qiling.os.stats import QlOsNullStats
 from qiling.utils import ql_get_module, ql_get_module_function
 
 SYSCALL_PREF: str = f'ql_syscall_'
 
 
+class QlSyscallEntry(NamedTuple):
+    """Resolved syscall dispatch details.
+    """
+
+    name: str                       # syscall name, as it appears in stats
+    basename: str                   # syscall name without its prefix, as it appears in log
+    handler: Optional[Callable]     # syscall implementation or replacement, None if not implemented
+    onenter: Optional[Callable]     # on-enter hook, if any
+    onexit: Optional[Callable]      # on-exit hook, if any
+    params: Sequence[str]           # handler parameters names
+    args: Sequence[str]             # handler parameters names, as they appear in log
+
+
 class QlFileDes:
     def __init__(self):
         self.__fds: List[Optional[IO]] = [None] * NR_OPEN
@@ -61,6 +76,9 @@ class QlOsPosix(QlOs):
         self.bindtolocalhost = conf.getboolean('bindtolocalhost')
         self.ifrname_ovr = conf.get('ifrname_override')
 
+        # back file mappings with host memory mappings instead of copying file content
+        self.mmap_zero_copy = self.profile.getboolean('MISC', 'mmap_zero_copy', fallback=False)
+
         self.posix_syscall_hooks = {
             QL_INTERCEPT.CALL:  {},
             QL_INTERCEPT.ENTER: {},
@@ -93,6 +111,9 @@ class QlOsPosix(QlOs):
         self._shm = QlShm()
         self._msq = QlMsq()
 
+        # syscalls dispatch table, populated lazily by syscall number
+        self.__syscall_table: Dict[int, QlSyscallEntry] = {}
+
     def __get_syscall_mapper(self, archtype: QL_ARCH):
         qlos_path = f'.os.{self.type.name.lower()}.map_syscall'
         qlos_func = 'get_syscall_mapper'
@@ -142,6 +163,9 @@ class QlOsPosix(QlOs):
 
         self.posix_syscall_hooks[intercept][target] = handler
 
+        # hooks have changed; dispatch entries have to be resolved again
+        self.__syscall_table.clear()
+
     def set_api(self, target: str, handler: Callable, intercept: QL_INTERCEPT = QL_INTERCEPT.CALL):
         if self.ql.loader.is_driver:
             super().set_api(target, handler, intercept)
@@ -163,21 +187,21 @@ class QlOsPosix(QlOs):
 
         return f'{ret:#x}{f" ({errors[-ret]})" if -ret in errors else f""}'
 
-    def load_syscall(self):
-        syscall_id = self.syscall_abi.get_id()
+    def __resolve_syscall(self, syscall_id: int) -> QlSyscallEntry:
+        """Resolve the dispatch details of a syscall.
+        """
+
         syscall_name = self.syscall_mapper(syscall_id)
 
-        # get syscall on-enter hook (if any)
-        hooks_dict = self.posix_syscall_hooks[QL_INTERCEPT.ENTER]
-        onenter_hook = hooks_dict.get(syscall_name) or hooks_dict.get(syscall_id)
+        def __get_hook(intercept: QL_INTERCEPT) -> Optional[Callable]:
+            hooks_dict = self.posix_syscall_hooks[intercept]
 
-        # get syscall on-exit hook (if any)
-        hooks_dict = self.posix_syscall_hooks[QL_INTERCEPT.EXIT]
-        onexit_hook = hooks_dict.get(syscall_name) or hooks_dict.get(syscall_id)
+            return hooks_dict.get(syscall_name) or hooks_dict.get(syscall_id)
 
-        # get syscall replacement hook (if any)
-        hooks_dict = self.posix_syscall_hooks[QL_INTERCEPT.CALL]
-        syscall_hook = hooks_dict.get(syscall_name) or hooks_dict.get(syscall_id)
+        # get syscall on-enter, on-exit and replacement hooks (if any)
+        onenter_hook = __get_hook(QL_INTERCEPT.ENTER)
+        onexit_hook = __get_hook(QL_INTERCEPT.EXIT)
+        syscall_hook = __get_hook(QL_INTERCEPT.CALL)
 
         if not syscall_hook:
             def __get_os_module(osname: str):
@@ -189,22 +213,44 @@ class QlOsPosix(QlOs):
             # look in os-specific and posix syscall hooks
             syscall_hook = getattr(os_syscalls, syscall_name, None) or getattr(posix_syscalls, syscall_name, None)
 
-        if syscall_hook:
-            syscall_name = syscall_hook.__name__
+        if not syscall_hook:
+            return QlSyscallEntry(syscall_name, syscall_name, None, None, None, (), ())
 
-            # extract the parameters list from hook signature
-            param_names = tuple(signature(syscall_hook).parameters.values())
+        syscall_name = syscall_hook.__name__
+        syscall_basename = syscall_name[len(SYSCALL_PREF) if syscall_name.startswith(SYSCALL_PREF) else 0:]
 
-            # skip first arg (always 'ql') and filter out python special args (*args and **kwargs)
-            param_names = [info.name for info in param_names[1:] if info.kind == Parameter.POSITIONAL_OR_KEYWORD]
+        # extract the parameters list from hook signature
+        param_names = tuple(signature(syscall_hook).parameters.values())
+
+        # skip first arg (always 'ql') and filter out python special args (*args and **kwargs)
+        param_names = tuple(info.name for info in param_names[1:] if info.kind == Parameter.POSITIONAL_OR_KEYWORD)
+
+        # cut the first part of the arg if it is of form fstatat64_fd
+        arg_names = tuple(name.partition('_')[-1] if name.startswith(f'{syscall_basename}_') else name for name in param_names)
+
+        return QlSyscallEntry(syscall_name, syscall_basename, syscall_hook, onenter_hook, onexit_hook, param_names, arg_names)
+
+    def load_syscall(self):
+        syscall_id = self.syscall_abi.get_id()
+        entry = self.__syscall_table.get(syscall_id)
+
+        if entry is None:
+            entry = self.__resolve_syscall(syscall_id)
+            self.__syscall_table[syscall_id] = entry
+
+        syscall_name = entry.name
+        syscall_hook = entry.handler
+
+        if syscall_hook:
+            param_names = entry.params
 
             # read parameter values
             params = self.syscall_abi.get_params(len(param_names))
 
             try:
                 # if set, fire up the on-enter hook and let it override original args set
-                if onenter_hook:
-                    overrides = onenter_hook(self.ql, *params)
+                if entry.onenter:
+                    overrides = entry.onenter(self.ql, *params)
 
                     if overrides is not None:
                         _, params = overrides
@@ -213,8 +259,8 @@ class QlOsPosix(QlOs):
                 retval = syscall_hook(self.ql, *params)
 
                 # if set, fire up the on-exit hook and let it override the return value
-                if onexit_hook:
-                    override = onexit_hook(self.ql, *params, retval)
+                if entry.onexit:
+                    override = entry.onexit(self.ql, *params, retval)
 
                     if override is not None:
                         retval = override
@@ -230,23 +276,18 @@ class QlOsPosix(QlOs):
                 self.ql.log.exception(f'Syscall ERROR: {syscall_name} DEBUG: {e}')
                 raise e
 
-            # print out log entry
-            syscall_basename = syscall_name[len(SYSCALL_PREF) if syscall_name.startswith(SYSCALL_PREF) else 0:]
-
-            args = []
-
-            for name, value in zip(param_names, params):
-                # cut the first part of the arg if it is of form fstatat64_fd
-                if name.startswith(f'{syscall_basename}_'):
-                    name = name.partition('_')[-1]
+            pc = self.ql.arch.regs.arch_pc
 
-                args.append((name, f'{value:#x}'))
+            # print out log entry, unless it is going to be discarded anyway
+            if self.ql.log.isEnabledFor(logging.DEBUG if self.ql.verbose >= QL_VERBOSE.DEBUG else logging.INFO):
+                args = [(name, f'{value:#x}') for name, value in zip(entry.args, params)]
 
-            sret = QlOsPosix.getNameFromErrorCode(retval)
-            self.utils.print_function(self.ql.arch.regs.arch_pc, syscall_basename, args, sret, False)
+                sret = QlOsPosix.getNameFromErrorCode(retval)
+                self.utils.print_function(pc, entry.basename, args, sret, False)
 
-            # record syscall statistics
-            self.stats.log_api_call(self.ql.arch.regs.arch_pc, syscall_name, dict(zip(param_names, params)), retval, None)
+            # record syscall statistics, unless they are discarded anyway
+            if not isinstance(self.stats, QlOsNullStats):
+                self.stats.log_api_call(pc, syscall_name, dict(zip(param_names, params)), retval, None)
         else:
             self.ql.log.warning(f'{self.ql.arch.regs.arch_pc:#x}: syscall {syscall_name} number = {syscall_id:#x}({syscall_id:d}) not implemented')
 
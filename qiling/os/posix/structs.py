@@ -142,3 +142,16 @@ def make_pollfd(archbits: int, endian: QL_ENDIAN):
         )
 
     return pollfd
+
+
+def make_epoll_event(endian: QL_ENDIAN, packed: bool):
+    # epoll_event is packed on intel architectures, and naturally aligned elsewhere
+    Struct = struct.get_aligned_struct(32 if packed else 64, endian)
+
+    class epoll_event(Struct):
+        _fields_ = (
+            ('events', ctypes.c_uint32),
+            ('data',   ctypes.c_uint64)
+        )
+
+    return epoll_event
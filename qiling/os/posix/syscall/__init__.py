@@ -2,6 +2,7 @@
 #
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
+from .epoll import *
 from .fcntl import *
 from .futex import *
 from .ioctl import *
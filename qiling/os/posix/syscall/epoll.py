@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+from typing import List, Optional, Tuple
+
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS
+from qiling.os.posix.const import *
+from qiling.os.posix.filestruct import ql_epoll
+from qiling.os.posix.structs import make_epoll_event
+
+# emulated time between readiness checks of a thread that waits on an epoll instance
+# while other threads keep running, in seconds
+EPOLL_RETRY_INTERVAL = 0.001
+
+
+def __epoll_event(ql: Qiling):
+    return make_epoll_event(ql.arch.endian, ql.arch.type in (QL_ARCH.X86, QL_ARCH.X8664))
+
+
+def __epoll_create(ql: Qiling) -> int:
+    if ql.host.os != QL_OS.LINUX:
+        ql.log.warning('syscall epoll_create not implemented')
+        return -ENOSYS
+
+    idx = next((i for i in range(NR_OPEN) if ql.os.fd[i] is None), -1)
+
+    if idx == -1:
+        return -EMFILE
+
+    ql.os.fd[idx] = ql_epoll.open()
+
+    return idx
+
+
+def ql_syscall_epoll_create(ql: Qiling, size: int):
+    if ql.unpack32s(ql.pack32(size & 0xffffffff)) <= 0:
+        return -EINVAL
+
+    return __epoll_create(ql)
+
+
+def ql_syscall_epoll_create1(ql: Qiling, flags: int):
+    # the only valid flag is EPOLL_CLOEXEC, which does not affect the emulation
+    return __epoll_create(ql)
+
+
+def ql_syscall_epoll_ctl(ql: Qiling, epfd: int, op: int, fd: int, event: int):
+    if epfd not in range(NR_OPEN) or ql.os.fd[epfd] is None:
+        return -EBADF
+
+    if fd not in range(NR_OPEN) or ql.os.fd[fd] is None:
+        return -EBADF
+
+    ep = ql.os.fd[epfd]
+
+    if not isinstance(ep, ql_epoll) or epfd == fd:
+        return -EINVAL
+
+    fileno = ql.os.fd[fd].fileno()
+
+    try:
+        if op == EPOLL_CTL_DEL:
+            ep.unregister(fd, fileno)
+
+        elif op in (EPOLL_CTL_ADD, EPOLL_CTL_MOD):
+            ev = __epoll_event(ql).load_from(ql.mem, event)
+
+            if op == EPOLL_CTL_ADD:
+                ep.register(fd, fileno, ev.events, ev.data)
+            else:
+                ep.modify(fd, fileno, ev.events, ev.data)
+
+        else:
+            return -EINVAL
+
+    except KeyError:
+        return -EEXIST if op == EPOLL_CTL_ADD else -ENOENT
+
+    except (OSError, ValueError) as e:
+        # host refuses to monitor the file (e.g. a regular file)
+        ql.log.debug(f'epoll_ctl: could not monitor fd {fd}: {e}')
+
+        return -EPERM
+
+    return 0
+
+
+def __write_events(ql: Qiling, events: int, ready: List[Tuple[int, int]]) -> int:
+    if ready:
+        epoll_event = __epoll_event(ql)
+
+        # write all ready events at once
+        ql.mem.write(events, b''.join(bytes(epoll_event(revents, data)) for revents, data in ready))
+
+    return len(ready)
+
+
+def __do_epoll_wait(ql: Qiling, epfd: int, events: int, maxevents: int, timeout: Optional[float]) -> int:
+    if epfd not in range(NR_OPEN) or ql.os.fd[epfd] is None:
+        return -EBADF
+
+    ep = ql.os.fd[epfd]
+
+    if not isinstance(ep, ql_epoll):
+        return -EINVAL
+
+    maxevents = ql.unpack32s(ql.pack32(maxevents & 0xffffffff))
+
+    if maxevents <= 0:
+        return -EINVAL
+
+    tm = ql.os.thread_management
+
+    # waiting on the host would hold back all other threads. as long as there are threads
+    # that may run, check the epoll instance without waiting and let them run in between
+    if tm is not None and timeout != 0 and tm.has_pending():
+        expires = None if timeout is None else tm.clock() + timeout
+
+        def __wait(t) -> None:
+            now = tm.clock()
+            pending = tm.has_pending()
+
+            # nothing else may run anymore: wait on the host for the rest of the timeout
+            if pending:
+                wait = 0
+            else:
+                wait = None if expires is None else max(expires - now, 0)
+
+            try:
+                ready = ep.poll(wait, maxevents)
+            except InterruptedError:
+                retval = -EINTR
+            except (OSError, ValueError):
+                # the epoll instance was closed in the meantime
+                retval = -EBADF
+            else:
+                if not ready and pending and (expires is None or now < expires):
+                    deadline = now + EPOLL_RETRY_INTERVAL
+
+                    tm.block(t, deadline if expires is None else min(deadline, expires), __wait)
+                    return
+
+                retval = __write_events(ql, events, ready)
+
+            # the thread context is loaded by now; override the syscall return value
+            ql.os.syscall_abi.set_return_value(retval)
+
+        ready = ep.poll(0, maxevents)
+
+        if not ready:
+            tm.block(tm.cur_thread, tm.clock(), __wait)
+            ql.emu_stop()
+
+            return 0
+
+    else:
+        try:
+            ready = ep.poll(timeout, maxevents)
+        except InterruptedError:
+            return -EINTR
+
+    return __write_events(ql, events, ready)
+
+
+def ql_syscall_epoll_wait(ql: Qiling, epfd: int, events: int, maxevents: int, timeout: int):
+    timeout = ql.unpack32s(ql.pack32(timeout & 0xffffffff))
+
+    return __do_epoll_wait(ql, epfd, events, maxevents, None if timeout < 0 else timeout / 1000)
+
+
+def ql_syscall_epoll_pwait(ql: Qiling, epfd: int, events: int, maxevents: int, timeout: int, sigmask: int, sigsetsize: int):
+    # signals are not delivered while blocking, so the signals mask is irrelevant
+    return ql_syscall_epoll_wait(ql, epfd, events, maxevents, timeout)
@@ -3,7 +3,11 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
+import time
+from typing import Optional
+
 from qiling import Qiling
+from qiling.os.posix.const import EINVAL, ENOSYS
 
 def ql_syscall_set_robust_list(ql: Qiling, head_ptr: int, head_len: int):
     if ql.multithread:
@@ -13,7 +17,17 @@ def ql_syscall_set_robust_list(ql: Qiling, head_ptr: int, head_len: int):
     return 0
 
 
-def ql_syscall_futex(ql: Qiling, uaddr: int, op: int, val: int, timeout: int, uaddr2: int, val3: int):
+def __read_timespec(ql: Qiling, address: int, size: int) -> Optional[float]:
+    if not address:
+        return None
+
+    sec = ql.mem.read_ptr(address + size * 0, size)
+    nsec = ql.mem.read_ptr(address + size * 1, size)
+
+    return sec + nsec / 1000000000
+
+
+def __do_futex(ql: Qiling, uaddr: int, op: int, val: int, timeout: int, uaddr2: int, val3: int, tv_size: int):
     FUTEX_WAIT = 0
     FUTEX_WAKE = 1
     FUTEX_FD = 2
@@ -28,28 +42,68 @@ def ql_syscall_futex(ql: Qiling, uaddr: int, op: int, val: int, timeout: int, ua
     FUTEX_WAIT_REQUEUE_PI = 11
     FUTEX_CMP_REQUEUE_PI = 12
     FUTEX_PRIVATE_FLAG = 128
+    FUTEX_CLOCK_REALTIME = 256
+
+    # futex values and counts are 32 bits wide
+    val &= 0xffffffff
+    val3 &= 0xffffffff
+
+    futexm = ql.os.futexm
+    tm = ql.os.thread_management
+    cmd = op & ~(FUTEX_PRIVATE_FLAG | FUTEX_CLOCK_REALTIME)
+
+    if cmd in (FUTEX_WAIT, FUTEX_WAIT_BITSET):
+        if tm is None:
+            ql.log.warning('futex: waiting is not supported in single-threaded mode')
+            return -ENOSYS
+
+        timespec = __read_timespec(ql, timeout, tv_size)
+
+        if timespec is None:
+            deadline = None
 
-    if op & (FUTEX_PRIVATE_FLAG - 1) == FUTEX_WAIT:
-        # def futex_wait_addr(ql, th, arg):
-        #     addr, val = arg
-        #     return ql.unpack32(ql.mem.read(addr, 4)) == val
+        # FUTEX_WAIT uses a relative timeout
+        elif cmd == FUTEX_WAIT:
+            deadline = tm.clock() + timespec
 
-        regreturn = ql.os.futexm.futex_wait(ql, uaddr, ql.os.thread_management.cur_thread, val)
+        # FUTEX_WAIT_BITSET uses an absolute timeout, measured against either the monotonic
+        # or the realtime clock. translate it to the scheduler clock
+        else:
+            now = time.time() if op & FUTEX_CLOCK_REALTIME else time.monotonic()
+            deadline = tm.clock() + (timespec - now)
 
-    elif op & (FUTEX_PRIVATE_FLAG - 1) == FUTEX_WAIT_BITSET:
-        regreturn = ql.os.futexm.futex_wait(ql, uaddr, ql.os.thread_management.cur_thread, val, val3)
+        bitset = val3 if cmd == FUTEX_WAIT_BITSET else futexm.FUTEX_BITSET_MATCH_ANY
 
-    elif op & (FUTEX_PRIVATE_FLAG - 1) == FUTEX_WAKE:
-        regreturn = ql.os.futexm.futex_wake(ql, uaddr,ql.os.thread_management.cur_thread, val)
+        return futexm.futex_wait(ql, uaddr, tm.cur_thread, val, bitset, deadline)
 
-    elif op & (FUTEX_PRIVATE_FLAG - 1) == FUTEX_WAKE_BITSET:
-        regreturn = ql.os.futexm.futex_wake(ql, uaddr,ql.os.thread_management.cur_thread, val, val3)
+    # with the following operations the timeout argument is used as a count
+    val2 = timeout & 0x7fffffff
+
+    if cmd == FUTEX_WAKE:
+        return futexm.futex_wake(ql, uaddr, val)
+
+    if cmd == FUTEX_WAKE_BITSET:
+        return futexm.futex_wake(ql, uaddr, val, val3)
+
+    if cmd == FUTEX_REQUEUE:
+        return futexm.futex_requeue(ql, uaddr, val, uaddr2, val2)
+
+    if cmd == FUTEX_CMP_REQUEUE:
+        return futexm.futex_requeue(ql, uaddr, val, uaddr2, val2, val3)
+
+    if cmd == FUTEX_WAKE_OP:
+        return futexm.futex_wake_op(ql, uaddr, val, uaddr2, val2, val3)
+
+    if cmd in (FUTEX_FD, FUTEX_LOCK_PI, FUTEX_UNLOCK_PI, FUTEX_TRYLOCK_PI, FUTEX_WAIT_REQUEUE_PI, FUTEX_CMP_REQUEUE_PI):
+        ql.log.debug(f'futex({uaddr:#x}, {op:d}, {val:d}): operation not supported')
+        return -ENOSYS
+
+    return -EINVAL
+
+
+def ql_syscall_futex(ql: Qiling, uaddr: int, op: int, val: int, timeout: int, uaddr2: int, val3: int):
+    return __do_futex(ql, uaddr, op, val, timeout, uaddr2, val3, ql.arch.pointersize)
 
-    else:
-        ql.log.debug(f'futex({uaddr:x}, {op:d}, {val:d}) = ?')
-        ql.emu_stop()
-        #ql.os.thread_management.cur_thread.stop()
-        #ql.os.thread_management.cur_thread.stop_event = THREAD_EVENT_EXIT_GROUP_EVENT
-        regreturn = 0
 
-    return regreturn
+def ql_syscall_futex_time64(ql: Qiling, uaddr: int, op: int, val: int, timeout: int, uaddr2: int, val3: int):
+    return __do_futex(ql, uaddr, op, val, timeout, uaddr2, val3, 8)
@@ -3,6 +3,7 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
+import mmap
 import os
 import re
 from enum import IntFlag
@@ -35,8 +36,9 @@ def ql_syscall_munmap(ql: Qiling, addr: int, length: int):
             except StopIteration:
                 ql.log.debug(f'munmap: could not find matching fd, it might have been closed')
             else:
-                # flushing memory contents to file is required only if mapping is shared / not private
-                if fd._is_map_shared:
+                # flushing memory contents to file is required only if mapping is shared / not private.
+                # host-backed shared mappings are written back by the host
+                if fd._is_map_shared and not ql.mem.is_host_mapped(addr):
                     ql.log.debug(f'munmap: flushing "{fname}"')
                     content = ql.mem.read(addr, length)
 
@@ -98,6 +100,38 @@ def syscall_mmap_impl(ql: Qiling, addr: int, length: int, prot: int, flags: int,
 
         return mmap_flags
 
+    def __host_mmap(f: ql_file, offset: int, length: int, shared: bool) -> Optional[mmap.mmap]:
+        """Map file content from the host, to let emulated memory use it directly rather than
+        a copy of it. Only the part of the requested range that is backed by the file is mapped,
+        since accessing host pages past the end of file is fatal.
+
+        Returns: host mapping object, or `None` if file content cannot be mapped from the host
+        """
+
+        # host mapping pages must cover entire emulated pages
+        if ql.mem.pagesize > mmap.PAGESIZE or offset % mmap.ALLOCATIONGRANULARITY:
+            return None
+
+        try:
+            fsize = os.fstat(f.fileno()).st_size
+        except OSError:
+            return None
+
+        length = min(length, fsize - offset)
+
+        if length <= 0:
+            return None
+
+        # private mappings are copy-on-write. shared mappings are written through to the file,
+        # unless it was not opened for writing: then no changes may reach the file anyway
+        for access in ((mmap.ACCESS_WRITE, mmap.ACCESS_COPY) if shared else (mmap.ACCESS_COPY,)):
+            try:
+                return mmap.mmap(f.fileno(), length, access=access, offset=offset)
+            except (OSError, ValueError):
+                pass
+
+        return None
+
     api_name = ('old_mmap', 'mmap', 'mmap2')[ver]
     mmap_flags = __select_mmap_flags(ql.arch.type, ql.os.type)
 
@@ -156,8 +190,11 @@ def syscall_mmap_impl(ql: Qiling, addr: int, length: int, prot: int, flags: int,
     # determine mapping content #
     #############################
 
+    host = None
+
     if flags & mmap_flags.MAP_ANONYMOUS:
-        data = b'' if flags & mmap_flags.MAP_UNINITIALIZED else b'\x00' * length
+        # newly mapped memory is already zeroed
+        data = b''
         label = '[mmap anonymous]'
 
     else:
@@ -180,9 +217,16 @@ def syscall_mmap_impl(ql: Qiling, addr: int, length: int, prot: int, flags: int,
         if isinstance(fname, bytes):
             fname = fname.decode()
 
-        f.seek(pgoffset)
+        if ql.os.mmap_zero_copy and isinstance(f, ql_file) and addr == lbound:
+            host = __host_mmap(f, pgoffset, length, f._is_map_shared)
+
+        if host is None:
+            f.seek(pgoffset)
+
+            data = f.read(length)
+        else:
+            data = b''
 
-        data = f.read(length)
         label = f'[mmap] {os.path.basename(fname)}'
 
     try:
@@ -190,7 +234,27 @@ def syscall_mmap_impl(ql: Qiling, addr: int, length: int, prot: int, flags: int,
         #
         # we have to map it first as writeable so we can write data in it.
         # permissions are adjusted afterwards with protect.
-        ql.mem.map(lbound, mapping_size, info=label)
+        if host is None:
+            ql.mem.map(lbound, mapping_size, info=label)
+
+        else:
+            # pages past the end of the host mapping are not backed by the file
+            host_size = min(ql.mem.align_up(len(host)), mapping_size)
+
+            try:
+                ql.mem.map_host(lbound, host_size, host, info=label)
+            except QlMemoryMappedError:
+                host.close()
+                raise
+
+            if host_size < mapping_size:
+                try:
+                    ql.mem.map(lbound + host_size, mapping_size - host_size, info=label)
+                except QlMemoryMappedError:
+                    # unmapping the host backed range releases the host mapping as well
+                    ql.mem.unmap(lbound, host_size)
+                    raise
+
     except QlMemoryMappedError:
         ql.log.debug(f'{api_name}: out of memory')
         return -1   # errono: ENOMEM
@@ -4,41 +4,98 @@
 #
 
 from qiling import Qiling
-from qiling.const import QL_OS, QL_ENDIAN
+from qiling.const import QL_OS
+from qiling.os.posix.const import NR_OPEN, EINTR, EINVAL, POLLERR, POLLHUP, POLLNVAL
 from qiling.os.posix.structs import *
+from typing import Dict, List, Optional
 import select
 import ctypes
 
 
-def ql_syscall_poll(ql: Qiling, fds: int, nfds: int, timeout: int):
-    pollfd = make_pollfd(ql.arch.bits, ql.arch.endian)
-
-    if ql.host.os == QL_OS.LINUX:
-        fn_map = {}
-        try:
-            p = select.poll()
-            for i in range(nfds):
-                with pollfd.ref(ql.mem, fds + ctypes.sizeof(pollfd) * i) as pf:
-                    # clear revents field
-                    pf.revents = 0
-
-                    ql.log.debug(f"register poll fd {pf.fd}, event {pf.events}")
-                    fileno = ql.os.fd[pf.fd].fileno()
-                    fn_map[fileno] = i
-                    p.register(fileno, pf.events)
-
-            res_list = p.poll(timeout)
-            regreturn = len(res_list)
-
-            for fn, revent in res_list:
-                with pollfd.ref(ql.mem, fds + ctypes.sizeof(pollfd) * fn_map[fn]) as pf:
-                    ql.log.debug(f"receive event on fd {pf.fd}, revent {revent}")
-                    pf.revents = revent
-        except Exception as e:
-            ql.log.error(f'{e} {fds=}, {nfds=}, {timeout=}')
-            regreturn = -1
-                
-        return regreturn
-    else:
+def __do_poll(ql: Qiling, fds: int, nfds: int, timeout: Optional[int]) -> int:
+    if ql.host.os != QL_OS.LINUX:
         ql.log.warning(f'syscall poll not implemented')
         return 0
+
+    if nfds > NR_OPEN:
+        return -EINVAL
+
+    pollfd = make_pollfd(ql.arch.bits, ql.arch.endian)
+
+    # read all entries at once
+    entries = (pollfd * nfds).from_buffer_copy(ql.mem.read(fds, ctypes.sizeof(pollfd) * nfds))
+
+    # entries indices, keyed by the host file they poll. multiple entries may poll the same host file
+    fn_map: Dict[int, List[int]] = {}
+    fn_events: Dict[int, int] = {}
+
+    for i, pf in enumerate(entries):
+        pf.revents = 0
+
+        # negative fds are ignored
+        if pf.fd < 0:
+            continue
+
+        f = ql.os.fd[pf.fd] if pf.fd < NR_OPEN else None
+
+        if f is None:
+            pf.revents = POLLNVAL
+            continue
+
+        fileno = f.fileno()
+
+        fn_map.setdefault(fileno, []).append(i)
+        fn_events[fileno] = fn_events.get(fileno, 0) | (pf.events & 0xffff)
+
+    # do not block if there are already entries to report
+    if any(pf.revents for pf in entries):
+        timeout = 0
+
+    p = select.poll()
+
+    for fileno, events in fn_events.items():
+        p.register(fileno, events)
+
+    try:
+        res_list = p.poll(timeout)
+    except InterruptedError:
+        return -EINTR
+
+    for fn, revent in res_list:
+        for i in fn_map[fn]:
+            pf = entries[i]
+
+            # errors and hangups are always reported
+            pf.revents = revent & ((pf.events & 0xffff) | POLLERR | POLLHUP | POLLNVAL)
+
+            ql.log.debug(f"receive event on fd {pf.fd}, revent {pf.revents}")
+
+    ql.mem.write(fds, bytes(entries))
+
+    return sum(1 for pf in entries if pf.revents)
+
+
+def ql_syscall_poll(ql: Qiling, fds: int, nfds: int, timeout: int):
+    timeout = ql.unpack32s(ql.pack32(timeout & 0xffffffff))
+
+    return __do_poll(ql, fds, nfds, None if timeout < 0 else timeout)
+
+
+def __read_timespec_ms(ql: Qiling, address: int, size: int) -> Optional[int]:
+    if not address:
+        return None
+
+    sec = ql.mem.read_ptr(address + size * 0, size)
+    nsec = ql.mem.read_ptr(address + size * 1, size)
+
+    # round up to the next millisecond
+    return sec * 1000 + (nsec + 999999) // 1000000
+
+
+def ql_syscall_ppoll(ql: Qiling, fds: int, nfds: int, tsp: int, sigmask: int, sigsetsize: int):
+    # signals are not delivered while blocking, so the signals mask is irrelevant
+    return __do_poll(ql, fds, nfds, __read_timespec_ms(ql, tsp, ql.arch.pointersize))
+
+
+def ql_syscall_ppoll_time64(ql: Qiling, fds: int, nfds: int, tsp: int, sigmask: int, sigsetsize: int):
+    return __do_poll(ql, fds, nfds, __read_timespec_ms(ql, tsp, 8))
@@ -17,6 +17,7 @@ except ImportError:
 import os
 
 from qiling import Qiling
+from qiling.os.posix.const import ESRCH
 
 def __getrlimit_common(ql: Qiling, res: int, rlim: int) -> int:
     RLIMIT_STACK = 3
@@ -60,8 +61,39 @@ def ql_syscall_prlimit64(ql: Qiling, pid: int, res: int, new_limit: int, old_lim
     return -1
 
 def ql_syscall_getpriority(ql: Qiling, which: int, who: int):
+    PRIO_PROCESS = 0
+
+    # nice values of emulated threads are kept by the threads scheduler
+    if ql.os.thread_management and which == PRIO_PROCESS:
+        t = ql.os.thread_management.get_thread(who)
+
+        if t is None:
+            return -ESRCH
+
+        # the syscall returns nice values in the range of 1 (lowest) to 40 (highest)
+        return 20 - t.nice
+
     try:
         regreturn = os.getpriority(which, who)
     except:
         regreturn = -1
     return regreturn
+
+def ql_syscall_setpriority(ql: Qiling, which: int, who: int, prio: int):
+    PRIO_PROCESS = 0
+
+    # only emulated threads are affected; there is no point in changing the host priority
+    if not ql.os.thread_management or which != PRIO_PROCESS:
+        return 0
+
+    t = ql.os.thread_management.get_thread(who)
+
+    if t is None:
+        return -ESRCH
+
+    # nice values are clamped to their valid range, as the kernel does
+    nice = min(max(ql.unpack32s(ql.pack32(prio & 0xffffffff)), -20), 19)
+
+    ql.os.thread_management.set_sched_params(t, nice=nice)
+
+    return 0
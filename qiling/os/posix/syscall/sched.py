@@ -3,12 +3,21 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
-import os, gevent
+import os
 from multiprocessing import Process
 
 from qiling import Qiling
 from qiling.const import QL_ARCH, QL_OS
-from qiling.os.posix.const import THREAD_EVENT_CREATE_THREAD
+from qiling.os.posix.const import EINVAL, ESRCH, THREAD_EVENT_CREATE_THREAD
+
+SCHED_OTHER = 0
+SCHED_FIFO  = 1
+SCHED_RR    = 2
+SCHED_BATCH = 3
+SCHED_IDLE  = 5
+
+# scheduling parameters are kept only for emulated threads. in single-threaded mode they
+# are accepted and discarded
 
 def ql_syscall_clone(ql: Qiling, flags: int, child_stack: int, parent_tidptr: int, newtls: int, child_tidptr: int):
     CSIGNAL              = 0x000000ff
@@ -131,8 +140,86 @@ def ql_syscall_clone(ql: Qiling, flags: int, child_stack: int, parent_tidptr: in
     return regreturn
 
 def ql_syscall_sched_yield(ql: Qiling):
-    def _sched_yield(cur_thread):
-        gevent.sleep(0)
-    ql.emu_stop()
-    ql.os.thread_management.cur_thread.sched_cb = _sched_yield
+    # ending the current time slice is enough to let other threads run
+    if ql.os.thread_management:
+        ql.emu_stop()
+
+    return 0
+
+def __sched_params_valid(policy: int, rt_priority: int) -> bool:
+    # real-time policies take a priority between 1 and 99, and the rest take 0
+    if policy in (SCHED_FIFO, SCHED_RR):
+        return 1 <= rt_priority <= 99
+
+    return policy in (SCHED_OTHER, SCHED_BATCH, SCHED_IDLE) and rt_priority == 0
+
+def ql_syscall_sched_setscheduler(ql: Qiling, pid: int, policy: int, param: int):
+    SCHED_RESET_ON_FORK = 0x40000000
+
+    policy &= ~SCHED_RESET_ON_FORK
+    rt_priority = ql.mem.read_ptr(param, 4) if param else 0
+
+    if not param or not __sched_params_valid(policy, rt_priority):
+        return -EINVAL
+
+    if not ql.os.thread_management:
+        return 0
+
+    t = ql.os.thread_management.get_thread(pid)
+
+    if t is None:
+        return -ESRCH
+
+    ql.os.thread_management.set_sched_params(t, policy=policy, rt_priority=rt_priority)
+
+    return 0
+
+def ql_syscall_sched_getscheduler(ql: Qiling, pid: int):
+    if not ql.os.thread_management:
+        return SCHED_OTHER
+
+    t = ql.os.thread_management.get_thread(pid)
+
+    if t is None:
+        return -ESRCH
+
+    return t.sched_policy
+
+def ql_syscall_sched_setparam(ql: Qiling, pid: int, param: int):
+    if not param:
+        return -EINVAL
+
+    if not ql.os.thread_management:
+        return 0
+
+    t = ql.os.thread_management.get_thread(pid)
+
+    if t is None:
+        return -ESRCH
+
+    rt_priority = ql.mem.read_ptr(param, 4)
+
+    if not __sched_params_valid(t.sched_policy, rt_priority):
+        return -EINVAL
+
+    ql.os.thread_management.set_sched_params(t, rt_priority=rt_priority)
+
+    return 0
+
+def ql_syscall_sched_getparam(ql: Qiling, pid: int, param: int):
+    if not param:
+        return -EINVAL
+
+    if ql.os.thread_management:
+        t = ql.os.thread_management.get_thread(pid)
+
+        if t is None:
+            return -ESRCH
+
+        rt_priority = t.rt_priority
+    else:
+        rt_priority = 0
+
+    ql.mem.write_ptr(param, rt_priority, 4)
+
     return 0
@@ -4,79 +4,155 @@
 #
 
 import select
-from typing import Tuple, Sequence, Mapping
+from typing import Dict, Iterator, Optional
 
 from qiling import Qiling
-from qiling.const import QL_VERBOSE
+from qiling.const import QL_ARCH, QL_ENDIAN
+from qiling.os.posix.const import NR_OPEN, EBADF, EINTR, EINVAL
 
-def ql_syscall__newselect(ql: Qiling, nfds: int, readfds: int, writefds: int, exceptfds: int, timeout: int):
-    regreturn = 0
 
-    def parse_fd_set(ql: Qiling, max_fd: int, struct_addr: int) -> Tuple[Sequence[int], Mapping[int, int]]:
-        fd_list = []
-        fd_map = {}
+def __fd_set_size(ql: Qiling, nfds: int) -> int:
+    """[internal] Get the size in bytes of an fd_set that holds `nfds` bits.
+    """
 
-        if struct_addr:
-            tmp = 0
+    # fd_set is an array of longs
+    wsize = ql.arch.pointersize
+    nbits = wsize * 8
 
-            for i in range(max_fd):
-                if i % 32 == 0:
-                    tmp = ql.mem.read_ptr(struct_addr + i, 4)
+    return (nfds + nbits - 1) // nbits * wsize
 
-                if tmp & 0x1:
-                    fileno = ql.os.fd[i].fileno()
 
-                    fd_list.append(fileno)
-                    fd_map[fileno] = i
+def __swap_words(ql: Qiling, data: bytes) -> bytes:
+    """[internal] Reorder bytes of an fd_set so its bits appear in ascending order,
+    as they do on little endian architectures.
+    """
 
-                tmp = tmp >> 1
+    if ql.arch.endian == QL_ENDIAN.EL:
+        return data
 
-        return fd_list, fd_map
+    wsize = ql.arch.pointersize
 
-    def set_fd_set(buf: bytes, idx: int) -> bytes:
-        buf = buf[ : idx // 8] + bytes([buf[idx // 8] | (0x1 << (idx % 8))]) + buf[idx // 8 + 1 : ]
-        return buf
+    return b''.join(data[i:i + wsize][::-1] for i in range(0, len(data), wsize))
 
-    def handle_ready_fds(ptr: int, ready_fds: Sequence, fds_map: Mapping):
-        tmp_buf = b'\x00' * (nfds // 8 + 1)
 
-        for fd in ready_fds:
-            tmp_buf = set_fd_set(tmp_buf, fds_map[fd])
+def __read_fd_set(ql: Qiling, address: int, nfds: int) -> int:
+    """[internal] Read an fd_set as a bitmap, where bit i corresponds to fd i.
+    """
 
-        ql.mem.write(ptr, tmp_buf)
+    data = __swap_words(ql, ql.mem.read(address, __fd_set_size(ql, nfds)))
 
-    tmp_r_fd, tmp_r_map = parse_fd_set(ql, nfds, readfds)
-    tmp_w_fd, tmp_w_map = parse_fd_set(ql, nfds, writefds)
-    tmp_e_fd, tmp_e_map = parse_fd_set(ql, nfds, exceptfds)
+    return int.from_bytes(data, 'little') & ((1 << nfds) - 1)
 
-    n = ql.arch.pointersize
 
-    if timeout:
-        sec  = ql.mem.read_ptr(timeout + n * 0)
-        usec = ql.mem.read_ptr(timeout + n * 1)
+def __write_fd_set(ql: Qiling, address: int, nfds: int, bitmap: int) -> None:
+    """[internal] Write a bitmap to an fd_set, where bit i corresponds to fd i.
+    """
+
+    data = bitmap.to_bytes(__fd_set_size(ql, nfds), 'little')
+
+    ql.mem.write(address, __swap_words(ql, data))
+
+
+def __iter_bits(bitmap: int) -> Iterator[int]:
+    """[internal] Iterate over the indices of the set bits in a bitmap, lowest first.
+    """
+
+    while bitmap:
+        lsb = bitmap & -bitmap
+
+        yield lsb.bit_length() - 1
+
+        bitmap ^= lsb
 
-        timeout_total = sec + float(usec) / 1000000
-    else:
-        timeout_total = None
+
+def __do_select(ql: Qiling, nfds: int, readfds: int, writefds: int, exceptfds: int, timeout: Optional[float]) -> int:
+    nfds = ql.unpack32s(ql.pack32(nfds & 0xffffffff))
+
+    if nfds not in range(NR_OPEN + 1):
+        return -EINVAL
+
+    fdsets = (readfds, writefds, exceptfds)
+    bitmaps = [__read_fd_set(ql, ptr, nfds) if ptr else 0 for ptr in fdsets]
+
+    # emulated fds bitmap for every host file. multiple emulated fds may share the same host file
+    masks: Dict[int, int] = {}
+
+    for fd in __iter_bits(bitmaps[0] | bitmaps[1] | bitmaps[2]):
+        f = ql.os.fd[fd]
+
+        if f is None:
+            return -EBADF
+
+        fileno = f.fileno()
+        masks[fileno] = masks.get(fileno, 0) | (1 << fd)
+
+    def __host_fds(bitmap: int):
+        return [fileno for fileno, mask in masks.items() if mask & bitmap]
 
     try:
-        ready_rfds, ready_wfds, ready_efds = select.select(tmp_r_fd, tmp_w_fd, tmp_e_fd, timeout_total)
-        regreturn = len(ready_rfds) + len(ready_wfds) + len(ready_efds)
+        ready = select.select(*(__host_fds(bitmap) for bitmap in bitmaps), timeout)
+    except InterruptedError:
+        return -EINTR
+    except (OSError, ValueError) as e:
+        ql.log.debug(f'select failed: {e}')
+
+        return -EINVAL
+
+    regreturn = 0
 
-        if readfds:
-            handle_ready_fds(readfds, ready_rfds, tmp_r_map)
+    for ptr, bitmap, hready in zip(fdsets, bitmaps, ready):
+        result = 0
 
-        if writefds:
-            handle_ready_fds(writefds, ready_wfds, tmp_w_map)
+        for fileno in hready:
+            result |= masks[fileno]
 
-        if exceptfds:
-            handle_ready_fds(exceptfds, ready_efds, tmp_e_map)
+        result &= bitmap
 
-    except KeyboardInterrupt:
-        raise
+        if ptr:
+            __write_fd_set(ql, ptr, nfds, result)
 
-    except:
-        if ql.verbose >= QL_VERBOSE.DEBUG:
-            raise
+        regreturn += bin(result).count('1')
 
     return regreturn
+
+
+def ql_syscall__newselect(ql: Qiling, nfds: int, readfds: int, writefds: int, exceptfds: int, timeout: int):
+    timeout_total = None
+
+    if timeout:
+        n = ql.arch.pointersize
+
+        # struct timeval
+        sec = ql.mem.read_ptr(timeout + n * 0)
+        usec = ql.mem.read_ptr(timeout + n * 1)
+
+        timeout_total = sec + usec / 1000000
+
+    return __do_select(ql, nfds, readfds, writefds, exceptfds, timeout_total)
+
+
+def ql_syscall_select(ql: Qiling, nfds: int, readfds: int, writefds: int, exceptfds: int, timeout: int):
+    # the legacy intel 32-bit select takes a single pointer to a structure that holds the arguments
+    if ql.arch.type == QL_ARCH.X86:
+        nfds, readfds, writefds, exceptfds, timeout = (ql.mem.read_ptr(nfds + i * 4, 4) for i in range(5))
+
+    return ql_syscall__newselect(ql, nfds, readfds, writefds, exceptfds, timeout)
+
+
+def __read_timespec(ql: Qiling, address: int, size: int) -> Optional[float]:
+    if not address:
+        return None
+
+    sec = ql.mem.read_ptr(address + size * 0, size)
+    nsec = ql.mem.read_ptr(address + size * 1, size)
+
+    return sec + nsec / 1000000000
+
+
+def ql_syscall_pselect6(ql: Qiling, nfds: int, readfds: int, writefds: int, exceptfds: int, timeout: int, sigmask: int):
+    # signals are not delivered while blocking, so the signals mask is irrelevant
+    return __do_select(ql, nfds, readfds, writefds, exceptfds, __read_timespec(ql, timeout, ql.arch.pointersize))
+
+
+def ql_syscall_pselect6_time64(ql: Qiling, nfds: int, readfds: int, writefds: int, exceptfds: int, timeout: int, sigmask: int):
+    return __do_select(ql, nfds, readfds, writefds, exceptfds, __read_timespec(ql, timeout, 8))
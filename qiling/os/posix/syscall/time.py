@@ -5,7 +5,6 @@
 
 import os
 import time
-import gevent
 
 from qiling import Qiling
 
@@ -30,14 +29,11 @@ def __sleep_common(ql: Qiling, req: int, rem: int, force_timespec64: bool = Fals
     tv_sec += ql.unpack(ql.mem.read(req + tv_sec_size, tv_nsec_size)) / 1000000000
 
     if ql.os.thread_management:
-        def _sched_sleep(cur_thread):
-            gevent.sleep(tv_sec)
+        tm = ql.os.thread_management
 
+        # let other threads run while this one sleeps
         ql.emu_stop()
-        ql.os.thread_management.cur_thread.sched_cb = _sched_sleep
-
-        # FIXME: this seems to be incomplete
-        th = ql.os.thread_management.cur_thread
+        tm.block(tm.cur_thread, tm.clock() + tv_sec)
     else:
         time.sleep(tv_sec)
 
@@ -3,42 +3,49 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
+from typing import List, Tuple
+
 from qiling import Qiling
 
-def ql_syscall_writev(ql: Qiling, fd: int, vec: int, vlen: int):
-    regreturn = 0
+def __read_iovec(ql: Qiling, vec: int, vlen: int) -> List[Tuple[int, int]]:
+    """Read an array of iovec structures into a list of (base, length) pairs.
+    """
+
     size_t_len = ql.arch.pointersize
     iov = ql.mem.read(vec, vlen * size_t_len * 2)
-    ql.log.debug('writev() CONTENT:')
 
-    for i in range(vlen):
-        addr = ql.unpack(iov[i * size_t_len * 2 : i * size_t_len * 2 + size_t_len])
-        l = ql.unpack(iov[i * size_t_len * 2 + size_t_len : i * size_t_len * 2 + size_t_len * 2])
-        regreturn += l
+    # iovec fields are laid out in pairs of pointer-sized values: base and length
+    fields = [ql.unpack(iov[i:i + size_t_len]) for i in range(0, len(iov), size_t_len)]
 
-        buf = ql.mem.read(addr, l)
+    return list(zip(fields[0::2], fields[1::2]))
+
+
+def ql_syscall_writev(ql: Qiling, fd: int, vec: int, vlen: int):
+    iovecs = __read_iovec(ql, vec, vlen)
+    ql.log.debug('writev() CONTENT:')
+
+    for buf in ql.mem.readv(iovecs):
         ql.log.debug(f'{bytes(buf)}')
 
         if hasattr(ql.os.fd[fd], 'write'):
             ql.os.fd[fd].write(buf)
 
-    return regreturn
+    return sum(l for _, l in iovecs)
 
 
 def ql_syscall_readv(ql: Qiling, fd: int, vec: int, vlen: int):
-    regreturn = 0
-    size_t_len = ql.arch.pointersize
-    iov = ql.mem.read(vec, vlen * size_t_len * 2)
+    iovecs = __read_iovec(ql, vec, vlen)
     ql.log.debug('readv() CONTENT:')
 
-    for i in range(vlen):
-        addr = ql.unpack(iov[i * size_t_len * 2 : i * size_t_len * 2 + size_t_len])
-        l = ql.unpack(iov[i * size_t_len * 2 + size_t_len : i * size_t_len * 2 + size_t_len * 2])
-        regreturn += l
+    if hasattr(ql.os.fd[fd], 'read'):
+        chunks = []
 
-        if hasattr(ql.os.fd[fd], 'read'):
+        for addr, l in iovecs:
             data = ql.os.fd[fd].read(l)
             ql.log.debug(f'{data!r}')
-            ql.mem.write(addr, data)
 
-    return regreturn
+            chunks.append((addr, data))
+
+        ql.mem.writev(chunks)
+
+    return sum(l for _, l in iovecs)
@@ -46,9 +46,11 @@ def ql_syscall_exit_group(ql: Qiling, code: int):
     if ql.multithread:
         def _sched_cb_exit(cur_thread):
             ql.log.debug(f"[Thread {cur_thread.get_id()}] Terminated")
-            ql.os.thread_management.stop_thread(cur_thread)
             cur_thread.exit_code = code
 
+            # all threads of the process exit along with it
+            ql.os.thread_management.stop()
+
         td = ql.os.thread_management.cur_thread
         ql.emu_stop()
         td.sched_cb = _sched_cb_exit
@@ -4,15 +4,12 @@
 #
 
 from abc import abstractmethod
-from gevent import Greenlet
 
 from qiling import Qiling
 
-class QlThread(Greenlet):
+class QlThread:
 
     def __init__(self, ql: Qiling):
-        super().__init__()
-
         self.ql = ql
         self.log_file_fd = None
 
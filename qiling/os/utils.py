@@ -37,23 +37,7 @@ class QlOsUtils:
 
         terminator = '\x00'.encode(encoding)
 
-        data = bytearray()
-        charlen = len(terminator)
-        strlen = 0
-
-        while True:
-            char = self.ql.mem.read(address, charlen)
-
-            if char == terminator:
-                break
-
-            data += char
-            strlen += 1
-
-            if strlen == maxlen:
-                break
-
-            address += charlen
+        data = self.ql.mem.read_terminated(address, terminator, maxlen)
 
         s = data.decode(encoding, errors='backslashreplace')
         self.ql.os.stats.log_string(s)
@@ -21,6 +21,9 @@ def _GetModuleHandle(ql: Qiling, address: int, params):
         if not has_lib_ext(lpModuleName):
             lpModuleName = f'{lpModuleName}.dll'
 
+        # the module may be imported, but not loaded yet
+        ql.loader.load_lazy_dll(lpModuleName)
+
         image = ql.loader.get_image_by_name(lpModuleName, casefold=True)
 
         if image:
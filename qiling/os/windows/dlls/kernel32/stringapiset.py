@@ -180,14 +180,7 @@ def hook_MultiByteToWideChar(ql: Qiling, address: int, params):
     # -1 indicates the string is null-terminated. the string is
     # read along with its null-terminator
     elif cbMultiByte == 0xffffffff:
-        mbstr = bytearray()
-        ch = 1
-
-        while ch != b'\x00':
-            ch = ql.mem.read(lpMultiByteStr, 1)
-            mbstr.extend(ch)
-
-            lpMultiByteStr += 1
+        mbstr = ql.mem.read_terminated(lpMultiByteStr) + b'\x00'
 
     # read exactly cbMultiByte bytes. that may or may not include
     # a null-terminator
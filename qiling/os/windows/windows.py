@@ -4,7 +4,7 @@
 #
 
 import ntpath
-from typing import Callable, TextIO, Type
+from typing import Callable, Dict, NamedTuple, Optional, TextIO, Type, Union
 
 from unicorn import UcError
 
@@ -30,6 +30,15 @@ from . import registry
 import qiling.os.windows.dlls as api
 
 
+class ResolvedApi(NamedTuple):
+    """Resolved import details.
+    """
+
+    name: str
+    dll: str
+    func: Optional[Callable]
+
+
 class QlOsWindows(QlOs):
     type = QL_OS.WINDOWS
 
@@ -88,6 +97,10 @@ class QlOsWindows(QlOs):
         self.pid = self.profile.getint('KERNEL', 'pid')
 
         self.services = {}
+
+        # resolved api handlers, by import address
+        self.__resolved_apis: Dict[int, ResolvedApi] = {}
+
         self.load()
 
         # only after handle manager has been set up we can assign the standard streams
@@ -126,9 +139,6 @@ class QlOsWindows(QlOs):
         self.__setup_gdt()
         self.__setup_components()
 
-        # hook win api
-        self.ql.hook_code(self.hook_winapi)
-
     def __setup_gdt(self):
         gdtm = GDTManager(self.ql)
 
@@ -168,35 +178,55 @@ class QlOsWindows(QlOs):
         new_handle = handle.Handle(obj=main_thread)
         self.handle_manager.append(new_handle)
 
+    def set_api(self, target: Union[int, str], handler: Callable, intercept: QL_INTERCEPT = QL_INTERCEPT.CALL):
+        super().set_api(target, handler, intercept)
+
+        # api replacements might have changed; handlers have to be resolved again
+        self.__resolved_apis.clear()
+
+    def __resolve_api(self, entry) -> ResolvedApi:
+        api_name = entry['name']
+
+        if api_name is None:
+            api_name = const.Mapper[entry['dll']][entry['ordinal']]
+        else:
+            api_name = api_name.decode()
+
+        api_func = self.user_defined_api[QL_INTERCEPT.CALL].get(api_name)
+
+        if not api_func:
+            api_func = getattr(api, f'hook_{api_name}', None)
+
+        return ResolvedApi(api_name, entry['dll'], api_func)
+
     # hook WinAPI in PE EMU
     def hook_winapi(self, ql: Qiling, address: int, size: int):
-        if address in ql.loader.import_symbols:
-            entry = ql.loader.import_symbols[address]
-            api_name = entry['name']
+        resolved = self.__resolved_apis.get(address)
+
+        if resolved is None:
+            entry = ql.loader.import_symbols.get(address)
 
-            if api_name is None:
-                api_name = const.Mapper[entry['dll']][entry['ordinal']]
-            else:
-                api_name = api_name.decode()
+            if entry is None:
+                return
 
-            api_func = self.user_defined_api[QL_INTERCEPT.CALL].get(api_name)
+            resolved = self.__resolve_api(entry)
+            self.__resolved_apis[address] = resolved
 
-            if not api_func:
-                api_func = getattr(api, f'hook_{api_name}', None)
+        api_name, api_dll, api_func = resolved
 
-            if api_func:
-                try:
-                    api_func(ql, address, api_name)
-                except Exception as ex:
-                    ql.log.exception(ex)
-                    ql.log.debug("%s Exception Found" % api_name)
+        if api_func:
+            try:
+                api_func(ql, address, api_name)
+            except Exception as ex:
+                ql.log.exception(ex)
+                ql.log.debug("%s Exception Found" % api_name)
 
-                    raise QlErrorSyscallError("Windows API Implementation Error")
-            else:
-                ql.log.warning(f'api {api_name} ({entry["dll"]}) is not implemented')
+                raise QlErrorSyscallError("Windows API Implementation Error")
+        else:
+            ql.log.warning(f'api {api_name} ({api_dll}) is not implemented')
 
-                if ql.debug_stop:
-                    raise QlErrorSyscallNotFound("Windows API implementation not found")
+            if ql.debug_stop:
+                raise QlErrorSyscallNotFound("Windows API implementation not found")
 
     def run(self):
         if self.ql.exit_point is not None:
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+#
+# Cross Platform and Multi Architecture Advanced Binary Emulation Framework
+#
+
+"""Compact snapshot file format.
+
+Unlike a pickled saved state, memory content is streamed to and from the file chunk by
+chunk, so neither saving nor restoring has to hold an entire copy of the emulated memory.
+
+File layout:
+    header      : magic, format version, chunk size
+    chunks      : memory chunks data, each one compressed unless that does not pay off.
+                  all-zero chunks are not stored, and identical chunks are stored only once
+    index       : memory ranges table, where each range refers to its chunks; followed by
+                  the rest of the saved state (registers, os, loader, etc.) pickled
+    trailer     : index offset and size, magic
+"""
+
+import hashlib
+import mmap
+import pickle
+import struct
+import zlib
+
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Mapping, MutableMapping, Tuple
+
+from qiling.exception import QlErrorFileType
+
+if TYPE_CHECKING:
+    from qiling import Qiling
+
+
+MAGIC = b'QLSNAP\x00\x00'
+VERSION = 1
+
+# default chunk size; has to be a multiple of the memory page size
+CHUNK_SIZE = 0x10000
+
+# magic, version, chunk size
+_header = struct.Struct('<8sII')
+
+# index offset, index size, magic
+_trailer = struct.Struct('<QQ8s')
+
+# has memory content, ranges count
+_index_header = struct.Struct('<BI')
+
+# range start, range end, permissions, is mmio, label length, chunks count
+_range_entry = struct.Struct('<QQIBHI')
+
+# chunk data offset, stored size, flags
+_chunk_entry = struct.Struct('<QIB')
+
+# chunk flags
+CHUNK_ZERO = 0b01           # chunk is all zeros and was not stored
+CHUNK_COMPRESSED = 0b10     # chunk data is zlib-compressed
+
+
+def is_snapshot_file(path: str) -> bool:
+    """Determine whether a file is a compact snapshot file or not.
+    """
+
+    with open(path, 'rb') as infile:
+        return infile.read(len(MAGIC)) == MAGIC
+
+
+class QlSnapshotWriter:
+    """Stream Qiling saved state to a compact snapshot file.
+    """
+
+    def __init__(self, ql: 'Qiling', outfile: IO[bytes], chunk_size: int = CHUNK_SIZE, compresslevel: int = 1):
+        assert chunk_size % ql.mem.pagesize == 0, 'chunk size has to be a multiple of page size'
+
+        self.ql = ql
+        self.outfile = outfile
+        self.chunk_size = chunk_size
+        self.compresslevel = compresslevel
+
+        # stored chunks, by content digest: data offset, stored size, flags
+        self.stored: Dict[bytes, Tuple[int, int, int]] = {}
+
+        self.zeros = bytes(chunk_size)
+
+    def __store_chunk(self, data: bytearray) -> Tuple[int, int, int]:
+        if data == self.zeros[:len(data)]:
+            return (0, len(data), CHUNK_ZERO)
+
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+
+        if digest not in self.stored:
+            packed = zlib.compress(data, self.compresslevel)
+            flags = CHUNK_COMPRESSED
+
+            # compression did not pay off; store data as-is
+            if len(packed) >= len(data):
+                packed = data
+                flags = 0
+
+            self.stored[digest] = (self.outfile.tell(), len(packed), flags)
+            self.outfile.write(packed)
+
+        return self.stored[digest]
+
+    def __write_ranges(self) -> List[Tuple[Tuple[int, int, int, bool, str], List[Tuple[int, int, int]]]]:
+        ranges = []
+
+        for lbound, ubound, perms, label, is_mmio in self.ql.mem.map_info:
+            chunks = []
+
+            # mmio ranges content is not saved, only their callbacks
+            if not is_mmio:
+                for addr in range(lbound, ubound, self.chunk_size):
+                    data = self.ql.mem.read(addr, min(self.chunk_size, ubound - addr))
+
+                    chunks.append(self.__store_chunk(data))
+
+            ranges.append(((lbound, ubound, perms, is_mmio, label), chunks))
+
+        return ranges
+
+    def write(self, saved_states: Mapping[str, Any], mem: bool) -> None:
+        """Write a saved state to the snapshot file.
+
+        Args:
+            saved_states: saved state to write. it should not contain memory content
+            mem: whether memory content should be streamed to the snapshot file as well
+        """
+
+        self.outfile.write(_header.pack(MAGIC, VERSION, self.chunk_size))
+
+        ranges = self.__write_ranges() if mem else []
+        mmio_cbs = dict(self.ql.mem.mmio_cbs) if mem else {}
+
+        index_offset = self.outfile.tell()
+
+        self.outfile.write(_index_header.pack(mem, len(ranges)))
+
+        for (lbound, ubound, perms, is_mmio, label), chunks in ranges:
+            blabel = label.encode('utf-8')
+
+            self.outfile.write(_range_entry.pack(lbound, ubound, perms, is_mmio, len(blabel), len(chunks)))
+            self.outfile.write(blabel)
+
+            for chunk in chunks:
+                self.outfile.write(_chunk_entry.pack(*chunk))
+
+        pickle.dump((saved_states, mmio_cbs), self.outfile)
+
+        index_size = self.outfile.tell() - index_offset
+
+        self.outfile.write(_trailer.pack(index_offset, index_size, MAGIC))
+
+
+class QlSnapshotReader:
+    """Read Qiling saved state from a compact snapshot file.
+    The file is memory-mapped, so memory content is loaded only as it is being restored.
+    """
+
+    def __init__(self, infile: IO[bytes]):
+        self.mm = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.chunk_size = _header.unpack_from(self.mm, 0)
+
+        if magic != MAGIC:
+            raise QlErrorFileType('not a qiling snapshot file')
+
+        if version != VERSION:
+            raise QlErrorFileType(f'unsupported snapshot file version: {version}')
+
+        index_offset, _, magic = _trailer.unpack_from(self.mm, len(self.mm) - _trailer.size)
+
+        if magic != MAGIC:
+            raise QlErrorFileType('snapshot file is truncated')
+
+        self.has_mem, nranges = _index_header.unpack_from(self.mm, index_offset)
+        offset = index_offset + _index_header.size
+
+        self.ranges: List[Tuple[Tuple[int, int, int, bool, str], List[Tuple[int, int, int]]]] = []
+
+        for _ in range(nranges):
+            lbound, ubound, perms, is_mmio, label_len, nchunks = _range_entry.unpack_from(self.mm, offset)
+            offset += _range_entry.size
+
+            label = self.mm[offset:offset + label_len].decode('utf-8')
+            offset += label_len
+
+            chunks = [_chunk_entry.unpack_from(self.mm, offset + i * _chunk_entry.size) for i in range(nchunks)]
+            offset += nchunks * _chunk_entry.size
+
+            self.ranges.append(((lbound, ubound, perms, bool(is_mmio), label), chunks))
+
+        self.saved_states: MutableMapping[str, Any]
+        self.saved_states, self.mmio_cbs = pickle.loads(self.mm[offset:len(self.mm) - _trailer.size])
+
+    def close(self) -> None:
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def restore_mem(self, ql: 'Qiling') -> None:
+        """Restore memory layout and content.
+        """
+
+        if not self.has_mem:
+            return
+
+        for (lbound, ubound, perms, is_mmio, label), chunks in self.ranges:
+            size = ubound - lbound
+
+            if is_mmio:
+                ql.log.debug(f'restoring mmio range: {lbound:#08x} {ubound:#08x} {label}')
+
+                if not ql.mem.is_mapped(lbound, size):
+                    read_cb, write_cb = self.mmio_cbs[(lbound, ubound)]
+
+                    ql.mem.map_mmio(lbound, size, read_cb, write_cb, info=label)
+
+                continue
+
+            ql.log.debug(f'restoring memory range: {lbound:#08x} {ubound:#08x} {label}')
+
+            # a newly mapped range is already zeroed, so zero chunks may be skipped
+            fresh = ql.mem.is_available(lbound, size)
+
+            if fresh:
+                ql.mem.map(lbound, size, perms, label)
+
+            for addr, (offset, stored_size, flags) in zip(range(lbound, ubound, self.chunk_size), chunks):
+                if flags & CHUNK_ZERO:
+                    if not fresh:
+                        ql.mem.write(addr, bytes(stored_size))
+
+                    continue
+
+                data = self.mm[offset:offset + stored_size]
+
+                if flags & CHUNK_COMPRESSED:
+                    data = zlib.decompress(data)
+
+                ql.mem.write(addr, data)
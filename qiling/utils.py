@@ -296,7 +296,7 @@ def ql_guess_emu_env(path: str) -> Tuple[Optional[QL_ARCH], Optional[QL_OS], Opt
 def select_loader(ostype: QL_OS, libcache: bool) -> QlClassInit['QlLoader']:
     kwargs = {}
 
-    if ostype is QL_OS.WINDOWS:
+    if ostype in (QL_OS.WINDOWS, QL_OS.LINUX, QL_OS.FREEBSD, QL_OS.QNX):
         kwargs['libcache'] = libcache
 
     module = {
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+from qiling.extensions.coverage import utils as cov_utils
+from qiling.extensions.coverage.collector import QlCoverageCollector
+from qiling.loader.loader import Image
+
+# mov rcx, 3
+# loop:
+#   dec rcx
+#   jnz loop
+X8664_LOOP = bytes.fromhex('48c7c103000000 48ffc9 75fb')
+
+
+class CoverageTest(unittest.TestCase):
+    def setUp(self):
+        self.ql = Qiling(code=X8664_LOOP, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
+
+        self.begin = self.ql.loader.load_address
+        self.end = self.begin + len(X8664_LOOP)
+
+        # shellcode has no images; register a couple of them to resolve blocks against
+        self.ql.loader.images.append(Image(self.begin, self.begin + 0x1000, '/shellcode'))
+        self.ql.loader.images.append(Image(self.begin - 0x1000, self.begin, '/before'))
+
+    def test_collector(self):
+        collector = QlCoverageCollector(self.ql, edges=True)
+
+        self.assertIsNone(collector.find_module(self.begin - 0x1001))
+        self.assertEqual(1, collector.find_module(self.begin - 1)[0])
+        self.assertEqual(0, collector.find_module(self.begin)[0])
+        self.assertIsNone(collector.find_module(self.begin + 0x1000))
+
+        collector.activate()
+        self.ql.run(self.begin, self.end)
+        collector.deactivate()
+
+        # first block runs the first loop iteration; loop body block is then entered twice
+        # but recorded only once
+        self.assertListEqual([(0, 0), (0, 7)], list(collector.blocks))
+
+        # three distinct edges: entry -> first block, first block -> loop, loop -> loop
+        self.assertEqual(3, sum(collector.edges))
+        self.assertEqual(3, sum(1 for hits in collector.edges if hits))
+
+        collector.reset_edges()
+        self.assertFalse(any(collector.edges))
+
+    def test_drcov(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            covfile = os.path.join(tmpdir, 'drcov.log')
+
+            with cov_utils.collect_coverage(self.ql, 'drcov', covfile):
+                self.ql.run(self.begin, self.end)
+
+            with open(covfile, 'rb') as infile:
+                content = infile.read()
+
+        header, _, bbs = content.partition(b'BB Table: 2 bbs\n')
+
+        self.assertIn(b'Module Table: version 2, count 2\n', header)
+        self.assertEqual(16, len(bbs))
+
+
+if __name__ == "__main__":
+    unittest.main()
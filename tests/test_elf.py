@@ -4,6 +4,7 @@
 #
 
 import unittest
+import unittest.mock
 import string
 import random
 import os
@@ -15,6 +16,8 @@ sys.path.append("..")
 
 from typing import Any, Sequence
 
+from unicorn import UC_MEM_WRITE_PROT, UC_PROT_ALL, UC_PROT_READ, UC_PROT_WRITE, UcError
+
 from qiling import Qiling
 from qiling.const import QL_ARCH, QL_OS, QL_INTERCEPT, QL_STOP, QL_VERBOSE
 from qiling.exception import *
@@ -760,6 +763,371 @@ class ELFTest(unittest.TestCase):
 
         del ql
 
+    def test_memory_map_info(self):
+        ql = Qiling(code=b"\xCC", archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        base = 0x10000000
+
+        # adjacent ranges are considered as one continuous range
+        ql.mem.map(base + 0x0000, 0x1000, info='[a]')
+        ql.mem.map(base + 0x1000, 0x2000, info='[b]')
+        ql.mem.map(base + 0x5000, 0x1000, info='[c]')
+
+        self.assertTrue(ql.mem.is_mapped(base + 0x0800, 0x2000))
+        self.assertFalse(ql.mem.is_mapped(base + 0x2000, 0x2000))
+        self.assertFalse(ql.mem.is_available(base + 0x2800, 0x1000))
+        self.assertTrue(ql.mem.is_available(base + 0x3000, 0x2000))
+        self.assertFalse(ql.mem.is_available(base + 0x3000, 0x2001))
+
+        # first gap that fits starting at minaddr
+        self.assertEqual(base + 0x3000, ql.mem.find_free_space(0x2000, minaddr=base))
+        self.assertEqual(base + 0x6000, ql.mem.find_free_space(0x3000, minaddr=base))
+
+        # splitting a range in the middle
+        ql.mem.protect(base + 0x1000, 0x1000, UC_PROT_READ)
+        self.assertEqual([
+            (base + 0x0000, base + 0x1000, UC_PROT_ALL,  '[a]', False),
+            (base + 0x1000, base + 0x2000, UC_PROT_READ, '[b]', False),
+            (base + 0x2000, base + 0x3000, UC_PROT_ALL,  '[b]', False),
+            (base + 0x5000, base + 0x6000, UC_PROT_ALL,  '[c]', False)
+        ], [entry for entry in ql.mem.map_info if entry[0] >= base])
+
+        ql.mem.unmap_between(base + 0x1000, base + 0x6000)
+        self.assertTrue(ql.mem.is_available(base + 0x1000, 0x5000))
+        self.assertEqual(base + 0x1000, ql.mem.find_free_space(0x5000, minaddr=base))
+
+        del ql
+
+    def test_memory_bulk_access(self):
+        ql = Qiling(code=b"\xCC", archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        ql.mem.map(0x1000, 0x2000)
+
+        # string crosses a page boundary, and is followed by an unmapped page
+        ql.mem.write(0x1ffa, b"hello world\x00")
+        ql.mem.write(0x2ff8, "qiling".encode("utf-16le")[:8])
+
+        self.assertEqual(b"hello world", ql.mem.read_terminated(0x1ffa))
+        self.assertEqual(b"hello", ql.mem.read_terminated(0x1ffa, maxlen=5))
+        self.assertEqual("hello world", ql.os.utils.read_cstring(0x1ffa))
+
+        with self.assertRaises(UcError):
+            ql.mem.read_terminated(0x2ff8, b"\x00\x00")
+
+        buffer = memoryview(bytearray(16))
+        ql.mem.read_into(0x1ffa, buffer[4:9])
+        self.assertEqual(b"\x00" * 4 + b"hello" + b"\x00" * 7, buffer.tobytes())
+
+        # reading into a buffer does not depend on unicorn internals
+        with unittest.mock.patch('qiling.os.memory._uclib', None):
+            buffer = bytearray(5)
+            ql.mem.read_into(0x2000, buffer)
+            self.assertEqual(b"world", buffer)
+
+        # mmio reads may have side effects, so nothing is read past the terminator
+        mmio = b"mmio\x00tail"
+        offsets = []
+
+        def __mmio_read(ql: Qiling, offset: int, size: int) -> int:
+            offsets.append(offset)
+
+            return int.from_bytes(mmio[offset:offset + size], 'little')
+
+        ql.mem.map_mmio(0x10000, 0x1000, __mmio_read, None)
+
+        self.assertEqual(b"mmio", ql.mem.read_terminated(0x10000))
+        self.assertListEqual([0, 1, 2, 3, 4], offsets)
+
+        ql.mem.writev([(0x1000, b"abc"), (0x1800, b"def")])
+        self.assertEqual([b"abc", b"def", b"hello"], ql.mem.readv([(0x1000, 3), (0x1800, 3), (0x1ffa, 5)]))
+
+        del ql
+
+    def test_memory_incremental_snapshot(self):
+        # mov qword [rax], rbx
+        # mov qword [rax + 0x1000], rbx
+        code = bytes.fromhex('488918 48899800100000')
+
+        ql = Qiling(code=code, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        begin = ql.arch.regs.arch_pc
+        end = begin + len(code)
+
+        ql.mem.map(0x10000, 0x4000, info='[data]')
+        ql.mem.map(0x20000, 0x1000, UC_PROT_READ, info='[ro]')
+        ql.mem.write(0x10000, b'A' * 0x4000)
+
+        saved = ql.save(incremental=True)
+
+        for i in range(3):
+            ql.arch.regs.rax = 0x10ff8 + i * 0x1000
+            ql.arch.regs.rbx = 0x4242424242424242
+            ql.run(begin, end)
+
+            self.assertEqual(b'B' * 8, ql.mem.read(0x10ff8 + i * 0x1000, 8))
+            self.assertEqual(b'B' * 8, ql.mem.read(0x11ff8 + i * 0x1000, 8))
+
+            # memory manager writes and layout changes are reverted as well
+            ql.mem.write(0x13000, b'Z')
+            extra = ql.mem.map_anywhere(0x2000)
+            ql.mem.protect(0x10000, 0x1000, UC_PROT_READ)
+
+            ql.restore(saved)
+
+            self.assertEqual(b'A' * 0x4000, ql.mem.read(0x10000, 0x4000))
+            self.assertTrue(ql.mem.is_available(extra, 0x2000))
+            self.assertIn((0x10000, 0x14000, UC_PROT_ALL, '[data]', False), ql.mem.map_info)
+
+        # write-only memory cannot be write-protected, but is restored nonetheless
+        ql.mem.map(0x40000, 0x2000, UC_PROT_WRITE, info='[wo]')
+
+        saved = ql.save(incremental=True)
+
+        ql.arch.regs.rax = 0x40000
+        ql.arch.regs.rbx = 0x4242424242424242
+        ql.run(begin, end)
+
+        self.assertEqual(b'B' * 8, ql.mem.read(0x41000, 8))
+
+        ql.restore(saved)
+        self.assertEqual(b'\x00' * 8, ql.mem.read(0x41000, 8))
+
+        # write protected memory remains protected
+        ql.arch.regs.rax = 0x20000
+
+        with self.assertRaises(UcError):
+            ql.run(begin, end)
+
+        del ql
+
+    def test_memory_incremental_snapshot_with_hooks(self):
+        # mov qword [rax], rbx
+        code = bytes.fromhex('488918')
+
+        ql = Qiling(code=code, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        begin = ql.arch.regs.arch_pc
+        end = begin + len(code)
+
+        ql.mem.map(0x10000, 0x1000, info='[data]')
+        ql.mem.map(0x20000, 0x1000, UC_PROT_READ, info='[ro]')
+
+        faults = []
+
+        def __invalid_access(ql: Qiling, access: int, addr: int, size: int, value: int):
+            faults.append((access, addr))
+
+            ql.emu_stop()
+
+        # user hooks registered before tracking starts must not take over tracking faults
+        ql.hook_mem_invalid(__invalid_access)
+
+        saved = ql.save(incremental=True)
+
+        ql.arch.regs.rax = 0x10000
+        ql.arch.regs.rbx = 0x4242424242424242
+        ql.run(begin, end)
+
+        self.assertListEqual([], faults)
+        self.assertEqual(b'B' * 8, ql.mem.read(0x10000, 8))
+
+        ql.restore(saved)
+        self.assertEqual(b'\x00' * 8, ql.mem.read(0x10000, 8))
+
+        # genuine protection violations still reach user hooks
+        ql.arch.regs.rax = 0x20000
+        ql.run(begin, end)
+
+        self.assertListEqual([(UC_MEM_WRITE_PROT, 0x20000)], faults)
+
+        del ql
+
+    def test_compact_snapshot(self):
+        snapshot = r'/tmp/compact_snapshot.qlsnap'
+
+        ql = Qiling(code=b"\xCC", archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        # a range with some data, repeated data and zeros
+        ql.mem.map(0x10000000, 0x100000, info='[data]')
+        ql.mem.write(0x10000000, b'A' * 0x20000)
+        ql.mem.write(0x10040000, b'qiling')
+        ql.arch.regs.rax = 0x1337
+
+        saved = ql.save(snapshot=snapshot, compact=True)
+
+        # memory content is streamed to the file rather than returned
+        self.assertNotIn('mem', saved)
+
+        # a streamed memory state cannot be tracked
+        with self.assertRaises(ValueError):
+            ql.save(snapshot=snapshot, compact=True, incremental=True)
+
+        expected_map = [entry[:4] for entry in ql.mem.map_info]
+        expected_data = ql.mem.read(0x10000000, 0x100000)
+        del ql
+
+        ql = Qiling(code=b"\xCC", archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+        ql.restore(snapshot=snapshot)
+
+        self.assertEqual(0x1337, ql.arch.regs.rax)
+        self.assertEqual(expected_map, [entry[:4] for entry in ql.mem.map_info])
+        self.assertEqual(expected_data, ql.mem.read(0x10000000, 0x100000))
+
+        del ql
+        os.remove(snapshot)
+
+    def test_mmap_zero_copy(self):
+        from tempfile import TemporaryDirectory
+        from qiling.os.filestruct import ql_file
+        from qiling.os.posix.syscall.mman import ql_syscall_mmap, ql_syscall_munmap
+
+        ql = Qiling(code=b"\xCC", archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, profile={'MISC': {'mmap_zero_copy': 'True'}}, verbose=QL_VERBOSE.DEBUG)
+
+        PROT_READ_WRITE = 0x3
+        MAP_SHARED = 0x1
+        MAP_PRIVATE = 0x2
+        MAP_FIXED = 0x10
+
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'data.bin')
+
+            # file content ends in the middle of the second page
+            with open(path, 'wb') as outfile:
+                outfile.write(b'A' * 0x1000 + b'B' * 0x10)
+
+            ql.os.fd[3] = ql_file.open(path, os.O_RDWR, 0)
+
+            # mapping extends past the end of file
+            private = ql_syscall_mmap(ql, 0x10000000, 0x3000, PROT_READ_WRITE, MAP_PRIVATE | MAP_FIXED, 3, 0)
+            shared = ql_syscall_mmap(ql, 0x10010000, 0x2000, PROT_READ_WRITE, MAP_SHARED | MAP_FIXED, 3, 0)
+
+            self.assertTrue(ql.mem.is_host_mapped(private))
+            self.assertTrue(ql.mem.is_host_mapped(private + 0x1000))
+            self.assertFalse(ql.mem.is_host_mapped(private + 0x2000))
+
+            self.assertEqual(b'B\x00\x00', ql.mem.read(private + 0x100f, 3))
+            self.assertEqual(b'\x00' * 0x1000, ql.mem.read(private + 0x2000, 0x1000))
+
+            # private mappings are copy-on-write
+            ql.mem.write(private, b'private')
+            self.assertEqual(b'A' * 7, ql.mem.read(shared, 7))
+
+            # shared mappings are coherent with the file
+            ql.mem.write(shared + 0x1000, b'shared')
+            self.assertEqual(b'private', ql.mem.read(private, 7))
+
+            with open(path, 'rb') as infile:
+                self.assertEqual(b'shared' + b'B' * 10, infile.read()[0x1000:])
+
+            ql_syscall_munmap(ql, private, 0x3000)
+            ql_syscall_munmap(ql, shared, 0x2000)
+
+            self.assertFalse(ql.mem.is_host_mapped(shared))
+
+            ql.os.fd[3].close()
+
+        del ql
+
+    def test_elf_cache(self):
+        from tempfile import TemporaryDirectory
+        from elftools.elf.elffile import ELFFile
+        from qiling.loader.elf_cache import QlElfCache, QlElfImage
+
+        # use the host interpreter as a readily available elf file
+        path = os.path.realpath(sys.executable)
+
+        with open(path, 'rb') as infile:
+            parsed = QlElfImage.from_elffile(ELFFile(infile))
+
+        with TemporaryDirectory() as tmpdir:
+            cache = QlElfCache(tmpdir)
+            image = cache.get(path)
+
+            # the same file should be served from cache
+            self.assertIs(image, cache.get(path))
+
+            self.assertEqual(parsed.header, image.header)
+            self.assertEqual(parsed.interp, image.interp)
+            self.assertEqual(parsed.segments, image.segments)
+
+            for i, seg in enumerate(image.segments):
+                self.assertEqual(parsed.data(i), image.data(i))
+
+            # pages are laid out as they appear in memory
+            seg = image.segments[0]
+            lbound = seg.vaddr & ~0xfff
+
+            host = image.host_pages(lbound, 0x1000)
+            self.assertIsNotNone(host)
+
+            offset = seg.vaddr - lbound
+            content = parsed.data(0)[:0x1000 - offset]
+
+            self.assertEqual(content, host[offset:offset + len(content)])
+
+            # pages are private copies
+            host[0:4] = b'\x00' * 4
+            self.assertEqual(parsed.data(0)[:4], image.data(0)[:4])
+            host.close()
+
+            # another process would find the entry in the cache directory
+            other = QlElfCache(tmpdir)
+            restored = other.get(path)
+
+            self.assertIsNot(image, restored)
+            self.assertEqual(image.header, restored.header)
+            self.assertEqual(image.segments, restored.segments)
+            self.assertEqual(image.data(0), restored.data(0))
+
+            other.clear()
+            cache.clear()
+
+    def test_elf_symbols(self):
+        from qiling.loader.elf import QlLoaderELF
+        from qiling.loader.loader import Image
+
+        # use the host interpreter as a readily available elf file
+        path = os.path.realpath(sys.executable)
+        base = 0x7f0000000000
+
+        ql = Qiling(code=b'\xc3', archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DISABLED)
+        ql.loader.images.append(Image(base, base + 0x1000000, path))
+        ql.loader.symbols.add_source(lambda: QlLoaderELF.elf_symbols(path, base), base)
+
+        symbols = dict(QlLoaderELF.elf_symbols(path, base))
+        self.assertIn('main', symbols)
+
+        main = symbols['main']
+        symbols = ql.loader.symbols
+
+        self.assertEqual(main, symbols.lookup('main'))
+        self.assertEqual(main, symbols.lookup('main', os.path.basename(path)))
+        self.assertIsNone(symbols.lookup('main', 'libfoo.so'))
+
+        self.assertEqual('main', symbols.get_name(main))
+        self.assertIsNone(symbols.get_name(main + 1))
+
+        sym = symbols.resolve(main + 1)
+        self.assertEqual(('main', main), (sym.name, sym.address))
+        self.assertEqual(f'{os.path.basename(path)}!main+0x1', symbols.format(main + 1))
+
+        # addresses outside of any image resolve only to global symbols
+        self.assertIsNone(symbols.resolve(0x1000))
+        self.assertEqual('0x1000', symbols.format(0x1000))
+
+        symbols.add('global_sym', 0x1000)
+        self.assertEqual('global_sym', symbols.format(0x1000))
+        self.assertEqual(0x1000, symbols.lookup('global_sym'))
+
+        # an address within overlapping images belongs to the one that was loaded first
+        ql.loader.images.append(Image(base + 0x100000, base + 0x200000, 'inner'))
+        ql.loader.images.append(Image(base + 0x2000000, base + 0x3000000, 'other'))
+
+        self.assertEqual((0, ql.loader.images[0]), symbols.find_image(base + 0x180000))
+        self.assertEqual((0, ql.loader.images[0]), symbols.find_image(base + 0x300000))
+        self.assertEqual((2, ql.loader.images[2]), symbols.find_image(base + 0x2000000))
+        self.assertIsNone(symbols.find_image(base + 0x1800000))
+
     def test_elf_linux_x8664_path_traversion(self):
         ql = Qiling(["../examples/rootfs/x8664_linux/bin/path_traverse_static"], "../examples/rootfs/x8664_linux", verbose=QL_VERBOSE.DEBUG)
 
@@ -201,6 +201,247 @@ class ELFTest(unittest.TestCase):
         self.assertTrue(logged[-2].startswith('thread 1 ret val is'))
         self.assertTrue(logged[-1].startswith('thread 2 ret val is'))
 
+    def test_multithread_sched_policies_x8664(self):
+        configs = (
+            ('rr',       'insn',  '1000'),
+            ('rr',       'block', '100'),
+            ('priority', 'insn',  '31337'),
+            ('priority', 'block', '50')
+        )
+
+        for policy, unit, length in configs:
+            with self.subTest(policy=policy, unit=unit):
+                logged: List[str] = []
+                stats = {}
+
+                def check_write(ql: Qiling, fd: int, write_buf, count: int):
+                    if fd == 1:
+                        content = ql.mem.read(write_buf, count)
+
+                        logged.extend(content.decode().splitlines())
+
+                    # scheduling metrics of the threads that are alive at this point
+                    stats.update(ql.os.thread_management.stats)
+
+                profile = {'THREADS': {'sched_policy': policy, 'sched_slice_unit': unit, 'sched_slice': length}}
+
+                ql = Qiling([fr'{X64_LINUX_ROOTFS}/bin/x8664_multithreading'], X64_LINUX_ROOTFS, multithread=True, profile=profile, verbose=QL_VERBOSE.DEBUG)
+
+                ql.os.stats = QlOsNullStats()
+                ql.os.set_syscall("write", check_write, QL_INTERCEPT.ENTER)
+                ql.run()
+
+                self.assertGreaterEqual(len(logged), 2)
+                self.assertTrue(logged[-2].startswith('thread 1 ret val is'))
+                self.assertTrue(logged[-1].startswith('thread 2 ret val is'))
+
+                tm = ql.os.thread_management
+
+                # main thread and both of its threads ran
+                self.assertGreaterEqual(tm.switches, 3)
+                self.assertGreaterEqual(tm.slices, tm.switches)
+
+                # every thread that wrote anything was switched in first
+                self.assertTrue(stats)
+                self.assertTrue(all(switches >= 1 for switches, _, _ in stats.values()))
+
+                del ql
+
+    def test_multithread_sched_queues(self):
+        from qiling.os.linux.thread import QlLinuxThreadManagement, THREAD_STATUS_BLOCKING, THREAD_STATUS_RUNNING
+        from qiling.os.posix.syscall.resource import ql_syscall_getpriority, ql_syscall_setpriority
+        from qiling.os.posix.syscall.sched import ql_syscall_sched_getparam, ql_syscall_sched_setscheduler
+
+        ql = Qiling(code=b'\xcc', archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, profile={'THREADS': {'sched_policy': 'priority'}}, verbose=QL_VERBOSE.DEBUG)
+
+        tm = QlLinuxThreadManagement(ql)
+        ql.os.thread_management = tm
+
+        t1, t2, t3 = (ql.os.thread_class(ql, 0x1000, 0x2000) for _ in range(3))
+        tm.cur_thread = t1
+
+        # threads of the same priority run in turns
+        self.assertIs(t1, tm._pick())
+        tm._enqueue(t1)
+
+        # raising the priority of a queued thread moves it ahead
+        self.assertEqual(0, ql_syscall_setpriority(ql, 0, t3.id, -5 & 0xffffffff))
+        self.assertEqual(25, ql_syscall_getpriority(ql, 0, t3.id))
+
+        # real-time threads precede all others
+        param = ql.mem.map_anywhere(0x1000, minaddr=0x10000)
+        ql.mem.write_ptr(param, 10, 4)
+
+        self.assertEqual(0, ql_syscall_sched_setscheduler(ql, t2.id, 1, param))
+        self.assertEqual(0, ql_syscall_sched_getparam(ql, t2.id, param + 4))
+        self.assertEqual(10, ql.mem.read_ptr(param + 4, 4))
+
+        # invalid parameters and unknown threads
+        self.assertEqual(-22, ql_syscall_sched_setscheduler(ql, t1.id, 0, param))
+        self.assertEqual(-3, ql_syscall_setpriority(ql, 0, 1337, 0))
+
+        self.assertListEqual([t2, t3, t1], [tm._pick() for _ in range(3)])
+        self.assertIsNone(tm._pick())
+
+        # blocked threads are runnable again once woken up or timed out
+        tm.block(t1)
+        tm.block(t2, deadline=tm.clock() - 1)
+
+        self.assertTrue(tm.wake(t1))
+        self.assertFalse(tm.wake(t1))
+
+        tm._expire_timers(tm.clock())
+
+        self.assertEqual(THREAD_STATUS_RUNNING, t2.status)
+        self.assertListEqual([t2, t1], [tm._pick() for _ in range(2)])
+
+        # a timeout that expires after the thread was woken up is ignored
+        tm.block(t3, deadline=tm.clock() - 1)
+        tm.wake(t3)
+        tm.block(t3)
+
+        tm._expire_timers(tm.clock())
+
+        self.assertEqual(THREAD_STATUS_BLOCKING, t3.status)
+        self.assertIsNone(tm._pick())
+
+        # with all threads blocked, the clock leaps to the earliest timeout instead of waiting for it
+        deadline = tm.clock() + 10
+        tm.block(t1, deadline=deadline)
+
+        self.assertTrue(tm._idle())
+        self.assertEqual(deadline, tm.clock())
+
+        tm._expire_timers(tm.clock())
+        self.assertIs(t1, tm._pick())
+
+        del ql
+
+    def test_multithread_futex_queues(self):
+        from qiling.os.linux.thread import QlLinuxThreadManagement
+        from qiling.os.posix.const import EAGAIN, EINVAL, ETIMEDOUT
+
+        ql = Qiling(code=b'\xcc', archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        tm = QlLinuxThreadManagement(ql)
+        ql.os.thread_management = tm
+
+        futexm = ql.os.futexm
+        t0, t1, t2, t3 = threads = [ql.os.thread_class(ql, 0x1000, 0x2000) for _ in range(4)]
+
+        futex1 = ql.mem.map_anywhere(0x1000)
+        futex2 = futex1 + 4
+
+        ql.mem.write_ptr(futex1, 1, 4)
+        ql.mem.write_ptr(futex2, 0, 4)
+
+        # waiting requires the futex to hold the expected value
+        self.assertEqual(-EAGAIN, futexm.futex_wait(ql, futex1, t0, 0))
+
+        for t in threads:
+            self.assertEqual(0, futexm.futex_wait(ql, futex1, t, 1))
+            self.assertTrue(t.is_blocking())
+
+        # FUTEX_REQUEUE: wake one waiter and move two others to the second futex
+        self.assertEqual(1, futexm.futex_requeue(ql, futex1, 1, futex2, 2))
+        self.assertTrue(t0.is_running())
+
+        # FUTEX_CMP_REQUEUE: fails unless the futex holds the expected value, and counts requeued waiters
+        self.assertEqual(-EAGAIN, futexm.futex_requeue(ql, futex2, 0, futex1, 1, 5))
+        self.assertEqual(1, futexm.futex_requeue(ql, futex2, 0, futex1, 1, 0))
+
+        # futex1 now holds t3 and t1, and futex2 holds t2
+        self.assertListEqual([t3, t1], [w.thread for w in futexm.wait_list[futex1]])
+        self.assertListEqual([t2], [w.thread for w in futexm.wait_list[futex2]])
+
+        # FUTEX_WAKE_OP: set futex2 to 1, wake one on futex1 and, since futex2 was 0, one on futex2
+        self.assertEqual(2, futexm.futex_wake_op(ql, futex1, 1, futex2, 1, 1 << 12))
+        self.assertEqual(1, ql.mem.read_ptr(futex2, 4))
+        self.assertTrue(t3.is_running())
+        self.assertTrue(t2.is_running())
+        self.assertTrue(t1.is_blocking())
+
+        self.assertEqual(1, futexm.futex_wake(ql, futex1, 10))
+        self.assertNotIn(futex1, futexm.wait_list)
+
+        # bitsets: wake up only waiters whose bitset intersects the wake bitset
+        self.assertEqual(-EINVAL, futexm.futex_wait(ql, futex1, t0, 1, 0))
+        self.assertEqual(-EINVAL, futexm.futex_wake(ql, futex1, 10, 0))
+
+        futexm.futex_wait(ql, futex1, t0, 1, 0b01)
+        futexm.futex_wait(ql, futex1, t1, 1, 0b10)
+
+        self.assertEqual(1, futexm.futex_wake(ql, futex1, 10, 0b10))
+        self.assertTrue(t1.is_running())
+        self.assertTrue(t0.is_blocking())
+
+        self.assertEqual(1, futexm.futex_wake(ql, futex1, 10))
+        self.assertTrue(t0.is_running())
+
+        # timeouts: the waiter resumes with ETIMEDOUT and may not be woken up anymore
+        self.assertEqual(0, futexm.futex_wait(ql, futex1, t2, 1, deadline=tm.clock() - 1))
+
+        tm._expire_timers(tm.clock())
+        self.assertTrue(t2.is_running())
+
+        t2._on_timeout(t2)
+        self.assertEqual(-ETIMEDOUT, ql.unpacks(ql.pack(ql.arch.regs.rax)))
+
+        self.assertEqual(0, futexm.futex_wake(ql, futex1, 1))
+
+        del ql
+
+    def test_multithread_epoll_wait(self):
+        from qiling.os.linux.thread import QlLinuxThreadManagement
+        from qiling.os.posix.const import EPOLL_CTL_ADD, EPOLLIN
+        from qiling.os.posix.filestruct import ql_pipe
+        from qiling.os.posix.syscall.epoll import ql_syscall_epoll_create1, ql_syscall_epoll_ctl, ql_syscall_epoll_wait
+
+        ql = Qiling(code=b'\xcc', archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DEBUG)
+
+        tm = QlLinuxThreadManagement(ql)
+        ql.os.thread_management = tm
+
+        t1, t2 = (ql.os.thread_class(ql, 0x1000, 0x2000) for _ in range(2))
+        tm.cur_thread = t1
+
+        self.assertIs(t1, tm._pick())
+
+        rd, wr = ql_pipe.open()
+        ql.os.fd[10] = rd
+
+        buf = ql.mem.map_anywhere(0x1000, minaddr=0x10000)
+        ql.mem.write(buf, ql.pack32(EPOLLIN) + ql.pack64(0x1337))
+
+        epfd = ql_syscall_epoll_create1(ql, 0)
+        self.assertEqual(0, ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_ADD, 10, buf))
+
+        # an indefinite wait does not block the host while other threads may run
+        self.assertEqual(0, ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, -1 & 0xffffffff))
+        self.assertTrue(t1.is_blocking())
+
+        # the waiting thread checks the epoll instance again after the others had their turn
+        tm._expire_timers(tm.clock())
+        self.assertListEqual([t2, t1], [tm._pick() for _ in range(2)])
+
+        tm._enqueue(t2)
+        t1._on_timeout(t1)
+        self.assertTrue(t1.is_blocking())
+
+        wr.write(b'x')
+
+        tm._expire_timers(tm.clock() + 1)
+        self.assertTrue(t1.is_running())
+
+        t1._on_timeout(t1)
+        self.assertEqual(1, ql.arch.regs.rax)
+        self.assertEqual(0x1337, ql.unpack64(ql.mem.read(buf + 0x104, 8)))
+
+        for f in (rd, wr, ql.os.fd[epfd]):
+            f.close()
+
+        del ql
+
     def test_tcp_elf_linux_x86(self):
         logged: List[str] = []
 
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+from qiling.extensions.afl import QlPersistentState
+from qiling.extensions.fuzzing import QlFuzzDriver, QlFuzzExecutor, QlFuzzResult
+from qiling.os.memory import QlMemoryHeap
+
+#   cmp rsi, 2
+#   jb done
+#   cmp byte [rdi], 'F'
+#   jne done
+#   cmp byte [rdi + 1], 'U'
+#   jne done
+#   mov qword [0], rax
+# done:
+#   nop
+X8664_TARGET = bytes.fromhex('4883fe02 7213 803f46 750e 807f0155 7508 4889042500000000 90')
+
+INPUT_ADDR = 0x10000000
+
+
+class FuzzingTest(unittest.TestCase):
+    def setUp(self):
+        self.ql = Qiling(code=X8664_TARGET, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DISABLED)
+        self.ql.mem.map(INPUT_ADDR, 0x1000, info='[input]')
+
+        # prepare the instance to run from the beginning of the target
+        begin = self.ql.loader.load_address
+        self.ql.arch.regs.arch_pc = begin
+
+        self.exit = begin + len(X8664_TARGET) - 1
+
+    @staticmethod
+    def place_input(ql: Qiling, data: bytes, iteration: int):
+        if data == b'DIE':
+            # simulate a target that brings down the whole process
+            os._exit(1)
+
+        ql.mem.write(INPUT_ADDR, data)
+        ql.arch.regs.rdi = INPUT_ADDR
+        ql.arch.regs.rsi = len(data)
+
+        return True
+
+    def test_executor(self):
+        executor = QlFuzzExecutor(self.ql, self.place_input, [self.exit])
+        executor.prepare()
+
+        self.assertEqual(QlFuzzResult.OK, executor.run(b'FA'))
+        self.assertEqual(QlFuzzResult.CRASH, executor.run(b'FUZZ'))
+
+        # the state is reset between testcases
+        self.assertEqual(QlFuzzResult.OK, executor.run(b'A'))
+        self.assertEqual(b'A\x00\x00\x00', self.ql.mem.read(INPUT_ADDR, 4))
+
+        executor.place_input_callback = lambda ql, data, iteration: False
+        self.assertEqual(QlFuzzResult.SKIPPED, executor.run(b'FUZZ'))
+
+    def test_persistent_state(self):
+        self.ql.os.heap = QlMemoryHeap(self.ql, 0x20000000, 0x20100000)
+
+        state = QlPersistentState(self.ql)
+        state.save()
+
+        for _ in range(3):
+            chunk = self.ql.os.heap.alloc(0x100)
+            self.ql.mem.write(INPUT_ADDR, b'dirty')
+            self.ql.arch.regs.rax = 0x1337
+
+            state.restore()
+
+            self.assertEqual(b'\x00' * 5, self.ql.mem.read(INPUT_ADDR, 5))
+            self.assertEqual(0, self.ql.arch.regs.rax)
+            self.assertListEqual([], self.ql.os.heap.chunks)
+
+        # allocations are repeatable across iterations
+        self.assertEqual(chunk, self.ql.os.heap.alloc(0x100))
+
+    def test_driver(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            driver = QlFuzzDriver(self.ql, self.place_input, [self.exit], workers=2, output_dir=tmpdir)
+
+            corpus = driver.fuzz([b'AA', b'AB', b'FA', b'FUZZ'], iterations=4)
+
+            # 'AA' and 'AB' take the same path, so only one of them is kept
+            self.assertEqual(2, len(corpus.queue))
+            self.assertIn(b'FA', corpus.queue)
+            self.assertListEqual([b'FUZZ'], corpus.crashes)
+            self.assertEqual(4, corpus.execs)
+
+            self.assertEqual(2, len(os.listdir(os.path.join(tmpdir, 'queue'))))
+            self.assertEqual(1, len(os.listdir(os.path.join(tmpdir, 'crashes'))))
+
+            # fuzzing resumes with the same corpus
+            corpus = driver.fuzz(iterations=50)
+            self.assertEqual(54, corpus.execs)
+
+    def test_driver_worker_death(self):
+        driver = QlFuzzDriver(self.ql, self.place_input, [self.exit], workers=1)
+
+        # the worker dies on the first input, and gets replaced for the second one
+        corpus = driver.fuzz([b'DIE', b'AA'], iterations=2)
+
+        self.assertListEqual([b'DIE'], corpus.crashes)
+        self.assertListEqual([b'AA'], corpus.queue)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@
 # Cross Platform and Multi Architecture Advanced Binary Emulation Framework
 #
 
+import os
+import tempfile
 import unittest
 
 import sys
@@ -14,6 +16,23 @@ from qiling.extensions.mcu.stm32f4 import stm32f407, stm32f411, stm32f429
 from qiling.extensions.mcu.stm32f1 import stm32f103
 from qiling.extensions.mcu.atmel import sam3x8e
 from qiling.extensions.mcu.gd32vf1 import gd32vf103
+from qiling.extensions.mcu.runner import QlMcuExit, QlMcuJob, QlMcuRunner
+from qiling.hw.dma.stm32f4xx_dma import STM32F4xxDma
+from qiling.hw.scheduler import QlHwScheduler
+
+# usart2 echo, as a raw binary mapped at 0x8000000:
+#   .word 0x20010000, reset | 1
+# reset:
+#   movw r2, #0x4400
+#   movt r2, #0x4000
+# loop:
+#   ldr r3, [r2]        @ SR
+#   tst r3, #0x20       @ RXNE
+#   beq loop
+#   ldr r3, [r2, #4]    @ DR
+#   str r3, [r2, #4]
+#   b loop
+USART_ECHO = bytes.fromhex('00000120 09000008 44f20042 c4f20002 1368 13f0200f fbd0 5368 5360 f8e7')
 
 
 class MCUTest(unittest.TestCase):
@@ -26,6 +45,27 @@ class MCUTest(unittest.TestCase):
 
         del ql
 
+    def test_mcu_hw_find_stm32f411(self):
+        ql = Qiling(["../examples/rootfs/mcu/stm32f411/rand_blink.hex"],
+                    archtype=QL_ARCH.CORTEX_M, ostype=QL_OS.MCU, env=stm32f411, verbose=QL_VERBOSE.DISABLED)
+
+        ql.hw.create('usart2')
+        ql.hw.create('gpioa')
+
+        self.assertIs(ql.hw.find(0x40004400), ql.hw.usart2)
+        self.assertIs(ql.hw.find(0x40004404), ql.hw.usart2)
+        self.assertIs(ql.hw.find(0x40020014), ql.hw.gpioa)
+        self.assertIsNone(ql.hw.find(0x40005400))
+
+        # the lookup follows peripherals creation and removal
+        ql.hw.create('i2c1')
+        self.assertIs(ql.hw.find(0x40005400), ql.hw.i2c1)
+
+        ql.hw.delete('gpioa')
+        self.assertIsNone(ql.hw.find(0x40020014))
+
+        del ql
+
     def test_mcu_snapshot_stm32f411(self):
         def create_qiling():
             ql = Qiling(["../examples/rootfs/mcu/stm32f411/hello_usart.hex"],
@@ -111,6 +151,57 @@ class MCUTest(unittest.TestCase):
 
         del ql
 
+    def test_mcu_quantum_freertos_stm32f411(self):
+        ql = Qiling(["../examples/rootfs/mcu/stm32f411/os-demo.elf"],
+                    archtype=QL_ARCH.CORTEX_M, ostype=QL_OS.MCU, env=stm32f411, verbose=QL_VERBOSE.DISABLED)
+
+        ql.hw.create('usart2')
+        ql.hw.create('rcc')
+        ql.hw.create('gpioa')
+
+        count = 0
+        def counter():
+            nonlocal count
+            count += 1
+
+        ql.hw.gpioa.hook_set(5, counter)
+
+        # run up to 1000 instructions at a time between peripheral updates
+        ql.os.quantum = 1000
+
+        ql.hw.systick.ratio = 0xff
+        ql.run(count=100000)
+
+        self.assertTrue(count >= 5)
+        self.assertTrue(ql.hw.usart2.recv().startswith(b'Free RTOS\n' * 5))
+
+        del ql
+
+    def test_mcu_quantum_count(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            firmware = os.path.join(tmpdir, 'echo.bin')
+
+            with open(firmware, 'wb') as f:
+                f.write(USART_ECHO)
+
+            results = []
+
+            for quantum in (1, 1000):
+                ql = Qiling([firmware, 0x8000000], archtype=QL_ARCH.CORTEX_M, ostype=QL_OS.MCU, env=stm32f407, verbose=QL_VERBOSE.DISABLED)
+
+                ql.hw.create('usart2').send(b'x')
+                ql.os.quantum = quantum
+
+                # the run reaches the end address well before the quantum is over
+                ql.run(end=0x800001b)
+
+                results.append((ql.os.counter, ql.hw.cycles))
+
+                del ql
+
+        # only the executed instructions are accounted, and peripherals are not run ahead of the cpu
+        self.assertListEqual([(6, 6), (6, 6)], results)
+
     def test_mcu_dma_stm32f411(self):
         ql = Qiling(["../examples/rootfs/mcu/stm32f411/dma-clock.elf"],
                     archtype=QL_ARCH.CORTEX_M, ostype=QL_OS.MCU, env=stm32f411, verbose=QL_VERBOSE.DEFAULT)
@@ -440,6 +531,100 @@ class MCUTest(unittest.TestCase):
         self.assertEqual(ql.hw.usart2.recv(), b'Nice Hack!\n')
         self.assertEqual(ql.hw.usart3.recv(), b'Welcome to the world of Hacking!\naaaaaaaaaaaaaaaaaaaa\xa9\x05\n')
 
+    def test_hw_scheduler(self):
+        scheduler = QlHwScheduler()
+
+        scheduler.schedule('tim1', 300)
+        scheduler.schedule('tim2', 100)
+        scheduler.schedule('systick', 200)
+
+        # rescheduling replaces the previous event
+        scheduler.schedule('tim2', 250)
+        self.assertEqual(scheduler.peek(), 200)
+
+        scheduler.cancel('tim1')
+        self.assertListEqual(list(scheduler.due(1000)), ['systick', 'tim2'])
+        self.assertIsNone(scheduler.peek())
+
+        for deadline in range(100):
+            scheduler.schedule('systick', deadline)
+
+        # stale entries do not pile up
+        self.assertLess(len(scheduler.queue), 20)
+        self.assertListEqual(list(scheduler.due(98)), [])
+        self.assertListEqual(list(scheduler.due(99)), ['systick'])
+
+    def test_hw_peripheral_accessors(self):
+        ql = Qiling(code=b'\x00\xbf', archtype=QL_ARCH.ARM, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.DISABLED)
+
+        dma = STM32F4xxDma(ql, 'dma1')
+        ndtr = dma.struct.stream.offset + 0x18 * 2 + 4
+
+        self.assertEqual(dma.field_description(ndtr, 4), 'stream[2].NDTR')
+
+        dma.write(ndtr, 4, 0x1234)
+        self.assertEqual(dma.instance.stream[2].NDTR, 0x1234)
+        self.assertEqual(dma.read(ndtr, 4), 0x1234)
+
+        # partial register accesses go through memory
+        self.assertEqual(dma.read(ndtr + 1, 1), 0x12)
+
+        dma.write(ndtr, 2, 0xabcd)
+        self.assertEqual(dma.read(ndtr, 4), 0xabcd)
+
+        # hooks are called once registered
+        accesses = []
+        hook = dma.hook_read(lambda peripheral, access, offset, size, value: accesses.append(offset))
+
+        dma.read(ndtr, 4)
+        dma.hook_del(hook)
+        dma.read(ndtr, 4)
+
+        self.assertListEqual(accesses, [ndtr])
+
+    def test_mcu_runner(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            firmware = os.path.join(tmpdir, 'echo.bin')
+
+            with open(firmware, 'wb') as f:
+                f.write(USART_ECHO)
+
+            def job(name, **kwargs):
+                return QlMcuJob(firmware, 'stm32f407', base=0x8000000, peripherals=['usart2'], name=name, **kwargs)
+
+            jobs = [
+                job('echo', inputs={'usart2': b'hello'}, count=2000),
+                job('quantum', inputs={'usart2': b'hello'}, count=2000, quantum=8),
+                job('end', inputs={'usart2': b'x'}, end=0x800001b),
+                job('stop', script=lambda ql: ql.hook_address(lambda ql: ql.os.stop(), 0x8000010)),
+                job('timeout', timeout=0.2),
+                QlMcuJob(os.path.join(tmpdir, 'missing.bin'), 'stm32f407', base=0x8000000, name='error')
+            ]
+
+            results = QlMcuRunner(workers=2, timeout=30).run(jobs)
+
+        self.assertListEqual([result.name for result in results], [job.name for job in jobs])
+        echo, quantum, end, stop, timeout, error = results
+
+        self.assertEqual(echo.reason, QlMcuExit.COUNT)
+        self.assertEqual(echo.count, 2000)
+        self.assertEqual(echo.output, {'usart2': b'hello'})
+        self.assertEqual(quantum.output, {'usart2': b'hello'})
+
+        # the end address is not executed
+        self.assertEqual(end.reason, QlMcuExit.END)
+        self.assertEqual(end.output, {'usart2': b''})
+
+        self.assertEqual(stop.reason, QlMcuExit.STOP)
+        self.assertEqual(timeout.reason, QlMcuExit.TIMEOUT)
+        self.assertGreater(timeout.count, 0)
+
+        self.assertEqual(error.reason, QlMcuExit.ERROR)
+        self.assertIsNotNone(error.error)
+
+        with self.assertRaises(KeyError):
+            QlMcuRunner().run([QlMcuJob(firmware, 'nonexistent')])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -11,7 +11,7 @@ from qiling import Qiling
 from qiling.const import *
 from qiling.exception import *
 from qiling.extensions import pipe
-from qiling.loader.pe import QlPeCache
+from qiling.loader.pe import QlPeCache, QlPeCacheEntry
 from qiling.os.const import *
 from qiling.os.windows.fncc import *
 from qiling.os.windows.utils import *
@@ -76,6 +76,30 @@ class PETest(unittest.TestCase):
         self.assertTrue(QLWinSingleTest(_t).run())
 
 
+    def test_pe_win_x8664_hello_lazy_dlls(self):
+        def _t():
+            ql = Qiling(["../examples/rootfs/x8664_windows/bin/x8664_hello.exe"], "../examples/rootfs/x8664_windows", profile={'MISC': {'lazy_dlls': 'True'}})
+
+            # imported dlls are only loaded once they are called
+            loaded = len(ql.loader.images)
+            self.assertTrue(ql.loader.lazy_stubs)
+
+            ql.run()
+
+            self.assertGreater(len(ql.loader.images), loaded)
+
+            # dlls that were not called yet are loaded once they are looked up
+            for dll_name in [name for name in ql.loader.lazy_iat if name not in ql.loader.import_address_table]:
+                ql.loader.load_lazy_dll(dll_name)
+
+                self.assertIsNotNone(ql.loader.get_image_by_name(dll_name, casefold=True))
+
+            del ql
+            return True
+
+        self.assertTrue(QLWinSingleTest(_t).run())
+
+
     def test_pe_win_x86_hello(self):
         def _t():
             ql = Qiling(["../examples/rootfs/x86_windows/bin/x86_hello.exe"], "../examples/rootfs/x86_windows")
@@ -421,6 +445,45 @@ class PETest(unittest.TestCase):
         self.assertTrue(QLWinSingleTest(_t).run())
 
 
+    def test_pe_win_x8664_customapi_resolved(self):
+        def _t():
+            calls = []
+
+            @winsdkapi(cc=CDECL, params={
+                "str" : STRING
+            })
+            def my_puts64(ql: Qiling, address: int, params):
+                calls.append(('first', params["str"]))
+
+                return len(params["str"])
+
+            def my_puts64_replaced(ql: Qiling, address: int, api_name: str):
+                calls.append(('second', api_name))
+
+            ql = Qiling(["../examples/rootfs/x8664_windows/bin/x8664_hello.exe"], "../examples/rootfs/x8664_windows", verbose=QL_VERBOSE.DEFAULT)
+            ql.os.set_api("puts", my_puts64, QL_INTERCEPT.CALL)
+            ql.run()
+
+            # the replacement set before the run is used once puts is resolved
+            if [tag for tag, _ in calls] != ['first']:
+                return False
+
+            puts_addr = next(addr for addr, entry in ql.loader.import_symbols.items() if entry['name'] == b'puts')
+
+            # replacing the api again must take effect on the already resolved entry
+            ql.os.set_api("puts", my_puts64_replaced, QL_INTERCEPT.CALL)
+            ql.os.hook_winapi(ql, puts_addr, 0)
+            ql.os.hook_winapi(ql, puts_addr, 0)
+
+            if calls[1:] != [('second', 'puts'), ('second', 'puts')]:
+                return False
+
+            del ql
+            return True
+
+        self.assertTrue(QLWinSingleTest(_t).run())
+
+
     def test_pe_win_x86_argv(self):
         def _t():
             
@@ -543,7 +606,7 @@ class PETest(unittest.TestCase):
     class RefreshCache(QlPeCache):
         def restore(self, path):
             # If the cache entry exists, delete it
-            fcache = self.create_filename(path)
+            fcache = self.cache_filename(path)
             if os.path.exists(fcache):
                 os.remove(fcache)
             return super().restore(path)
@@ -556,17 +619,66 @@ class PETest(unittest.TestCase):
         def restore(self, path):
             entry = super().restore(path)
             self.testcase.assertTrue(entry is not None)  # Check that it loaded a cache entry
+            cmdlines = [name for _, _, name in entry.exports if name in (b'_acmdln', b'_wcmdln')]
             if path.endswith('msvcrt.dll'):
-                self.testcase.assertEqual(len(entry.cmdlines), 2)
+                self.testcase.assertEqual(len(cmdlines), 2)
             else:
-                self.testcase.assertEqual(len(entry.cmdlines), 0)
-            self.testcase.assertIsInstance(entry.data, bytearray)
+                self.testcase.assertEqual(len(cmdlines), 0)
             return entry
 
         def save(self, path, entry):
             self.testcase.assertFalse(True)  # This should not be called!
 
 
+    def test_pe_cache_rebase(self):
+        from tempfile import TemporaryDirectory
+
+        # a fake pe32+ image with a 32-bit and a 64-bit relocations
+        data = bytearray(0x1800)
+        data[0x3c:0x40] = (0x80).to_bytes(4, 'little')
+        data[0x98:0x9a] = (0x20b).to_bytes(2, 'little')
+        data[0xb0:0xb8] = (0x10000000).to_bytes(8, 'little')
+        data[0x100:0x104] = (0x10001234).to_bytes(4, 'little')
+        data[0x208:0x210] = (0x10005678).to_bytes(8, 'little')
+
+        exports = [(0x300, 1, b'foo'), (0x400, 2, None)]
+
+        with TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'Fake.DLL')
+
+            with open(path, 'wb') as outfile:
+                outfile.write(b'MZ')
+
+            # keep cache files in a central directory
+            cache = QlPeCache(os.path.join(tmpdir, 'cache'))
+            cache.save(path, QlPeCacheEntry(0x10000000, 0x10000000, data, ([0x100], [0x208]), exports))
+
+            self.assertTrue(os.path.exists(cache.cache_filename(path)))
+            self.assertEqual(os.path.join(tmpdir, 'cache'), os.path.dirname(cache.cache_filename(path)))
+
+            entry = cache.restore(path)
+
+            self.assertIsNotNone(entry)
+            self.assertEqual(0x10000000, entry.ba)
+            self.assertEqual(0x2000, len(entry.data))
+            self.assertEqual(data, entry.data[:len(data)])
+            self.assertListEqual(exports, list(entry.exports))
+
+            QlPeCache.rebase(entry, 0x20000000)
+
+            self.assertEqual(0x20001234, int.from_bytes(entry.data[0x100:0x104], 'little'))
+            self.assertEqual(0x20005678, int.from_bytes(entry.data[0x208:0x210], 'little'))
+            self.assertEqual(0x20000000, int.from_bytes(entry.data[0xb0:0xb8], 'little'))
+
+            # rebasing modifies a private copy of the cached image
+            self.assertEqual(data, cache.restore(path).data[:len(data)])
+
+            # cache entry becomes stale once the dll is modified
+            with open(path, 'ab') as outfile:
+                outfile.write(b'\x00')
+
+            self.assertIsNone(cache.restore(path))
+
     def test_pe_win_x8664_libcache(self):
         
         def _t():
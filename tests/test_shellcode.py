@@ -9,7 +9,7 @@ import sys
 sys.path.append("..")
 
 from qiling import Qiling
-from qiling.const import QL_ARCH, QL_OS, QL_INTERCEPT, QL_VERBOSE
+from qiling.const import QL_ARCH, QL_OS, QL_INTERCEPT, QL_VERBOSE, QL_HOOK_BLOCK
 
 
 # test = bytes.fromhex('cccc')
@@ -65,6 +65,16 @@ X8664_FBSD = bytes.fromhex('''
     ffceb05a0f0575f799043b48bb2f62696e2f2f73685253545f5257545e0f05
 ''')
 
+# mov rcx, 3
+# loop:
+#   mov eax, 39     ; getpid
+#   push rcx
+#   syscall
+#   pop rcx
+#   dec rcx
+#   jnz loop
+X8664_LIN_GETPID = bytes.fromhex('48c7c103000000 b827000000 51 0f05 59 48ffc9 75f2')
+
 X8664_MACOS = bytes.fromhex('''
     4831f65648bf2f2f62696e2f7368574889e74831d24831c0b00248c1c828b03b
     0f05
@@ -98,6 +108,183 @@ class TestShellcode(unittest.TestCase):
         ql = Qiling(code=X8664_LIN, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
         ql.run()
 
+    def test_linux_x64_set_syscall(self):
+        print("Linux X86 64bit Shellcode syscall hooks")
+        ql = Qiling(code=X8664_LIN_GETPID, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
+
+        begin = ql.arch.regs.arch_pc
+        end = begin + len(X8664_LIN_GETPID)
+
+        entered = []
+
+        def onenter_getpid(ql: Qiling):
+            entered.append(ql.arch.regs.rcx)
+
+        def my_getpid(ql: Qiling):
+            return 1337
+
+        ql.os.set_syscall('getpid', onenter_getpid, QL_INTERCEPT.ENTER)
+        ql.run(begin, end)
+
+        self.assertListEqual([3, 2, 1], entered)
+
+        # syscall has already been dispatched; make sure new hooks take effect
+        ql.os.set_syscall(39, my_getpid)
+        ql.run(begin, end)
+
+        self.assertListEqual([3, 2, 1] * 2, entered)
+        self.assertEqual(1337, ql.arch.regs.rax)
+
+    def test_linux_x64_hook_entries(self):
+        print("Linux X86 64bit Shellcode entry points hooks")
+        ql = Qiling(code=X8664_LIN_GETPID, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
+
+        begin = ql.loader.load_address
+        end = begin + len(X8664_LIN_GETPID)
+
+        # loop head is a branch target, but its first iteration is reached by falling through
+        loop = begin + 7
+        entries = set()
+        entered = []
+
+        def onentry(ql: Qiling, address: int, size: int):
+            entered.append((address, ql.arch.regs.rcx))
+
+        hret = ql.hook_entries(onentry, entries, begin, end - 1)
+
+        # entries container is referenced, not copied
+        entries.add(loop)
+        ql.run(begin, end)
+
+        self.assertListEqual([(loop, 2), (loop, 1)], entered)
+
+        hret.remove()
+        ql.run(begin, end)
+
+        self.assertListEqual([(loop, 2), (loop, 1)], entered)
+
+    def test_linux_x64_hook_chains(self):
+        print("Linux X86 64bit Shellcode compiled hook chains")
+
+        def __run(compile_hooks: bool):
+            ql = Qiling(code=X8664_LIN_GETPID, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
+            ql.compile_hooks = compile_hooks
+
+            begin = ql.loader.load_address
+            end = begin + len(X8664_LIN_GETPID)
+
+            events = []
+
+            def onexec(ql: Qiling, address: int, size: int, tag: str):
+                events.append((tag, address - begin))
+
+                # block subsequent hooks on the loop head
+                if tag == 'loop' and address == begin + 7:
+                    return QL_HOOK_BLOCK
+
+            ql.hook_code(onexec, user_data='all')
+            ql.hook_code(onexec, user_data='loop', begin=begin + 7, end=begin + 13)
+            hret = ql.hook_code(onexec, user_data='gone', begin=begin, end=end)
+            ql.hook_code(onexec, user_data='tail', begin=begin + 14, end=end)
+
+            hret.remove()
+            ql.run(begin, end)
+
+            return events
+
+        events = __run(True)
+
+        self.assertIn(('loop', 7), events)
+        self.assertIn(('tail', 15), events)
+        self.assertNotIn('gone', (tag for tag, _ in events))
+        self.assertListEqual(__run(False), events)
+
+    def test_linux_x64_io_multiplexing(self):
+        print("Linux X86 64bit select, poll and epoll")
+
+        from qiling.os.posix import syscall
+        from qiling.os.posix.const import EEXIST, ENOENT, EPOLL_CTL_ADD, EPOLL_CTL_DEL, EPOLL_CTL_MOD, EPOLLIN, EPOLLHUP, EPOLLONESHOT, POLLIN, POLLOUT, POLLNVAL
+        from qiling.os.posix.filestruct import ql_pipe
+
+        ql = Qiling(code=X8664_LIN, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
+
+        rd, wr = ql_pipe.open()
+        ql.os.fd[10] = rd
+        ql.os.fd[70] = wr
+
+        buf = ql.mem.map_anywhere(0x1000, minaddr=0x10000)
+
+        def __select() -> int:
+            # fd_sets of 1024 bits and a zero timeout
+            ql.mem.write(buf, b'\x00' * 0x100 + b'\x00' * 0x10)
+            ql.mem.write_ptr(buf + 0x00 + 10 // 8, 1 << (10 % 8), 1)
+            ql.mem.write_ptr(buf + 0x80 + 70 // 8, 1 << (70 % 8), 1)
+
+            return syscall.ql_syscall__newselect(ql, 71, buf, buf + 0x80, 0, buf + 0x100)
+
+        # only the write end is ready, and only its bit is left set
+        self.assertEqual(1, __select())
+        self.assertEqual(0, ql.mem.read_ptr(buf + 0x00 + 10 // 8, 1))
+        self.assertEqual(1 << (70 % 8), ql.mem.read_ptr(buf + 0x80 + 70 // 8, 1))
+
+        # pollfd entries: read end, write end, a closed fd and an ignored one
+        def __poll() -> int:
+            for i, (fd, events) in enumerate(((10, POLLIN), (70, POLLOUT), (500, POLLIN), (-1, POLLIN))):
+                ql.mem.write(buf + i * 8, ql.pack32s(fd) + ql.pack16(events) + ql.pack16(0))
+
+            return syscall.ql_syscall_poll(ql, buf, 4, 0)
+
+        self.assertEqual(2, __poll())
+        self.assertListEqual([0, POLLOUT, POLLNVAL, 0], [ql.unpack16(ql.mem.read(buf + i * 8 + 6, 2)) for i in range(4)])
+
+        epfd = syscall.ql_syscall_epoll_create1(ql, 0)
+        self.assertGreaterEqual(epfd, 0)
+
+        # struct epoll_event is packed on x86-64
+        ql.mem.write(buf, ql.pack32(EPOLLIN) + ql.pack64(0x1337))
+
+        self.assertEqual(0, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_ADD, 10, buf))
+        self.assertEqual(-EEXIST, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_ADD, 10, buf))
+        self.assertEqual(0, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+
+        wr.write(b'x')
+
+        self.assertEqual(1, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+        self.assertEqual(EPOLLIN, ql.unpack32(ql.mem.read(buf + 0x100, 4)))
+        self.assertEqual(0x1337, ql.unpack64(ql.mem.read(buf + 0x104, 8)))
+
+        # readiness is reflected in select and poll as well
+        self.assertEqual(2, __select())
+        self.assertEqual(3, __poll())
+
+        self.assertEqual(0, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_DEL, 10, 0))
+        self.assertEqual(-ENOENT, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_DEL, 10, 0))
+        self.assertEqual(0, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+
+        # one-shot registrations report once, until they are modified
+        ql.mem.write(buf, ql.pack32(EPOLLIN | EPOLLONESHOT) + ql.pack64(0x1337))
+
+        self.assertEqual(0, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_ADD, 10, buf))
+        self.assertEqual(1, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+        self.assertEqual(0, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+        self.assertEqual(0, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_MOD, 10, buf))
+        self.assertEqual(1, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+
+        # hangups are reported even if no events are requested
+        ql.mem.write(buf, ql.pack32(0) + ql.pack64(0x1337))
+
+        self.assertEqual(0, syscall.ql_syscall_epoll_ctl(ql, epfd, EPOLL_CTL_MOD, 10, buf))
+        self.assertEqual(0, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+
+        wr.close()
+        ql.os.fd[70] = None
+
+        self.assertEqual(1, syscall.ql_syscall_epoll_wait(ql, epfd, buf + 0x100, 8, 0))
+        self.assertEqual(EPOLLHUP, ql.unpack32(ql.mem.read(buf + 0x100, 4)))
+
+        for fd in (10, epfd):
+            ql.os.fd[fd].close()
+
     def test_linux_mips32(self):
         print("Linux MIPS 32bit EL Shellcode")
         ql = Qiling(code=MIPS32EL_LIN, archtype=QL_ARCH.MIPS, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
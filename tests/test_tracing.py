@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append("..")
+from qiling import Qiling
+from qiling.const import QL_ARCH, QL_OS, QL_VERBOSE
+from qiling.extensions.tracing import utils as trace_utils
+
+# mov rcx, 3
+# loop:
+#   push rcx
+#   pop rax
+#   dec rcx
+#   jnz loop
+X8664_LOOP = bytes.fromhex('48c7c103000000 51 58 48ffc9 75f9')
+
+
+class TracingTest(unittest.TestCase):
+    @staticmethod
+    def __trace(trace_file: str, stream: bool) -> None:
+        ql = Qiling(code=X8664_LOOP, archtype=QL_ARCH.X8664, ostype=QL_OS.LINUX, verbose=QL_VERBOSE.OFF)
+
+        begin = ql.loader.load_address
+        end = begin + len(X8664_LOOP)
+
+        with trace_utils.collect_trace(ql, 'tenet', trace_file, stream=stream):
+            ql.run(begin, end)
+
+    def test_tenet_stream(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            collected = os.path.join(tmpdir, 'trace.log')
+            streamed = os.path.join(tmpdir, 'trace.log.gz')
+
+            self.__trace(collected, False)
+            self.__trace(streamed, True)
+
+            with open(collected, 'r') as infile:
+                expected = infile.read()
+
+            with gzip.open(streamed, 'rt') as infile:
+                actual = infile.read()
+
+        self.assertEqual(expected, actual)
+
+        lines = expected.splitlines()
+
+        # one delta per executed instruction
+        self.assertEqual(1 + 4 * 3, len(lines))
+
+        # pop rax reads from the stack, and then only the registers it modified are emitted
+        self.assertRegex(lines[2], r'^rsp=0x[0-9a-f]+,rip=0x[0-9a-f]+,mr=0x[0-9a-f]+:0300000000000000$')
+        self.assertRegex(lines[3], r'^rax=0x3,rsp=0x[0-9a-f]+,rip=0x[0-9a-f]+$')
+
+
+if __name__ == "__main__":
+    unittest.main()